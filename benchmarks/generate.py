@@ -0,0 +1,129 @@
+import argparse
+import datetime
+import json
+import os
+import random
+
+# Synthetic PATH_TO_LEADERBOARD_DATA tree for the benchmarks, in the same format as
+# snapshots/leaderboard-snapshot.json: {username: [money, link, [[ticker, "$7,227.50", "36.34%"], ...]]}.
+#
+#   backend/leaderboards/in_time/leaderboard-%Y-%m-%d-%H_%M.json   one per half hour of each session
+#   backend/leaderboards/leaderboard-latest.json                   copy of the newest in_time file
+#   backend/portfolios/usernames.txt                               one username per line
+#   prices/SPY.csv                                                 daily bars for PRICE_SOURCE=csv
+SYLLABLES = ["ka", "lo", "mi", "ren", "to", "sha", "vin", "el", "dar", "qui", "zo", "bel", "nor", "tay", "fin", "ash"]
+LINK = "https://www.investopedia.com/simulator/games/user-portfolio?portfolio={}"
+FIRST_SESSION = datetime.datetime(2025, 1, 6, 9, 30)
+UPDATES_PER_SESSION = 14  # 9:30 to 16:00 every 30 minutes
+TRADE_PROBABILITY = 0.02  # chance a given position is resized, closed or swapped between snapshots
+
+def _usernames(rng, count):
+    names = []
+    seen = set()
+    while len(names) < count:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.4:
+            name += str(rng.randint(1, 999))
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+def _tickers(rng, count):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    tickers = set()
+    while len(tickers) < count:
+        tickers.add("".join(rng.choice(letters) for _ in range(rng.randint(2, 4))))
+    return sorted(tickers)
+
+# Function to list the in_time timestamps: every half hour of each weekday session from FIRST_SESSION.
+def _timestamps(count):
+    timestamps = []
+    day = FIRST_SESSION.date()
+    while len(timestamps) < count:
+        if day.weekday() < 5:
+            open_at = datetime.datetime.combine(day, FIRST_SESSION.time())
+            timestamps.extend(open_at + datetime.timedelta(minutes=30 * i) for i in range(UPDATES_PER_SESSION))
+        day += datetime.timedelta(days=1)
+    return timestamps[:count]
+
+def _format_holdings(positions):
+    return [[ticker, f"${value:,.2f}", f"{percent:.2f}%"] for ticker, value, percent in positions]
+
+# Function to write a dataset with users accounts, files in_time snapshots and holdings positions per account.
+# Returns the list of in_time file paths, oldest first.
+def write_dataset(root, users, files, holdings, seed=0):
+    rng = random.Random(seed)
+    usernames = _usernames(rng, users)
+    pool = _tickers(rng, max(50, holdings * 20))
+    leaderboards_dir = os.path.join(root, "backend", "leaderboards")
+    in_time_dir = os.path.join(leaderboards_dir, "in_time")
+    portfolios_dir = os.path.join(root, "backend", "portfolios")
+    prices_dir = os.path.join(root, "prices")
+    for directory in (in_time_dir, portfolios_dir, prices_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(portfolios_dir, "usernames.txt"), "w") as f:
+        f.write("\n".join(usernames) + "\n")
+
+    # Each account is [money, link, [[ticker, value, percent], ...]], drifted and traded between snapshots
+    accounts = {}
+    for index, username in enumerate(usernames):
+        positions = [[ticker, rng.uniform(500, 15000), rng.uniform(-60, 150)] for ticker in rng.sample(pool, holdings)]
+        accounts[username] = [rng.uniform(80000, 130000), LINK.format(10000000 + index), positions]
+
+    paths = []
+    timestamps = _timestamps(files)
+    for timestamp in timestamps:
+        snapshot = {}
+        for username, (money, link, positions) in accounts.items():
+            for position in positions:
+                drift = rng.gauss(0, 0.01)
+                position[1] *= 1 + drift
+                position[2] += drift * 100
+                if rng.random() < TRADE_PROBABILITY:
+                    roll = rng.random()
+                    if roll < 0.4:
+                        position[1] *= rng.uniform(1.2, 2.0)  # bought more
+                    elif roll < 0.8:
+                        position[1] *= rng.uniform(0.3, 0.8)  # sold some
+                    else:
+                        position[0] = rng.choice(pool)  # closed one position and opened another
+                        position[2] = 0.0
+            accounts[username][0] = money * (1 + rng.gauss(0, 0.004))
+            snapshot[username] = [round(accounts[username][0], 2), link, _format_holdings(sorted(positions))]
+        path = os.path.join(in_time_dir, timestamp.strftime("leaderboard-%Y-%m-%d-%H_%M.json"))
+        with open(path, "w") as f:
+            json.dump(snapshot, f)
+        paths.append(path)
+
+    with open(paths[-1], "rb") as source, open(os.path.join(leaderboards_dir, "leaderboard-latest.json"), "wb") as f:
+        f.write(source.read())
+
+    # Daily SPY bars around the snapshot range for the S&P 500 overlay
+    with open(os.path.join(prices_dir, "SPY.csv"), "w") as f:
+        f.write("Date,Open,High,Low,Close,Volume\n")
+        close = 590.0
+        day = timestamps[0].date() - datetime.timedelta(days=7)
+        while day <= timestamps[-1].date() + datetime.timedelta(days=1):
+            if day.weekday() < 5:
+                open_price = close
+                close = open_price * (1 + rng.gauss(0, 0.008))
+                high, low = max(open_price, close) * 1.003, min(open_price, close) * 0.997
+                f.write(f"{day.isoformat()},{open_price:.2f},{high:.2f},{low:.2f},{close:.2f},{rng.randint(40, 90) * 1000000}\n")
+            day += datetime.timedelta(days=1)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic leaderboard data tree for the benchmarks")
+    parser.add_argument("root", help="directory to use as PATH_TO_LEADERBOARD_DATA")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--holdings", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    paths = write_dataset(args.root, args.users, args.files, args.holdings, args.seed)
+    print(f"Wrote {len(paths)} in_time snapshot(s) of {args.users} users with {args.holdings} holdings to {args.root}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import datetime
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Benchmarks the command and task hot paths against synthetic data at several scales and compares
+# the results with the previous run.  Each scale runs in its own worker process, since the bot's
+# state module binds PATH_TO_LEADERBOARD_DATA at import time.
+#
+#   python ./benchmarks/run.py                         run the default scales, save and compare
+#   python ./benchmarks/run.py --scales 200x50x10      users x in_time files x holdings per user
+#   python ./benchmarks/run.py --skip-render           don't start Chrome; charts stop at the figure JSON
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "src")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+DEFAULT_SCALES = "100x50x10,500x150x10,2000x250x15"
+DEFAULT_ITERATIONS = 15
+# A benchmark regresses when its median is this much slower than the baseline, and by at least NOISE_FLOOR seconds
+REGRESSION_THRESHOLD = 0.25
+NOISE_FLOOR = 0.002
+RESULT_PREFIX = "RESULT "
+
+def parse_scales(text):
+    scales = []
+    for part in text.split(","):
+        users, files, holdings = (int(value) for value in part.lower().split("x"))
+        scales.append({"users": users, "files": files, "holdings": holdings})
+    return scales
+
+def summarize(samples, peak_bytes):
+    samples = np.asarray(samples)
+    return {
+        "n": len(samples),
+        "mean": float(samples.mean()),
+        "p50": float(np.percentile(samples, 50)),
+        "p90": float(np.percentile(samples, 90)),
+        "p99": float(np.percentile(samples, 99)),
+        "max": float(samples.max()),
+        "peak_kb": peak_bytes / 1024,
+    }
+
+# Function to time an async benchmark.  setup runs untimed before every call.  One extra call is made
+# under tracemalloc for the peak Python allocation, kept out of the timings since tracing slows it down.
+async def measure(run, iterations, setup=None):
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        await run()
+        samples.append(time.perf_counter() - started)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        await run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return summarize(samples, peak)
+
+# Runs inside the worker process: imports the bot's modules against the dataset and times each hot path.
+async def run_worker(data_dir, iterations, skip_render):
+    sys.path.insert(0, SRC_DIR)
+    sys.path.insert(0, BENCHMARK_DIR)
+    from stubs import FakeBot, FakeChannel, FakeInteraction, install_yfinance_stub
+    install_yfinance_stub()
+
+    import state
+    from fileio import FILE_IO
+    from history import HistoryStore
+    from performance import compute_performance
+    from extensions import charts, commands, reports
+    from extensions.updates import MarketUpdates
+
+    if skip_render:
+        async def render(fig, width=None, height=None, timeout=None):
+            return fig.to_json().encode("utf-8")
+        state.RENDERER.render = render
+
+    # Discord's rate limits aren't what is being measured, so sends are never held back
+    state.SEND_SCHEDULER.rate = 1_000_000
+
+    await state.LEADERBOARD_LOADER.reload()
+    await state.USERNAME_AUTOCOMPLETE.refresh()
+    await asyncio.to_thread(state.HISTORY.refresh)
+    state.HISTORY_LOADED.set()
+    snapshot = state.LEADERBOARD_LOADER.snapshot
+    in_time_files = sorted(glob.glob(os.path.join(state.IN_TIME_DIR, "*.json")))
+    with open(in_time_files[max(len(in_time_files) - 2, 0)], "rb") as f:
+        previous_raw = f.read()
+    with open(in_time_files[0], "rb") as f:
+        morning_data = json.loads(f.read())
+
+    usernames = [account.name for account in snapshot.leaderboard.top(len(snapshot.data))]
+    top_user = usernames[0]
+    middle_user = usernames[len(usernames) // 2]
+    queries = [name[:length] for name in usernames[:50] for length in (1, 3)]
+
+    bot = FakeBot()
+    user_info = commands.UserInfo(bot)
+    leaderboard_cog = commands.Leaderboard(bot)
+    updates = MarketUpdates(bot)
+
+    def cold_charts():
+        state.CHART_CACHE.clear()
+
+    def cold_market_data():
+        state.CHART_CACHE.clear()
+        state.MARKET_DATA_CACHE.clear()
+
+    def previous_snapshot():
+        with open(state.SNAPSHOT_PATH, "wb") as f:
+            f.write(previous_raw)
+        state.LAST_COMPARED_HOLDINGS = None
+
+    def cold_user_index():
+        state.USER_RECORDS.signature = None
+
+    async def user_record():
+        await FILE_IO.run(state.USER_RECORDS.lookup, middle_user)
+
+    def cold_loader():
+        state.LEADERBOARD_LOADER.snapshot = None
+        state.LEADERBOARD_LOADER._signature = None
+
+    async def autocomplete():
+        for query in queries:
+            state.USERNAME_AUTOCOMPLETE.search(query)
+
+    async def history_cold():
+        await asyncio.to_thread(HistoryStore(state.IN_TIME_DIR).refresh)
+
+    async def money_graph_1w():
+        return await charts.generate_money_graph(middle_user, *await charts.resolve_chart_range("1w"))
+
+    benchmarks = [
+        ("autocomplete_x100", autocomplete, None),
+        ("leaderboard_parse", state.LEADERBOARD_LOADER.reload, cold_loader),
+        ("user_record_index", user_record, cold_user_index),
+        ("user_record_lookup", user_record, None),
+        ("history_load", history_cold, None),
+        ("money_graph_cold", lambda: charts.generate_money_graph(middle_user), cold_market_data),
+        ("money_graph_cached_prices", lambda: charts.generate_money_graph(middle_user), cold_charts),
+        ("money_graph_warm", lambda: charts.generate_money_graph(middle_user), None),
+        ("money_graph_1w_cold", money_graph_1w, cold_market_data),
+        ("leaderboard_graph_cold", lambda: charts.generate_leaderboard_graph(usernames[:5]), cold_charts),
+        ("leaderboard_graph_warm", lambda: charts.generate_leaderboard_graph(usernames[:5]), None),
+        ("compare_stock_changes", lambda: updates.compare_stock_changes(FakeChannel()), previous_snapshot),
+        (
+            "daily_performance",
+            lambda: asyncio.to_thread(compute_performance, [morning_data, snapshot.data], [None, snapshot.holdings]),
+            None,
+        ),
+        ("season_performance_cold", lambda: reports.get_performance("season"), state.PERFORMANCE_CACHE.clear),
+        ("command_userinfo", lambda: user_info.userinfo.callback(user_info, FakeInteraction(), top_user), None),
+        ("command_leaderboard", lambda: leaderboard_cog.leaderboard.callback(leaderboard_cog, FakeInteraction()), None),
+        ("command_rank", lambda: leaderboard_cog.rank.callback(leaderboard_cog, FakeInteraction(), middle_user), None),
+        (
+            "command_performance",
+            lambda: leaderboard_cog.performance.callback(leaderboard_cog, FakeInteraction(), "season"),
+            None,
+        ),
+    ]
+
+    results = {}
+    for name, run, setup in benchmarks:
+        results[name] = await measure(run, iterations, setup)
+        print(f"  {name:<28} p50 {results[name]['p50'] * 1000:9.2f} ms  p90 {results[name]['p90'] * 1000:9.2f} ms", flush=True)
+
+    state.SEND_SCHEDULER.stop()
+    state.RENDERER.shutdown()
+    return {"benchmarks": results, "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+# Function to generate (or reuse) the dataset for a scale and run its worker process.
+def run_scale(scale, args, work_root):
+    name = f"{scale['users']}x{scale['files']}x{scale['holdings']}-seed{args.seed}"
+    data_dir = os.path.join(args.keep_data or work_root, name)
+    generate_seconds = None
+    if not os.path.exists(os.path.join(data_dir, "prices", "SPY.csv")):
+        from generate import write_dataset
+        shutil.rmtree(data_dir, ignore_errors=True)
+        started = time.perf_counter()
+        write_dataset(data_dir, scale["users"], scale["files"], scale["holdings"], args.seed)
+        generate_seconds = time.perf_counter() - started
+
+    # The worker runs in its own directory, so ./snapshots (price cache, journals) starts empty every time
+    workdir = tempfile.mkdtemp(dir=work_root)
+    env = dict(
+        os.environ,
+        PATH_TO_LEADERBOARD_DATA=data_dir,
+        PRICE_SOURCE="csv",
+        PRICE_FIXTURE_DIR=os.path.join(data_dir, "prices"),
+        DISCORD_CHANNEL_ID_Leaderboard="1",
+        DISCORD_CHANNEL_ID_Stocks="2",
+    )
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--iterations", str(args.iterations)]
+    if args.skip_render:
+        command.append("--skip-render")
+    process = subprocess.run(command, cwd=workdir, env=env, stdout=subprocess.PIPE, text=True)
+    result = None
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+        else:
+            print(line)
+    if process.returncode != 0 or result is None:
+        raise RuntimeError(f"Benchmark worker for {name} failed with exit code {process.returncode}")
+    return dict(scale, generate_seconds=generate_seconds, **result)
+
+def scale_key(scale):
+    return scale["users"], scale["files"], scale["holdings"]
+
+# Function to find the newest saved result with the same render mode, to compare against.
+def latest_result(skip_render, exclude=None):
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), reverse=True):
+        if path == exclude:
+            continue
+        with open(path) as f:
+            result = json.load(f)
+        if result.get("skip_render") == skip_render:
+            return path, result
+    return None, None
+
+# Function to print the median of each benchmark next to the baseline's.  Returns the regressions found.
+def compare(result, baseline, threshold):
+    baseline_scales = {scale_key(scale): scale for scale in baseline["scales"]}
+    regressions = []
+    for scale in result["scales"]:
+        previous = baseline_scales.get(scale_key(scale))
+        if previous is None:
+            continue
+        print(f"\n{scale['users']} users x {scale['files']} files x {scale['holdings']} holdings vs baseline")
+        for name, stats in scale["benchmarks"].items():
+            old = previous["benchmarks"].get(name)
+            if old is None:
+                continue
+            change = stats["p50"] / old["p50"] - 1 if old["p50"] else 0.0
+            regressed = change > threshold and stats["p50"] - old["p50"] > NOISE_FLOOR
+            marker = "  REGRESSION" if regressed else ""
+            print(f"  {name:<28} {old['p50'] * 1000:9.2f} -> {stats['p50'] * 1000:9.2f} ms ({change:+.0%}){marker}")
+            if regressed:
+                regressions.append((scale_key(scale), name, change))
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bot's command and task hot paths on synthetic data")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma separated USERSxFILESxHOLDINGS")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-render", action="store_true", help="stop charts at the figure JSON instead of a PNG")
+    parser.add_argument("--keep-data", help="directory to cache generated datasets in between runs")
+    parser.add_argument("--baseline", help="result file to compare against (default: the latest saved one)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--no-save", action="store_true", help="don't write the result to benchmarks/results")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        result = asyncio.run(run_worker(os.environ["PATH_TO_LEADERBOARD_DATA"], args.iterations, args.skip_render))
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return 0
+
+    sys.path.insert(0, BENCHMARK_DIR)
+    result = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "skip_render": args.skip_render,
+        "iterations": args.iterations,
+        "scales": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="lelandstocks-bench-") as work_root:
+        for scale in parse_scales(args.scales):
+            print(f"\n{scale['users']} users x {scale['files']} files x {scale['holdings']} holdings", flush=True)
+            result["scales"].append(run_scale(scale, args, work_root))
+
+    saved_path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y-%m-%d-%H_%M_%S")
+        saved_path = os.path.join(RESULTS_DIR, f"{stamp}-{result['commit'] or 'unknown'}.json")
+        with open(saved_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved results to {saved_path}")
+
+    if args.baseline:
+        baseline_path = args.baseline
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    else:
+        baseline_path, baseline = latest_result(args.skip_render, exclude=saved_path)
+    if baseline is None:
+        print("No baseline to compare against yet")
+        return 0
+    print(f"\nComparing with {baseline_path}")
+    regressions = compare(result, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
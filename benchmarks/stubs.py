@@ -0,0 +1,75 @@
+import itertools
+import sys
+import types
+
+# Offline stand-ins for the Discord objects and yfinance, so the benchmarks exercise the bot's own code
+# without a gateway connection or network access.  Every stub gets a fresh id, so the send scheduler
+# never rate limits one benchmark iteration behind the previous one.
+_ids = itertools.count(1)
+
+class FakeMessage:
+    def __init__(self, kwargs):
+        self.id = next(_ids)
+        self.kwargs = kwargs
+
+class FakeFollowup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(dict(kwargs, content=content))
+        self.sent.append(message)
+        return message
+
+class FakeResponse:
+    def __init__(self):
+        self.deferred = False
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+class FakeInteraction:
+    def __init__(self):
+        self.id = next(_ids)
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+class FakePermissions:
+    send_messages = True
+    embed_links = True
+
+class FakeGuild:
+    me = None
+
+class FakeChannel:
+    def __init__(self, channel_id=None):
+        self.id = channel_id if channel_id is not None else next(_ids)
+        self.guild = FakeGuild()
+        self.sent = []
+
+    def permissions_for(self, member):
+        return FakePermissions()
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(dict(kwargs, content=content))
+        self.sent.append(message)
+        return message
+
+# Hands out a new channel per lookup; the last one is kept for inspection.
+class FakeBot:
+    def __init__(self):
+        self.last_channel = None
+
+    def get_channel(self, channel_id):
+        self.last_channel = FakeChannel()
+        return self.last_channel
+
+def _no_network(*args, **kwargs):
+    raise RuntimeError("yfinance is stubbed out in benchmarks; prices come from PRICE_SOURCE=csv")
+
+# Function to replace yfinance with a module that fails loudly, so a missing fixture can't fall back to the network.
+def install_yfinance_stub():
+    module = types.ModuleType("yfinance")
+    module.download = _no_network
+    module.Ticker = _no_network
+    sys.modules["yfinance"] = module
@@ -11,13 +11,18 @@ log() {
 LAST_MAIN_HASH=""
 LAST_SUB_HASH=""
 BOT_PID=""
+MAIN_CHANGED=0
+SUB_CHANGED=0
 MAIN_DIR=$(pwd)
 
 # Function to stop the bot if it's running
 stop_bot() {
     if [ ! -z "$BOT_PID" ]; then
         log "📥 Stopping bot process (PID: $BOT_PID)..."
-        kill $BOT_PID 2>/dev/null
+        # Ask the bot to shut down cleanly over its control socket, and only signal it if that fails
+        if ! pixi run stop_discord >/dev/null 2>&1; then
+            kill $BOT_PID 2>/dev/null
+        fi
         sleep 2
         if ! kill -0 $BOT_PID 2>/dev/null; then
             log "✅ Bot stopped successfully"
@@ -54,14 +59,45 @@ check_changes() {
     local sub_behind=$(git rev-list HEAD..origin/master --count 2>/dev/null)
     cd "$MAIN_DIR" || return 1
 
+    # Remember which repository changed: new code in the main repository needs a reload, new data in the submodule doesn't
+    MAIN_CHANGED=0
+    SUB_CHANGED=0
+    [ "${main_behind:-0}" -gt 0 ] && MAIN_CHANGED=1
+    [ "${sub_behind:-0}" -gt 0 ] && SUB_CHANGED=1
+
     # If either repository has changes
-    if [ "$main_behind" -gt 0 ] || [ "$sub_behind" -gt 0 ]; then
+    if [ $MAIN_CHANGED -eq 1 ] || [ $SUB_CHANGED -eq 1 ]; then
         log "Updates available but not merging automatically"
         return 0
     fi
     return 1
 }
 
+# Function to start the bot in the background
+start_bot() {
+    log "🚀 Starting bot..."
+    if command -v pixi &> /dev/null; then
+        pixi run update_discord &
+        BOT_PID=$!
+        log "✨ Bot started with PID: $BOT_PID"
+    else
+        log "❌ 'pixi' command not found, unable to start bot"
+    fi
+}
+
+# Function to swap in new code without restarting.  Falls back to a restart when the bot can't reload,
+# e.g. when a module outside src/extensions changed.
+reload_bot() {
+    log "♻️ Reloading bot extensions..."
+    if pixi run reload_discord; then
+        log "✅ Bot reloaded in place"
+    else
+        log "⚠️ Reload failed, restarting bot..."
+        stop_bot
+        start_bot
+    fi
+}
+
 # Function to resolve merge conflicts
 resolve_conflicts() {
     local repo_dir="$1"
@@ -126,26 +162,13 @@ while true; do
             force_merge_repositories
         fi
         
-        log "🚀 Starting bot..."
-        if command -v pixi &> /dev/null; then
-            pixi run update_discord &
-            BOT_PID=$!
-            log "✨ Bot started with PID: $BOT_PID"
-        else
-            log "❌ 'pixi' command not found, unable to start bot"
-        fi
+        start_bot
     elif [ $update_status -eq 1 ]; then
-        stop_bot
-        log "🔄 Changes detected, preparing restart..."
+        log "🔄 Changes detected, merging..."
         force_merge_repositories
-        
-        log "🚀 Starting bot..."
-        if command -v pixi &> /dev/null; then
-            pixi run update_discord &
-            BOT_PID=$!
-            log "✨ Bot started with PID: $BOT_PID"
-        else
-            log "❌ 'pixi' command not found, unable to start bot"
+        # Leaderboard data is picked up by the running bot; only code changes need a reload
+        if [ $MAIN_CHANGED -eq 1 ]; then
+            reload_bot
         fi
     fi
     
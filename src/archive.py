@@ -0,0 +1,234 @@
+import argparse
+import datetime
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from history import parse_leaderboard_timestamp
+from leaderboard import parse_money, parse_percent
+
+# Binary columnar archive of the in_time leaderboard history.
+#
+# Layout (little-endian, every section 8-byte aligned):
+#   header        magic, version, counts and the byte offset of each section below
+#   timestamps    int64[n_timestamps]              minutes since the epoch, sorted
+#   user_offsets  uint32[n_users + 1]              into user_blob
+#   user_blob     utf-8 usernames, each stored once
+#   values        float64[n_users, n_timestamps]   account value, NaN when absent
+#   tick_offsets  uint32[n_tickers + 1]            into tick_blob
+#   tick_blob     utf-8 ticker symbols, each stored once
+#   cell_offsets  int64[n_timestamps * n_users + 1] into entries, cell = t * n_users + u
+#   entries       (ticker id, percent in basis points, value in cents) per holding
+ARCHIVE_MAGIC = b'LSHA'
+ARCHIVE_VERSION = 1
+HEADER = struct.Struct('<4sHHIIIIQ8Q')
+ENTRY_DTYPE = np.dtype([('ticker', '<u4'), ('percent_bps', '<i4'), ('value_cents', '<i8')])
+MISSING_CENTS = np.iinfo(np.int64).min
+MISSING_BPS = np.iinfo(np.int32).min
+
+# Function to turn a holding value like "$7,227.50" into integer cents.
+def parse_money_cents(text):
+    value = parse_money(text)
+    return MISSING_CENTS if value is None else int(round(value * 100))
+
+# Function to turn a holding return like "36.34%" into integer basis points.
+def parse_percent_bps(text):
+    value = parse_percent(text)
+    return MISSING_BPS if value is None else int(round(value * 100))
+
+def _string_table(strings):
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, b''.join(encoded)
+
+def _read_string_table(offsets, blob):
+    data = bytes(blob)
+    return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+# Convert every snapshot in an in_time directory into a single archive file.  Returns (timestamps, users, holdings).
+def write_archive(in_time_dir, archive_path):
+    files = []
+    for name in os.listdir(in_time_dir):
+        if not name.endswith('.json'):
+            continue
+        try:
+            files.append((parse_leaderboard_timestamp(name), name))
+        except ValueError:
+            print(f"Skipping file with unexpected name: {name}")
+    files.sort()
+
+    user_index = {}
+    ticker_index = {}
+    timestamps = []
+    columns = []
+    file_entries = []
+    for timestamp, name in files:
+        try:
+            with open(os.path.join(in_time_dir, name)) as f:
+                file_data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading file {name}: {e}")
+            continue
+
+        column = {}
+        rows, entries = [], []
+        for username, record in file_data.items():
+            row = user_index.setdefault(username, len(user_index))
+            try:
+                column[row] = float(record[0])
+            except (TypeError, ValueError, IndexError):
+                continue
+            for holding in record[2] if len(record) > 2 and record[2] else []:
+                ticker = ticker_index.setdefault(holding[0], len(ticker_index))
+                rows.append(row)
+                entries.append((ticker, parse_percent_bps(holding[2]), parse_money_cents(holding[1])))
+        timestamps.append(np.datetime64(timestamp, 'm').astype(np.int64))
+        columns.append(column)
+        file_entries.append((np.array(rows, dtype=np.int64), np.array(entries, dtype=ENTRY_DTYPE)))
+
+    n_ts, n_users = len(timestamps), len(user_index)
+    values = np.full((n_users, n_ts), np.nan)
+    cell_counts = np.zeros((n_ts, n_users), dtype=np.int64)
+    sorted_entries = []
+    for t, (column, (rows, entries)) in enumerate(zip(columns, file_entries)):
+        if column:
+            values[list(column), t] = list(column.values())
+        order = np.argsort(rows, kind='stable')
+        sorted_entries.append(entries[order])
+        cell_counts[t] = np.bincount(rows, minlength=n_users)
+    cell_offsets = np.zeros(n_ts * n_users + 1, dtype='<i8')
+    np.cumsum(cell_counts.ravel(), out=cell_offsets[1:])
+    all_entries = np.concatenate(sorted_entries) if sorted_entries else np.empty(0, ENTRY_DTYPE)
+
+    user_offsets, user_blob = _string_table(user_index)
+    tick_offsets, tick_blob = _string_table(ticker_index)
+    sections = [
+        np.asarray(timestamps, dtype='<i8').tobytes(),
+        user_offsets.tobytes(),
+        user_blob,
+        values.astype('<f8').tobytes(),
+        tick_offsets.tobytes(),
+        tick_blob,
+        cell_offsets.tobytes(),
+        all_entries.tobytes(),
+    ]
+
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        position += -position % 8
+        offsets.append(position)
+        position += len(section)
+
+    # Write to a temporary file and rename so readers never map a half-written archive
+    tmp_path = archive_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, n_ts, n_users, len(ticker_index), 0,
+                            len(all_entries), *offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, archive_path)
+    return n_ts, n_users, len(all_entries)
+
+# Read-only, memory-mapped view of an archive.  Arrays are zero-copy views into the mapping,
+# so opening is O(users) and the pages are shared between every process that maps the file.
+class HistoryArchive:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, n_ts, n_users, n_tickers, _, n_entries,
+         *offsets) = HEADER.unpack_from(self._mmap, 0)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {ARCHIVE_VERSION} leaderboard history archive")
+
+        def view(index, dtype, count):
+            return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offsets[index])
+
+        user_offsets = view(1, '<u4', n_users + 1)
+        tick_offsets = view(4, '<u4', n_tickers + 1)
+        self.timestamps = view(0, '<i8', n_ts).view('datetime64[m]')
+        self.usernames = _read_string_table(user_offsets, view(2, 'u1', int(user_offsets[-1])))
+        self.values = view(3, '<f8', n_users * n_ts).reshape(n_users, n_ts)
+        self.tickers = _read_string_table(tick_offsets, view(5, 'u1', int(tick_offsets[-1])))
+        self.cell_offsets = view(6, '<i8', n_ts * n_users + 1)
+        self.entries = view(7, ENTRY_DTYPE, n_entries)
+        self.user_index = {username: row for row, username in enumerate(self.usernames)}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # Drop the numpy views first, the mapping can't be closed while they are exported
+        self.timestamps = self.values = self.cell_offsets = self.entries = None
+        self._mmap.close()
+
+    # Timestamps and values for a single user, restricted to the snapshots the user appears in.
+    def series(self, username):
+        row = self.user_index.get(username)
+        if row is None:
+            return self.timestamps[:0], np.empty(0)
+        values = self.values[row]
+        present = ~np.isnan(values)
+        return self.timestamps[present], values[present]
+
+    # Decoded (ticker, value, percent) holdings for one user at one timestamp index.
+    def holdings(self, username, index):
+        row = self.user_index.get(username)
+        if row is None:
+            return []
+        cell = index * len(self.usernames) + row
+        entries = self.entries[self.cell_offsets[cell]:self.cell_offsets[cell + 1]]
+        return [
+            (
+                self.tickers[entry['ticker']],
+                None if entry['value_cents'] == MISSING_CENTS else int(entry['value_cents']) / 100,
+                None if entry['percent_bps'] == MISSING_BPS else int(entry['percent_bps']) / 100,
+            )
+            for entry in entries
+        ]
+
+    # The snapshot at one timestamp index in the {username: [money, link, holdings]} JSON layout.  Links
+    # aren't archived, and holding values and returns are numbers rather than display strings.
+    def snapshot(self, index):
+        values = self.values[:, index]
+        return {
+            username: [float(values[row]), None, [list(holding) for holding in self.holdings(username, index)]]
+            for row, username in enumerate(self.usernames)
+            if not np.isnan(values[row])
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert in_time leaderboard snapshots into a history archive")
+    data_path = os.environ.get('PATH_TO_LEADERBOARD_DATA', '.')
+    parser.add_argument('--in-time-dir', default=os.path.join(data_path, 'backend/leaderboards/in_time'),
+                        help="Directory of leaderboard-*.json snapshots")
+    parser.add_argument('--output', default=os.path.join('snapshots', 'history.lsha'),
+                        help="Archive file to write")
+    args = parser.parse_args(argv)
+
+    start = datetime.datetime.now()
+    n_ts, n_users, n_holdings = write_archive(args.in_time_dir, args.output)
+    elapsed = (datetime.datetime.now() - start).total_seconds()
+    size = os.path.getsize(args.output)
+    print(f"Wrote {args.output}: {n_ts} snapshots, {n_users} users, {n_holdings} holdings, "
+          f"{size / 1024:,.1f} KiB in {elapsed:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+    sys.exit(main())
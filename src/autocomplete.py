@@ -0,0 +1,154 @@
+import asyncio
+import math
+import os
+from bisect import bisect_left
+
+from fileio import FILE_IO
+
+MAX_CHOICES = 25  # Discord's limit on autocomplete choices
+NGRAM_SIZES = (1, 2, 3)
+
+# Immutable search index over usernames.  Names are numbered in ranking order (leaderboard
+# position, then alphabetical), so every posting list is already sorted best-first and a
+# query can stop as soon as it has enough matches.
+class UsernameIndex:
+    def __init__(self, usernames=(), ranking=None):
+        ranking = ranking or {}
+        # After every ranked name whether ranks count from 0 or 1
+        unranked = math.inf
+        self.names = sorted(
+            set(usernames) | set(ranking),
+            key=lambda name: (ranking.get(name, unranked), name.casefold(), name),
+        )
+        self.keys = [name.casefold() for name in self.names]
+
+        # Prefix trie; every node keeps the best MAX_CHOICES ids below it
+        self._trie = {}
+        # n-gram -> ascending ids of names containing it, for substring search
+        self._ngrams = {}
+        for name_id, key in enumerate(self.keys):
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+                top = node.setdefault(None, [])
+                if len(top) < MAX_CHOICES:
+                    top.append(name_id)
+            for size in NGRAM_SIZES:
+                for gram in {key[i:i + size] for i in range(len(key) - size + 1)}:
+                    self._ngrams.setdefault(gram, []).append(name_id)
+
+    def __len__(self):
+        return len(self.names)
+
+    # Up to limit names matching query: prefix matches first, then substring matches, each in ranking order.
+    def search(self, query, limit=MAX_CHOICES):
+        query = query.strip().casefold()
+        if not query:
+            return self.names[:limit]
+
+        results = self._prefix_ids(query, limit)
+        if len(results) < limit:
+            seen = set(results)
+            for name_id in self._substring_ids(query):
+                if name_id not in seen:
+                    results.append(name_id)
+                    if len(results) >= limit:
+                        break
+        return [self.names[name_id] for name_id in results]
+
+    def _prefix_ids(self, query, limit):
+        node = self._trie
+        for char in query:
+            node = node.get(char)
+            if node is None:
+                return []
+        top = node[None]
+        if len(top) >= limit or len(top) < MAX_CHOICES:
+            return top[:limit]
+        # The node summary is capped; fall back to scanning the full posting list
+        return [name_id for name_id in self._substring_ids(query) if self.keys[name_id].startswith(query)][:limit]
+
+    # Ids of names containing query, yielded in ranking order.
+    def _substring_ids(self, query):
+        size = min(len(query), max(NGRAM_SIZES))
+        grams = {query[i:i + size] for i in range(len(query) - size + 1)}
+        postings = []
+        for gram in grams:
+            posting = self._ngrams.get(gram)
+            if posting is None:
+                return
+            postings.append(posting)
+        postings.sort(key=len)
+        shortest, others = postings[0], postings[1:]
+        for name_id in shortest:
+            if all(_contains(posting, name_id) for posting in others) and query in self.keys[name_id]:
+                yield name_id
+
+def _contains(posting, name_id):
+    index = bisect_left(posting, name_id)
+    return index < len(posting) and posting[index] == name_id
+
+# Function to read the names in usernames.txt.
+def load_usernames(usernames_path):
+    if not os.path.exists(usernames_path):
+        return []
+    with open(usernames_path, "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+# Keeps a UsernameIndex current: rebuilds it in a background thread whenever usernames.txt
+# or the leaderboard loader's snapshot changes, and swaps it in atomically so lookups never wait.
+# The ranking comes from the shared LeaderboardLoader (add on_leaderboard_change as a listener),
+# so leaderboard-latest.json is never read here.
+class UsernameAutocomplete:
+    def __init__(self, usernames_path, loader, poll_interval=30):
+        self.usernames_path = usernames_path
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.index = UsernameIndex()
+        self._signature = None
+        self._task = None
+
+    def search(self, query, limit=MAX_CHOICES):
+        return self.index.search(query, limit)
+
+    def _current_signature(self):
+        try:
+            stat = os.stat(self.usernames_path)
+            usernames = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            usernames = None
+        snapshot = self.loader.snapshot
+        return usernames, snapshot.digest if snapshot is not None else None
+
+    async def on_leaderboard_change(self, snapshot):
+        await self.refresh()
+
+    # Rebuild the index if usernames.txt or the leaderboard changed.  Returns True when a new index was swapped in.
+    async def refresh(self):
+        signature = self._current_signature()
+        if signature == self._signature:
+            return False
+        snapshot = self.loader.snapshot
+        usernames = await FILE_IO.run(load_usernames, self.usernames_path, op="read")
+        ranking = {account.name: account.rank for account in snapshot.leaderboard} if snapshot is not None else {}
+        self.index = await asyncio.to_thread(UsernameIndex, usernames, ranking)
+        self._signature = signature
+        print(f"Rebuilt username autocomplete index with {len(self.index)} names")
+        return True
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error refreshing username autocomplete: {e}")
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,99 @@
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+
+# Bounded LRU cache for values produced by coroutines, with an optional time-to-live.
+# Concurrent misses for the same key share one in-flight computation instead of each
+# starting their own.
+class AsyncLRUCache:
+    def __init__(self, max_entries=64, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    @property
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "in_flight": len(self._pending),
+        }
+
+    def get(self, key, default=None):
+        entry = self._lookup(key)
+        return default if entry is None else entry[0]
+
+    # ttl overrides the cache's time-to-live for this entry.
+    def put(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self.purge_expired()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # (key, value, seconds left or None) for every live entry, least recently used first.
+    def items(self):
+        now = monotonic()
+        return [
+            (key, value, None if expires_at is None else expires_at - now)
+            for key, (value, expires_at) in self._entries.items()
+            if expires_at is None or expires_at > now
+        ]
+
+    def clear(self):
+        self._entries.clear()
+
+    # Drop every expired entry.  Expired entries are also dropped lazily when looked up.
+    def purge_expired(self):
+        now = monotonic()
+        for key in [k for k, (_, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]:
+            del self._entries[key]
+
+    # Return the cached value for key, or await create() to produce it.  None results are not cached.
+    async def get_or_create(self, key, create):
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+
+        task = self._pending.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(create())
+            self._pending[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.hits += 1
+        # Shield so one caller giving up doesn't cancel the work the others are waiting on
+        return await asyncio.shield(task)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _finish(self, key, task):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            self.put(key, task.result())
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import pickle
+import struct
+import time
+import zlib
+
+from fileio import FILE_IO
+
+# Warm cache checkpoint, so a restart doesn't start from cold caches.
+#
+# Layout (little-endian):
+#   header    magic, format version, section count, time written (seconds since the epoch)
+#   sections  name length (uint16), payload length (uint64), utf-8 name, zlib-compressed pickle
+# Sections are compressed separately, so one that fails to load doesn't take the others with it.
+# Bump CHECKPOINT_VERSION whenever a section's contents change shape; older files are then ignored.
+CHECKPOINT_MAGIC = b'LSWC'
+CHECKPOINT_VERSION = 1
+HEADER = struct.Struct('<4sHHd')
+SECTION = struct.Struct('<HQ')
+COMPRESSION_LEVEL = 3
+
+# Seconds between periodic checkpoints.
+CHECKPOINT_INTERVAL = float(os.environ.get('CHECKPOINT_INTERVAL', 900))
+
+# Function to write {name: object} sections to path, replacing any previous checkpoint atomically.  Returns the file size.
+def write_checkpoint(path, sections):
+    chunks = [HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(sections), time.time())]
+    for name, value in sections.items():
+        encoded = name.encode('utf-8')
+        payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESSION_LEVEL)
+        chunks += [SECTION.pack(len(encoded), len(payload)), encoded, payload]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return sum(len(chunk) for chunk in chunks)
+
+# Function to read a checkpoint.  Returns (time written, {name: object}); sections that can't be decoded are left out.
+# Raises ValueError if the file isn't a checkpoint of the current version.
+def read_checkpoint(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, count, written_at = HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError("not a warm cache checkpoint")
+    if version != CHECKPOINT_VERSION:
+        raise ValueError(f"checkpoint version {version}, expected {CHECKPOINT_VERSION}")
+
+    sections = {}
+    offset = HEADER.size
+    for _ in range(count):
+        if offset + SECTION.size > len(data):
+            raise ValueError("truncated section header")
+        name_length, payload_length = SECTION.unpack_from(data, offset)
+        offset += SECTION.size
+        name = data[offset:offset + name_length].decode('utf-8')
+        offset += name_length
+        payload = data[offset:offset + payload_length]
+        offset += payload_length
+        if len(payload) != payload_length:
+            raise ValueError(f"truncated section '{name}'")
+        try:
+            sections[name] = pickle.loads(zlib.decompress(payload))
+        except Exception as e:
+            print(f"Skipping checkpoint section '{name}': {e}")
+    return written_at, sections
+
+# Periodically saves registered sections to one checkpoint file and restores them at startup.
+# Each section has a dump() called on the event loop that returns a picklable object (or None to
+# skip it), and a restore(obj) that validates it against the files on disk and returns the number
+# of entries it kept, or a falsy value if it threw the section away.  restore may be a coroutine.
+class Checkpointer:
+    def __init__(self, path, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._sections = {}
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    # Sections are restored in registration order, so later ones can validate against earlier ones.
+    def register(self, name, dump, restore):
+        self._sections[name] = (dump, restore)
+
+    async def save(self):
+        async with self._lock:
+            sections = {}
+            for name, (dump, _) in self._sections.items():
+                try:
+                    value = dump()
+                except Exception as e:
+                    print(f"Error capturing checkpoint section '{name}': {e}")
+                    continue
+                if value is not None:
+                    sections[name] = value
+            started = time.perf_counter()
+            try:
+                size = await FILE_IO.run(write_checkpoint, self.path, sections, op="checkpoint")
+            except Exception as e:
+                print(f"Error writing checkpoint: {e}")
+                return None
+            print(f"Checkpointed {len(sections)} cache section(s), {size / 1e6:.1f} MB in {time.perf_counter() - started:.2f}s")
+            return size
+
+    # Restore every section found in the checkpoint.  Returns {name: entries kept} for the sections that were used.
+    async def restore(self):
+        if not os.path.exists(self.path):
+            return {}
+        started = time.perf_counter()
+        try:
+            written_at, sections = await FILE_IO.run(read_checkpoint, self.path, op="checkpoint")
+        except Exception as e:
+            print(f"Ignoring checkpoint {self.path}: {e}")
+            return {}
+
+        restored = {}
+        for name, (_, restore) in self._sections.items():
+            if name not in sections:
+                continue
+            try:
+                kept = restore(sections.pop(name))
+                if asyncio.iscoroutine(kept):
+                    kept = await kept
+            except Exception as e:
+                print(f"Error restoring checkpoint section '{name}': {e}")
+                continue
+            if kept:
+                restored[name] = kept
+        summary = ", ".join(f"{name} {kept}" for name, kept in restored.items()) or "nothing still valid"
+        print(
+            f"Restored from a {(time.time() - written_at) / 60:.0f} minute old checkpoint in "
+            f"{time.perf_counter() - started:.2f}s: {summary}"
+        )
+        return restored
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import os
+import socket
+import sys
+
+# Local control socket for the running bot.  Each request is one line holding a command name
+# ("ping", "reload", "stop"); the reply is one line starting with "ok" or "error".
+DEFAULT_SOCKET_PATH = os.path.join("./snapshots", "control.sock")
+CONTROL_TIMEOUT = 120
+
+class ControlServer:
+    # handlers maps command names to coroutine functions returning the reply text.
+    def __init__(self, path, handlers):
+        self.path = path
+        self.handlers = handlers
+        self._server = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def _handle(self, reader, writer):
+        try:
+            command = (await reader.readline()).decode('utf-8').strip()
+            handler = self.handlers.get(command)
+            if handler is None:
+                reply = f"error unknown command '{command}'"
+            else:
+                try:
+                    reply = f"ok {await handler()}".rstrip()
+                except Exception as e:
+                    reply = f"error {e}"
+            writer.write((reply + "\n").encode('utf-8'))
+            await writer.drain()
+        finally:
+            writer.close()
+
+# Records a content hash of each module file so a later check can tell which ones changed on disk.
+class ModuleWatcher:
+    def __init__(self, paths):
+        self.hashes = {path: self._hash(path) for path in paths}
+
+    @staticmethod
+    def _hash(path):
+        try:
+            with open(path, 'rb') as f:
+                return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        except OSError:
+            return None
+
+    # Paths whose contents differ from when they were recorded.
+    def changed(self):
+        return [path for path, digest in self.hashes.items() if self._hash(path) != digest]
+
+# Function to send one command to the bot's control socket and return the reply line.
+def send_command(command, path, timeout=CONTROL_TIMEOUT):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((command + "\n").encode('utf-8'))
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    return reply.decode('utf-8').strip()
+
+# Usage: python ./src/control.py reload|ping|stop
+# Exits 0 on "ok", 1 on "error" and 2 when the bot isn't listening.
+def main(argv):
+    if len(argv) != 2:
+        print("Usage: control.py reload|ping|stop")
+        return 2
+    from dotenv import load_dotenv
+    load_dotenv()
+    path = os.environ.get('CONTROL_SOCKET_PATH', DEFAULT_SOCKET_PATH)
+    try:
+        reply = send_command(argv[1], path)
+    except OSError as e:
+        print(f"Could not reach the bot at {path}: {e}")
+        return 2
+    print(reply)
+    return 0 if reply.startswith("ok") else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
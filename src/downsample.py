@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+
+# Most points drawn per chart.  A long season has thousands of in_time snapshots, far more than the
+# rendered image has pixels for, and kaleido's render time and the PNG size grow with every point.
+CHART_POINT_BUDGET = int(os.environ.get('CHART_POINT_BUDGET', 500))
+
+# Function to pick at most budget indices of a series with Largest-Triangle-Three-Buckets.  The first and
+# last points are always kept; each bucket in between keeps the point that makes the largest triangle with
+# the previous pick and the next bucket's average, which preserves the shape of the line.  x must be sorted.
+def lttb(x, y, budget):
+    n = len(x)
+    if n <= budget or budget < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # budget - 2 buckets over the points between the first and last; each holds at least one point
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    # Each bucket is compared against the average of the one after it; the last against the final point
+    counts = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1])[1:] / counts[1:], x[-1]).tolist()
+    next_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1])[1:] / counts[1:], y[-1]).tolist()
+    edges = edges.tolist()
+    previous = 0
+    for i in range(budget - 2):
+        start, end = edges[i], edges[i + 1]
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - next_x[i]) * (y[start:end] - py) - (px - x[start:end]) * (next_y[i] - py))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+# Function to downsample one series to at most budget indices while keeping its minimum and maximum, so
+# highest and lowest markers land on the drawn line.  NaN entries (snapshots the user is missing from) are skipped.
+def downsample_indices(x, y, budget=CHART_POINT_BUDGET):
+    present = np.flatnonzero(~np.isnan(y))
+    if len(present) <= budget:
+        return present
+    values = y[present]
+    extremes = present[[int(values.argmin()), int(values.argmax())]]
+    picked = present[lttb(x[present], values, budget - 2)]
+    return np.union1d(picked, extremes)
+
+# Function to downsample several series that share a time axis onto one common grid of at most budget
+# columns.  Each series gets an equal share of the budget and the grid is the union of what they picked,
+# so every trace is drawn at the same timestamps.  Returns the sorted column indices to plot.
+def downsample_grid(x, rows, budget=CHART_POINT_BUDGET):
+    if len(x) <= budget or not len(rows):
+        return np.arange(len(x))
+    share = max(budget // len(rows), 4)
+    picked = [downsample_indices(x, row, share) for row in rows]
+    return np.unique(np.concatenate(picked)) if picked else np.arange(len(x))
+
+# Function to turn numpy datetime64 timestamps into float minutes for the triangle areas.
+def time_axis(timestamps):
+    return np.asarray(timestamps).astype('datetime64[m]').astype(np.int64).astype(np.float64)
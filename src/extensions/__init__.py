@@ -0,0 +1,10 @@
+# Bot code that can be reloaded in place with `bot.reload_extension`.  Extensions are loaded
+# and reloaded in this order, so shared helpers come before the modules that import them.
+EXTENSIONS = (
+    "extensions.common",
+    "extensions.charts",
+    "extensions.reports",
+    "extensions.commands",
+    "extensions.admin",
+    "extensions.updates",
+)
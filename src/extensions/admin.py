@@ -0,0 +1,129 @@
+import time
+
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from fileio import FILE_IO
+from metrics import METRICS, STAGES, rss_bytes
+from state import (
+    CHART_CACHE,
+    MARKET_DATA_CACHE,
+    PERFORMANCE_CACHE,
+    API_SEMAPHORE,
+    SEND_SCHEDULER,
+    LOOP_WATCHDOG,
+)
+from extensions.common import get_embed_color, send_followup
+
+# Discord caps an embed field value at 1024 characters.
+FIELD_LIMIT = 1024
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}ms"
+
+def _uptime(seconds):
+    hours, remainder = divmod(int(seconds), 3600)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h {remainder // 60}m" if days else f"{hours}h {remainder // 60}m"
+
+# Function to join lines into a field value, dropping whatever doesn't fit.
+def _field(lines):
+    value = ""
+    for line in lines:
+        if len(value) + len(line) + 1 > FIELD_LIMIT - 2:
+            return value + "…"
+        value += line + "\n"
+    return value or "Nothing recorded yet"
+
+# Function to describe each operation of one kind: call count, p50/p95 and the mean of its slowest stages.
+def _operation_lines(kind):
+    lines = []
+    operations = sorted(name for name, operation_kind in METRICS.operations.items() if operation_kind == kind)
+    for operation in operations:
+        histogram = METRICS.merged("bot_operation_seconds", operation=operation)
+        errors = METRICS.merged("bot_operation_seconds", operation=operation, outcome="error").count
+        stages = []
+        for stage in STAGES:
+            stage_histogram = METRICS.merged("bot_stage_seconds", operation=operation, stage=stage)
+            if stage_histogram.count:
+                stages.append((stage_histogram.mean, stage))
+        breakdown = " ".join(f"{stage} {_ms(mean)}" for mean, stage in sorted(stages, reverse=True)[:3])
+        lines.append(
+            f"**{operation}** ×{histogram.count}{f' ({errors} failed)' if errors else ''}: "
+            f"p50 {_ms(histogram.quantile(0.5))}, p95 {_ms(histogram.quantile(0.95))}"
+            + (f"\n  {breakdown}" if breakdown else "")
+        )
+    return lines
+
+#Cog for bot operators: runtime statistics without leaving Discord.
+class Admin(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    #Slash command to show command and task latencies, cache hit rates, queue depths and memory use.
+    @app_commands.command(name="botstats", description="Show bot latency, cache and queue statistics")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def botstats(self, interaction: discord.Interaction):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        embed = discord.Embed(title="Bot Statistics", color=get_embed_color())
+        embed.add_field(name="Commands", value=_field(_operation_lines("command")), inline=False)
+        embed.add_field(name="Background Tasks", value=_field(_operation_lines("task")), inline=False)
+
+        caches = {"charts": CHART_CACHE, "market data": MARKET_DATA_CACHE, "performance": PERFORMANCE_CACHE}
+        cache_lines = []
+        for name, cache in caches.items():
+            stats = cache.stats
+            cache_lines.append(
+                f"{name}: {stats['hit_rate']:.0%} of {stats['hits'] + stats['misses']}, {stats['size']} entries"
+            )
+        embed.add_field(name="Caches", value=_field(cache_lines), inline=True)
+
+        io_wait = METRICS.merged("bot_io_wait_seconds")
+        api_wait = METRICS.merged("bot_semaphore_wait_seconds", semaphore=API_SEMAPHORE.name)
+        concurrency_lines = [
+            f"file I/O: {FILE_IO.queue_depth} queued, {min(FILE_IO.pending, FILE_IO.workers)}/{FILE_IO.workers} busy, "
+            f"wait p95 {_ms(io_wait.quantile(0.95))}",
+            f"{API_SEMAPHORE.name}: {API_SEMAPHORE.in_use}/{API_SEMAPHORE.limit} in use, "
+            f"wait p95 {_ms(api_wait.quantile(0.95))}",
+        ]
+        embed.add_field(name="Concurrency", value=_field(concurrency_lines), inline=True)
+
+        send_stats = SEND_SCHEDULER.stats
+        send_lines = [
+            f"{name}: {values['queued']} queued, {values['sent']} sent, wait p95 {_ms(values['wait_p95'])}"
+            for name, values in send_stats.items()
+            if isinstance(values, dict)
+        ]
+        send_lines.append(f"in flight: {send_stats['in_flight']}")
+        embed.add_field(name="Send Queue", value=_field(send_lines), inline=False)
+
+        lag = METRICS.merged("bot_loop_lag_seconds")
+        loop_lines = [f"lag p50 {_ms(lag.quantile(0.5))}, p99 {_ms(lag.quantile(0.99))}"]
+        stalls = METRICS.merged("bot_loop_stall_seconds")
+        if stalls.count:
+            loop_lines.append(f"{stalls.count} stall(s) over {_ms(LOOP_WATCHDOG.threshold)}, most recent:")
+            for stall in reversed(LOOP_WATCHDOG.stalls):
+                loop_lines.append(
+                    f"<t:{int(stall.started_at)}:R> {_ms(stall.duration)} in {stall.operation}: `{stall.location}`"
+                )
+        embed.add_field(name="Event Loop", value=_field(loop_lines), inline=False)
+
+        embed.add_field(name="Memory", value=f"{rss_bytes() / 1e6:.0f} MB RSS", inline=True)
+        embed.add_field(name="Uptime", value=_uptime(time.time() - METRICS.started), inline=True)
+        await send_followup(interaction, embed=embed, ephemeral=True)
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, app_commands.MissingPermissions):
+            message = "You need administrator permissions to use this command."
+        else:
+            print(f"Error in {interaction.command.name if interaction.command else 'admin'} command: {error}")
+            message = "An error occurred while collecting bot statistics."
+        if interaction.response.is_done():
+            await interaction.followup.send(message, ephemeral=True)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -0,0 +1,283 @@
+import asyncio
+import datetime
+import io
+
+from downsample import CHART_POINT_BUDGET, downsample_grid, downsample_indices, time_axis
+from fileio import FILE_IO
+from metrics import stage
+from state import API_SEMAPHORE, HISTORY, HISTORY_LOADED, RENDERER, CHART_CACHE, MARKET_DATA_CACHE, SEASON_START, get_price_store
+
+# Chart ranges offered by /userinfo and /leaderboard.  The fixed lengths count back from the newest snapshot,
+# so a weekend "1d" still shows Friday's session.
+CHART_RANGES = ("1d", "1w", "1m", "season", "custom")
+RANGE_LENGTHS = {
+    "1d": datetime.timedelta(days=1),
+    "1w": datetime.timedelta(weeks=1),
+    "1m": datetime.timedelta(days=30),
+}
+
+# Function to turn a chart range into (start, end) datetimes for HISTORY, None meaning open-ended.  Custom
+# ranges take YYYY-MM-DD start and end dates, both inclusive.  Raises ValueError for dates it can't use,
+# and for dates given with a fixed-length range.
+# The fixed ranges count back from the newest snapshot, so they wait for the history to finish loading.
+async def resolve_chart_range(chart_range="season", start=None, end=None):
+    if chart_range == "custom" or (chart_range == "season" and (start or end)):
+        try:
+            start_at = datetime.datetime.strptime(start, "%Y-%m-%d") if start else None
+            end_at = datetime.datetime.strptime(end, "%Y-%m-%d") + datetime.timedelta(days=1) if end else None
+        except ValueError:
+            raise ValueError("Dates must look like 2025-01-31.")
+        if start_at is not None and end_at is not None and start_at >= end_at:
+            raise ValueError("The start date must be on or before the end date.")
+        return start_at, end_at
+    if chart_range == "season":
+        return SEASON_START, None
+    if chart_range not in RANGE_LENGTHS:
+        raise ValueError(f"Unknown range '{chart_range}', expected one of {', '.join(CHART_RANGES)}.")
+    if start or end:
+        raise ValueError(f"Start and end dates only apply to the custom and season ranges, not {chart_range}.")
+    await HISTORY_LOADED.wait()
+    latest = HISTORY.latest_timestamp
+    return (latest - RANGE_LENGTHS[chart_range] if latest is not None else None), None
+
+# Function to widen a datetime range to whole bars of the given yfinance interval, so nearby requests share a cache entry.
+def normalize_bar_range(start_date, end_date, interval="1d"):
+    import pandas as pd
+    from prices import bar_length
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    if start.tzinfo is not None:
+        start = start.tz_convert(None)
+    if end.tzinfo is not None:
+        end = end.tz_convert(None)
+    if interval.endswith(("d", "wk", "mo")):
+        return start.floor("D"), end.floor("D") + pd.Timedelta(days=1)
+    bar = bar_length(interval)
+    return start.floor(bar), end.ceil(bar)
+
+# Function to fetch price bars for a symbol.  Results are cached per normalized range, and concurrent
+# requests for the same range share a single download.  Returns None when no data is available.
+async def fetch_stock_data(symbol: str, start_date, end_date, interval: str = "1d"):
+    start, end = normalize_bar_range(start_date, end_date, interval)
+    key = (symbol.upper(), interval, start, end)
+    with stage("market_data"):
+        return await MARKET_DATA_CACHE.get_or_create(
+            key, lambda: download_stock_data(symbol, start, end, interval)
+        )
+
+# Function to read bars through the local price store, which only downloads the parts of the range it doesn't have.
+async def download_stock_data(symbol, start, end, interval):
+    async with API_SEMAPHORE:
+        data = await asyncio.to_thread(lambda: get_price_store().get_bars(symbol, start, end, interval))
+    if data is None or data.empty:
+        return None
+    return data
+
+# Function to generate a Plotly graph showing a user's account value over time, along with the S&P 500 for comparison.
+# start and end limit the chart (and the S&P 500 request) to a window; see resolve_chart_range.
+# Rendered charts are cached until the next in_time snapshot arrives.
+async def generate_money_graph(username, start=None, end=None):
+    try:
+        with stage("load"):
+            await HISTORY_LOADED.wait()
+            await FILE_IO.run(HISTORY.refresh, op="history")
+        key = ("money", username, start, end, HISTORY.latest_timestamp)
+        with stage("compute"):
+            chart = await CHART_CACHE.get_or_create(key, lambda: render_money_graph(username, start, end))
+        if chart is None:
+            return None, None, None
+        png, lowest_value, highest_value = chart
+        return io.BytesIO(png), lowest_value, highest_value
+    except Exception as e:
+        print(f"Error generating money graph: {e}")
+        return None, None, None
+
+# Function to build and render the money graph.  Returns (png, lowest, highest), or None if the user has no history.
+async def render_money_graph(username, start=None, end=None):
+    import pandas as pd
+    import plotly.graph_objects as go
+    timestamps, values = HISTORY.series(username, start, end)
+    if len(timestamps) == 0:
+        return None
+
+    # Extremes come from the full series; the downsampled line always passes through them
+    lowest_index = int(values.argmin())
+    highest_index = int(values.argmax())
+    lowest_value = float(values[lowest_index])
+    highest_value = float(values[highest_index])
+    lowest_at = timestamps[lowest_index]
+    highest_at = timestamps[highest_index]
+    if len(timestamps) > CHART_POINT_BUDGET:
+        keep = await asyncio.to_thread(downsample_indices, time_axis(timestamps), values)
+        timestamps, values = timestamps[keep], values[keep]
+
+    timestamps = pd.DatetimeIndex(timestamps).tz_localize('UTC')
+    start_date = timestamps[0]
+    end_date = timestamps[-1]
+
+    try:
+        spy_data = await fetch_stock_data("SPY", start_date, end_date)
+        if spy_data is not None:
+            # The cached frame is shared, so work on the Close series rather than modifying it
+            spy_close = spy_data['Close']
+            if isinstance(spy_close, pd.DataFrame):
+                spy_close = spy_close.iloc[:, 0]
+            spy_values = spy_close * (100000 / spy_close.iloc[0])
+
+            if spy_values.index.tz is None:
+                spy_values.index = spy_values.index.tz_localize('UTC')
+        else:
+            spy_values = None
+    except Exception as e:
+        print(f"Error fetching S&P 500 data: {e}")
+        spy_values = None
+
+    fig = go.Figure()
+
+    fig.add_trace(
+        go.Scatter(
+            x=timestamps,
+            y=values,
+            name=username,
+            line=dict(color='rgb(0, 100, 255)', width=2.5),
+            mode='lines+markers',
+            marker=dict(size=6)
+        )
+    )
+
+    if spy_values is not None:
+        fig.add_trace(
+            go.Scatter(
+                x=spy_values.index,
+                y=spy_values,
+                name='S&P 500 ($100k invested)',
+                line=dict(color='gray', dash='dash'),
+                opacity=0.5
+            )
+        )
+
+    fig.add_trace(
+        go.Scatter(
+            x=[pd.Timestamp(lowest_at).tz_localize('UTC')],
+            y=[lowest_value],
+            mode='markers+text',
+            name='Lowest',
+            marker=dict(color='red', size=12),
+            text=[f'${lowest_value:,.2f}'],
+            textposition='top center'
+        )
+    )
+
+    fig.add_trace(
+        go.Scatter(
+            x=[pd.Timestamp(highest_at).tz_localize('UTC')],
+            y=[highest_value],
+            mode='markers+text',
+            name='Highest',
+            marker=dict(color='green', size=12),
+            text=[f'${highest_value:,.2f}'],
+            textposition='top center'
+        )
+    )
+
+    fig.update_layout(
+        title=dict(
+            text=f"Account Value Over Time - {username}",
+            x=0.05,
+            font=dict(size=16)
+        ),
+        xaxis_title="Time",
+        yaxis_title="Account Value ($)",
+        template="plotly_dark",
+        plot_bgcolor='rgba(44, 47, 51, 1)',
+        paper_bgcolor='rgba(44, 47, 51, 1)',
+        font=dict(color='white'),
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01
+        ),
+        margin=dict(t=30, l=10, r=10, b=10)
+    )
+
+    fig.update_yaxes(tickprefix="$", tickformat=",.0f")
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
+
+    with stage("render"):
+        return await RENDERER.render(fig), lowest_value, highest_value
+
+# Function to generate a Plotly graph showing the top 10 users' performance over time.
+# start and end limit the chart to a window; see resolve_chart_range.
+# Rendered charts are cached until the next in_time snapshot arrives.
+async def generate_leaderboard_graph(usernames, start=None, end=None):
+    with stage("load"):
+        await HISTORY_LOADED.wait()
+        await FILE_IO.run(HISTORY.refresh, op="history")
+    key = ("leaderboard", tuple(usernames), start, end, HISTORY.latest_timestamp)
+    with stage("compute"):
+        png = await CHART_CACHE.get_or_create(key, lambda: render_leaderboard_graph(usernames, start, end))
+    return io.BytesIO(png) if png else None
+
+# Function to build and render the leaderboard graph for the given users.  Returns PNG bytes or None.
+async def render_leaderboard_graph(usernames, start=None, end=None):
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+    timestamps, values = HISTORY.frame(usernames, start, end)
+
+    if len(timestamps) == 0:
+        return None
+    # One shared grid, so every user's line is drawn at the same snapshots
+    if len(timestamps) > CHART_POINT_BUDGET:
+        keep = await asyncio.to_thread(downsample_grid, time_axis(timestamps), values)
+        timestamps, values = timestamps[keep], values[:, keep]
+
+    fig = go.Figure()
+
+    colors = qualitative.Set3
+    for i, username in enumerate(usernames):
+        fig.add_trace(
+            go.Scatter(
+                x=timestamps,
+                y=values[i],
+                name=username,
+                line=dict(color=colors[i % len(colors)], width=2),
+                mode='lines+markers',
+                marker=dict(size=4)
+            )
+        )
+
+    fig.update_layout(
+        title=dict(
+            text="Top 10 Users Performance Over Time",
+            x=0.05,
+            font=dict(size=16)
+        ),
+        xaxis_title="Time",
+        yaxis_title="Account Value ($)",
+        template="plotly_dark",
+        plot_bgcolor='rgba(44, 47, 51, 1)',
+        paper_bgcolor='rgba(44, 47, 51, 1)',
+        font=dict(color='white'),
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01
+        ),
+        margin=dict(t=30, l=10, r=10, b=10)
+    )
+
+    fig.update_yaxes(tickprefix="$", tickformat=",.0f")
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
+
+    with stage("render"):
+        return await RENDERER.render(fig)
+
+# Chart builders only; loaded as an extension so a reload picks up changes here too.
+async def setup(bot):
+    pass
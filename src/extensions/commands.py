@@ -0,0 +1,265 @@
+from typing import Optional
+
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from metrics import instrumented
+from performance import WINDOWS
+from state import RANK_INDEX, USERNAME_AUTOCOMPLETE
+from extensions.common import (
+    load_account,
+    load_leaderboard,
+    load_leaderboard_snapshot,
+    format_top_accounts,
+    get_embed_color,
+    get_pst_time,
+    send_followup,
+)
+from extensions.charts import CHART_RANGES, generate_money_graph, generate_leaderboard_graph, resolve_chart_range
+from extensions.reports import get_performance
+
+RANGE_CHOICES = [
+    app_commands.Choice(name=name, value=value)
+    for name, value in zip(("1 day", "1 week", "1 month", "Season", "Custom dates"), CHART_RANGES)
+]
+RANGE_DESCRIPTIONS = dict(
+    chart_range="Period to chart (default: season)",
+    start="First day for custom dates, YYYY-MM-DD",
+    end="Last day for custom dates, YYYY-MM-DD",
+)
+
+#Cog to handle user information related commands.
+class UserInfo(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    #Slash command to get user information.  Uses autocompletion for usernames.
+    @app_commands.command(name="userinfo", description="Get user information")
+    @app_commands.describe(username="Select a username", **RANGE_DESCRIPTIONS)
+    @app_commands.rename(chart_range="range")
+    @app_commands.choices(chart_range=RANGE_CHOICES)
+    @instrumented("userinfo")
+    async def userinfo(
+        self,
+        interaction: discord.Interaction,
+        username: str,
+        chart_range: str = "season",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ):
+        try:
+            await interaction.response.defer(thinking=True)
+        except Exception as e:
+            print(f"Failed to defer interaction: {e}")
+            return
+
+        try:
+            try:
+                window = await resolve_chart_range(chart_range, start, end)
+            except ValueError as e:
+                await send_followup(interaction, str(e))
+                return
+
+            account = await load_account(username)
+            if account is None:
+                await send_followup(interaction, f"User '{username}' not found.")
+                return
+
+            embed = discord.Embed(
+                colour=get_embed_color(),
+                title=f"Information for {account.name}",
+                description=(
+                    f"**Current Money:** {account.money}\n\n"
+                    f"**Current Holdings:**\n{account.holdings_text}"
+                ),
+                timestamp=get_pst_time(),
+            )
+
+            try:
+                graph_buffer, lowest_value, highest_value = await generate_money_graph(username, *window)
+                if graph_buffer:
+                    file = discord.File(graph_buffer, filename="money_graph.png")
+                    embed.set_image(url="attachment://money_graph.png")
+                    if lowest_value is not None and highest_value is not None:
+                        embed.add_field(
+                            name="📈 Highest Value",
+                            value=f"${highest_value:,.2f}",
+                            inline=True,
+                        )
+                        embed.add_field(
+                            name="📉 Lowest Value",
+                            value=f"${lowest_value:,.2f}",
+                            inline=True,
+                        )
+                    await send_followup(interaction, embed=embed, file=file)
+                else:
+                    await send_followup(interaction, embed=embed)
+            except Exception as graph_error:
+                print(f"Error generating graph: {graph_error}")
+                await send_followup(interaction, embed=embed)
+
+        except Exception as e:
+            print(f"Error in userinfo command: {e}")
+            await send_followup(interaction, f"Error fetching user info: {str(e)}")
+
+    #Autocomplete function for the username parameter of the /userinfo command.
+    @userinfo.autocomplete("username")
+    async def username_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return [
+            app_commands.Choice(name=username, value=username)
+            for username in USERNAME_AUTOCOMPLETE.search(current)
+        ]
+
+#Cog for the leaderboard, rank and performance slash commands.
+class Leaderboard(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    #Slash command to display the current leaderboard. Includes a graph of top 5 users' performance.
+    @app_commands.command(name="leaderboard", description="Get current leaderboard")
+    @app_commands.describe(**RANGE_DESCRIPTIONS)
+    @app_commands.rename(chart_range="range")
+    @app_commands.choices(chart_range=RANGE_CHOICES)
+    @instrumented("leaderboard")
+    async def leaderboard(
+        self,
+        interaction: discord.Interaction,
+        chart_range: str = "season",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ):
+        await interaction.response.defer()
+        try:
+            try:
+                window = await resolve_chart_range(chart_range, start, end)
+            except ValueError as e:
+                await send_followup(interaction, str(e))
+                return
+
+            current_data = await load_leaderboard()
+            if not current_data:
+                await send_followup(interaction, "Error loading leaderboard data")
+                return
+
+            top_users = current_data.top(5)
+            description = format_top_accounts(top_users)
+
+            embed = discord.Embed(
+                colour=get_embed_color(),
+                title="📊 Current Leaderboard",
+                description=description,
+                timestamp=get_pst_time(),
+            )
+
+            graph_buffer = await generate_leaderboard_graph([account.name for account in top_users], *window)
+            if graph_buffer:
+                file = discord.File(graph_buffer, filename="leaderboard_graph.png")
+                embed.set_image(url="attachment://leaderboard_graph.png")
+                await send_followup(interaction, embed=embed, file=file)
+            else:
+                await send_followup(interaction, embed=embed)
+
+        except Exception as e:
+            print(f"Error in leaderboard command: {str(e)}")
+            await send_followup(interaction, f"Error fetching leaderboard: {str(e)}")
+
+    #Slash command to show where a player stands, with the players directly above and below and the gap in dollars.
+    @app_commands.command(name="rank", description="Show a player's rank and the players around them")
+    @app_commands.describe(username="Select a username")
+    @instrumented("rank")
+    async def rank(self, interaction: discord.Interaction, username: str):
+        await interaction.response.defer()
+        try:
+            # Make sure the index reflects the latest snapshot; this is a stat call unless the file changed
+            await load_leaderboard_snapshot()
+            position = RANK_INDEX.rank(username)
+            if position is None:
+                await send_followup(interaction, f"User '{username}' not found.")
+                return
+
+            _, _, money = RANK_INDEX.at(position)
+            above, below = RANK_INDEX.neighbours(username)
+            description = f"**#{position} of {len(RANK_INDEX)} - {username}**\nMoney: ${money:,.2f}\n\n"
+            for other_rank, other_name, other_money in above:
+                description += f"⬆️ #{other_rank} - {other_name}: ${other_money:,.2f} (${other_money - money:,.2f} ahead)\n"
+            for other_rank, other_name, other_money in below:
+                description += f"⬇️ #{other_rank} - {other_name}: ${other_money:,.2f} (${money - other_money:,.2f} behind)\n"
+
+            embed = discord.Embed(
+                colour=get_embed_color(),
+                title=f"🏅 Rank for {username}",
+                description=description,
+                timestamp=get_pst_time(),
+            )
+            await send_followup(interaction, embed=embed)
+
+        except Exception as e:
+            print(f"Error in rank command: {str(e)}")
+            await send_followup(interaction, f"Error fetching rank: {str(e)}")
+
+    @rank.autocomplete("username")
+    async def rank_username_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=username, value=username)
+            for username in USERNAME_AUTOCOMPLETE.search(current)
+        ]
+
+    #Slash command to show the best and worst returns, biggest moves and most active traders over a window.
+    @app_commands.command(name="performance", description="Show returns over the day, week, month or season")
+    @app_commands.describe(window="Period to measure")
+    @app_commands.choices(window=[app_commands.Choice(name=window.capitalize(), value=window) for window in WINDOWS])
+    @instrumented("performance")
+    async def performance(self, interaction: discord.Interaction, window: str):
+        await interaction.response.defer()
+        try:
+            report, start = await get_performance(window)
+            if report is None or not len(report):
+                await send_followup(interaction, f"Not enough history for the {window} window yet.")
+                return
+
+            def format_rows(rows):
+                return "\n".join(
+                    f"**{p['username']}**: {p['change_percent']:+.2f}% (${p['change_amount']:,.2f}) - {p['trades']} trades"
+                    for p in rows
+                )
+
+            embed = discord.Embed(
+                colour=get_embed_color(),
+                title=f"📈 {window.capitalize()} Performance",
+                description=f"Since {start.strftime('%A, %B %d, %Y %I:%M %p')} - {report.total_trades} trades across {len(report)} accounts",
+                timestamp=get_pst_time(),
+            )
+            embed.add_field(name="🏆 Top Performers", value=format_rows(report.top(5)), inline=False)
+            embed.add_field(name="📉 Bottom Performers", value=format_rows(report.bottom(3)), inline=False)
+
+            gain = report.biggest_gain()
+            if gain:
+                embed.add_field(
+                    name="🚀 Biggest Gain",
+                    value=f"**{gain['username']}**\n{gain['change_percent']:+.2f}% (${gain['change_amount']:,.2f})",
+                    inline=True,
+                )
+            loss = report.biggest_loss()
+            if loss:
+                embed.add_field(
+                    name="💥 Biggest Loss",
+                    value=f"**{loss['username']}**\n{loss['change_percent']:+.2f}% (${loss['change_amount']:,.2f})",
+                    inline=True,
+                )
+            active_text = "\n".join(f"**{p['username']}**: {p['trades']} trades" for p in report.most_active(3))
+            if active_text:
+                embed.add_field(name="⚡ Most Active Traders", value=active_text, inline=False)
+
+            await send_followup(interaction, embed=embed)
+
+        except Exception as e:
+            print(f"Error in performance command: {str(e)}")
+            await send_followup(interaction, f"Error fetching performance: {str(e)}")
+
+# Function to add the command cogs to the bot.
+async def setup(bot):
+    await bot.add_cog(UserInfo(bot))
+    await bot.add_cog(Leaderboard(bot))
@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+import os
+from typing import Optional, Any, Mapping
+
+from fileio import FILE_IO
+from leaderboard import Account, Leaderboard
+from metrics import stage
+from outbox import INTERACTION, BULK
+from state import PST, TASK_QUEUE, LEADERBOARD_LOADER, SEND_SCHEDULER, USER_RECORDS
+
+# Function to run a coroutine in the background, tracked in TASK_QUEUE so shutdown can cancel it.
+def spawn_task(coro):
+    task = asyncio.create_task(coro)
+    TASK_QUEUE.append(task)
+    task.add_done_callback(lambda done: done in TASK_QUEUE and TASK_QUEUE.remove(done))
+    return task
+
+async def cleanup_tasks():
+    while TASK_QUEUE:
+        task = TASK_QUEUE.popleft()
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+# Function to get the current parsed snapshot of leaderboard-latest.json.  The file is only re-read when it
+# changes on disk, and every caller shares the same snapshot.  Returns None if it can't be loaded.
+async def load_leaderboard_snapshot():
+    try:
+        with stage("load"):
+            return await LEADERBOARD_LOADER.get()
+    except Exception as e:
+        print(f"Error loading leaderboard data: {e}")
+        return None
+
+# Function to load the raw {username: [money, link, holdings]} leaderboard mapping.  Treat it as read-only.
+async def load_leaderboard_data() -> Optional[Mapping[str, Any]]:
+    snapshot = await load_leaderboard_snapshot()
+    return snapshot.data if snapshot else None
+
+# Function to load the parsed Leaderboard model.
+async def load_leaderboard() -> Optional[Leaderboard]:
+    snapshot = await load_leaderboard_snapshot()
+    return snapshot.leaderboard if snapshot else None
+
+# Function to load one account straight from leaderboard-latest.json, decoding only that user's record, so the
+# cost doesn't grow with the number of players.  Falls back to the shared snapshot if the file can't be read.
+# Returns None if the user isn't on the leaderboard; the account's rank isn't filled in.
+async def load_account(username) -> Optional[Account]:
+    try:
+        with stage("load"):
+            record = await FILE_IO.run(USER_RECORDS.lookup, username, op="user_record")
+    except Exception as e:
+        print(f"Error reading {username} from the leaderboard file: {e}")
+        leaderboard = await load_leaderboard()
+        return leaderboard.get(username) if leaderboard else None
+    return Account.from_record(username, record) if record is not None else None
+
+# Function to format the top accounts for the leaderboard embeds.
+def format_top_accounts(accounts):
+    description = ""
+    for account in accounts:
+        description += f"**#{account.rank} - {account.name}**\n"
+        description += f"Money: ${account.money:,.2f}\n\n"
+    return description
+
+# Helper function to get the current time in PST.
+def get_pst_time():
+    return datetime.datetime.now(PST)
+
+# Function to determine the embed color based on a testing flag.
+def get_embed_color():
+    testing = os.environ.get('TESTING', 'false').lower() == 'true'
+    return 0xFF69B4 if testing else 0x0000FF
+
+# Function to send an interaction follow-up ahead of any queued background posts.
+async def send_followup(interaction, content=None, **kwargs):
+    with stage("send"):
+        return await SEND_SCHEDULER.send(
+            interaction.followup, INTERACTION, bucket=("interaction", interaction.id), content=content, **kwargs
+        )
+
+# Function to queue a bulk notification (stock changes, errors from background tasks).
+async def send_bulk(channel, **kwargs):
+    with stage("send"):
+        return await SEND_SCHEDULER.send(channel, BULK, **kwargs)
+
+# Shared helpers only; loaded as an extension so a reload picks up changes here too.
+async def setup(bot):
+    pass
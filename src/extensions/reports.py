@@ -0,0 +1,51 @@
+import asyncio
+import datetime
+import json
+import os
+
+from fileio import FILE_IO
+from metrics import stage
+from performance import compute_performance, window_start
+from state import IN_TIME_DIR, EST, SEASON_START, HISTORY, HISTORY_LOADED, PERFORMANCE_CACHE
+from extensions.common import load_leaderboard_snapshot
+
+#Function to load the in_time snapshot taken at a history timestamp, reading it from the archive if the file is gone.
+def load_history_snapshot(timestamp):
+    path = os.path.join(IN_TIME_DIR, timestamp.strftime("leaderboard-%Y-%m-%d-%H_%M.json"))
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    archive = HISTORY.archive
+    if archive is not None:
+        index = archive.timestamps.searchsorted(timestamp)
+        if index < len(archive) and archive.timestamps[index].astype(datetime.datetime) == timestamp:
+            return archive.snapshot(index)
+    return None
+
+#Function to get the performance report for a window ("day", "week", "month" or "season") up to the current leaderboard.
+#Returns (report, start timestamp), or (None, None) if there's no snapshot old enough to compare against.
+async def get_performance(window):
+    snapshot = await load_leaderboard_snapshot()
+    if snapshot is None:
+        return None, None
+    with stage("load"):
+        await HISTORY_LOADED.wait()
+        await FILE_IO.run(HISTORY.refresh, op="history")
+    start = HISTORY.first_at_or_after(window_start(window, datetime.datetime.now(EST), SEASON_START))
+    if start is None:
+        return None, None
+
+    async def build():
+        with stage("load"):
+            start_data = await FILE_IO.run(load_history_snapshot, start, op="read")
+        if start_data is None:
+            return None
+        with stage("compute"):
+            return await asyncio.to_thread(compute_performance, [start_data, snapshot.data], [None, snapshot.holdings])
+
+    report = await PERFORMANCE_CACHE.get_or_create((window, start, snapshot.digest), build)
+    return report, (start if report is not None else None)
+
+# Report helpers only; loaded as an extension so a reload picks up changes here too.
+async def setup(bot):
+    pass
@@ -0,0 +1,335 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import traceback
+
+import discord
+from discord.ext import commands
+
+import state
+from fileio import FILE_IO
+from holdings import HoldingsTable, diff_holdings
+from market import is_market_open
+from metrics import instrumented, stage
+from notifier import notification_key
+from outbox import SCHEDULED
+from performance import compute_performance
+from state import (
+    LEADERBOARD_LATEST,
+    SNAPSHOT_PATH,
+    MORNING_SNAPSHOT_PATH,
+    EST,
+    SEND_SCHEDULER,
+    STOCK_NOTIFIER,
+    PERFORMANCE_CACHE,
+    LEADERBOARD_LOADER,
+    MARKET_SCHEDULER,
+)
+from extensions.common import (
+    load_leaderboard,
+    load_leaderboard_snapshot,
+    format_top_accounts,
+    get_embed_color,
+    get_pst_time,
+    send_bulk,
+    spawn_task,
+)
+from extensions.charts import generate_leaderboard_graph
+
+# Minimum time between the in-session leaderboard updates triggered by new data.
+LEADERBOARD_UPDATE_INTERVAL = datetime.timedelta(minutes=30)
+
+# Function to read the morning snapshot on an I/O thread.  Returns (content hash, parsed data).
+def _read_morning_snapshot():
+    with open(MORNING_SNAPSHOT_PATH, "rb") as f:
+        raw = f.read()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest(), json.loads(raw)
+
+#Cog for the scheduled posts: leaderboard updates at the open, close and every 30 minutes in between, stock change
+#notifications and the end of day summary.  The hooks are registered on load and removed on unload, so a reload
+#swaps them for the new code instead of adding a second copy.
+class MarketUpdates(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        # Held while a leaderboard post is running so the open, close and 30 minute posts never overlap
+        self._post_lock = asyncio.Lock()
+        # Set from the moment a 30 minute post is spawned until it finishes, so further new data doesn't queue another
+        self._update_pending = False
+
+    async def cog_load(self):
+        MARKET_SCHEDULER.on("open", self.on_market_open)
+        MARKET_SCHEDULER.on("close", self.on_market_close)
+        LEADERBOARD_LOADER.add_listener(self.on_new_leaderboard_data)
+
+    async def cog_unload(self):
+        MARKET_SCHEDULER.off("open", self.on_market_open)
+        MARKET_SCHEDULER.off("close", self.on_market_close)
+        LEADERBOARD_LOADER.remove_listener(self.on_new_leaderboard_data)
+
+    # Function to compare stock holdings between the current and previous leaderboards and send updates to Discord.
+    @instrumented("compare_stock_changes", kind="task")
+    async def compare_stock_changes(self, channel):
+        try:
+            snapshot = await load_leaderboard_snapshot()
+            if snapshot is None:
+                raise FileNotFoundError(LEADERBOARD_LATEST)
+
+            snapshot_path = SNAPSHOT_PATH
+            try:
+                with stage("load"):
+                    previous_raw = await FILE_IO.read_bytes(snapshot_path)
+            except FileNotFoundError:
+                previous_raw = None
+            if previous_raw is not None:
+                scope = hashlib.blake2b(previous_raw, digest_size=16).hexdigest()
+
+                # The previous snapshot is normally the one compared last time, so its parsed holdings are reused
+                with stage("compute"):
+                    if state.LAST_COMPARED_HOLDINGS is not None and state.LAST_COMPARED_HOLDINGS[0] == scope:
+                        previous_holdings = state.LAST_COMPARED_HOLDINGS[1]
+                    else:
+                        previous_holdings = await asyncio.to_thread(lambda: HoldingsTable.from_dict(json.loads(previous_raw)))
+                    diff = await asyncio.to_thread(diff_holdings, previous_holdings, snapshot.holdings)
+
+                changes = []
+                for username, user_changes in diff.by_user().items():
+                    description = ""
+                    for kind, ticker, value_before, value_after, delta in user_changes:
+                        if kind == "opened":
+                            description += f"+ Bought {ticker} (${value_after:,.2f})\n"
+                        elif kind == "closed":
+                            description += f"- Sold {ticker} (${value_before:,.2f})\n"
+                        elif kind == "increased":
+                            description += f"↑ Added ${delta:,.2f} to {ticker}\n"
+                        else:
+                            description += f"↓ Trimmed ${-delta:,.2f} from {ticker}\n"
+
+                    embed = discord.Embed(
+                        colour=discord.Colour.green(),
+                        title=f"Stock Changes for {username}",
+                        description=description,
+                        timestamp=get_pst_time(),
+                    )
+                    changes.append((notification_key(username, description), embed))
+
+                if changes:
+                    stock_channel = self.bot.get_channel(int(os.environ.get("DISCORD_CHANNEL_ID_Stocks")))
+                    if stock_channel:
+                        with stage("send"):
+                            await STOCK_NOTIFIER.send(stock_channel, scope, changes)
+
+            await FILE_IO.write(snapshot_path, snapshot.raw)
+            state.LAST_COMPARED_HOLDINGS = (snapshot.digest, snapshot.holdings)
+            await STOCK_NOTIFIER.complete()
+
+        except Exception as e:
+            await send_bulk(channel, content=f"Error comparing stock changes: {str(e)}")
+            traceback.print_exc()
+
+    #Function to post a leaderboard update with the given footer to the leaderboard channel, then check for stock changes.
+    #Callers hold _post_lock.
+    @instrumented("post_leaderboard_update", kind="task")
+    async def post_leaderboard_update(self, footer):
+        try:
+            current_data = await load_leaderboard()
+            if not current_data:
+                return
+
+            leaderboard_channel = self.bot.get_channel(int(os.environ.get("DISCORD_CHANNEL_ID_Leaderboard")))
+            if not leaderboard_channel:
+                return
+
+            permissions = leaderboard_channel.permissions_for(leaderboard_channel.guild.me)
+            if not permissions.send_messages or not permissions.embed_links:
+                return
+
+            top_users = current_data.top(5)
+            description = format_top_accounts(top_users)
+
+            embed = discord.Embed(
+                colour=get_embed_color(),
+                title="📊 Leaderboard Update",
+                description=description,
+                timestamp=get_pst_time(),
+            )
+            embed.set_footer(text=footer)
+
+            graph_buffer = await generate_leaderboard_graph([account.name for account in top_users])
+            if graph_buffer:
+                file = discord.File(graph_buffer, filename="leaderboard_graph.png")
+                embed.set_image(url="attachment://leaderboard_graph.png")
+                # A newer leaderboard post replaces one that hasn't gone out yet
+                with stage("send"):
+                    await SEND_SCHEDULER.send(
+                        leaderboard_channel, SCHEDULED, coalesce_key="leaderboard-update", embed=embed, file=file
+                    )
+                await state.save_last_update_time(datetime.datetime.now(EST))  # Update the timestamp after successful send
+
+            # Also trigger stock changes check
+            await self.compare_stock_changes(leaderboard_channel)
+
+        except Exception as e:
+            print(f"Error posting leaderboard update: {str(e)}")
+            traceback.print_exc()
+
+    #Market open handler: take the morning snapshot for the daily summary and post the opening leaderboard.
+    async def on_market_open(self, when):
+        async with self._post_lock:
+            await self.create_morning_snapshot()
+            print(f"Created morning snapshot at {when}")
+            await self.post_leaderboard_update("Market Open Update")
+
+    #Market close handler: post the closing leaderboard and the end of day summary.
+    async def on_market_close(self, when):
+        async with self._post_lock:
+            await self.post_leaderboard_update("Market Close Update")
+        await self.send_daily_summary(when)
+
+    #Leaderboard change listener: while the market is open, post an update when new data lands and the last one is 30 minutes old.
+    async def on_new_leaderboard_data(self, snapshot):
+        now = datetime.datetime.now(EST)
+        if not is_market_open(now) or not self._update_due(now):
+            return
+        # Skip while another post is running or queued; it covers this data too
+        if self._update_pending or self._post_lock.locked():
+            return
+        self._update_pending = True
+        # Run detached so the loader isn't held up while the chart renders
+        spawn_task(self._post_timed_update())
+
+    #Function to check whether the last leaderboard post is old enough for another 30 minute update.
+    def _update_due(self, now):
+        return state.LAST_LEADERBOARD_UPDATE is None or now - state.LAST_LEADERBOARD_UPDATE >= LEADERBOARD_UPDATE_INTERVAL
+
+    #Function to post the 30 minute update, unless an open or close post went out while this one was waiting.
+    async def _post_timed_update(self):
+        try:
+            async with self._post_lock:
+                if self._update_due(datetime.datetime.now(EST)):
+                    await self.post_leaderboard_update("30 Minute Update")
+        finally:
+            self._update_pending = False
+
+    #Function to send a daily summary at the end of the trading day.  Compares the morning snapshot to the end-of-day data.
+    @instrumented("send_daily_summary", kind="task")
+    async def send_daily_summary(self, now):
+        try:
+            # Load the morning snapshot if there is one
+            try:
+                with stage("load"):
+                    morning_digest, morning_data = await FILE_IO.run(_read_morning_snapshot, op="read")
+            except FileNotFoundError:
+                print("No morning snapshot found, skipping daily summary")
+                return
+
+            snapshot = await load_leaderboard_snapshot()
+            if snapshot is None:
+                print("No current data available, skipping daily summary")
+                return
+
+            # Calculate stats only if we have both morning and current data
+            key = ("morning", morning_digest, snapshot.digest)
+            with stage("compute"):
+                report = await PERFORMANCE_CACHE.get_or_create(
+                    key,
+                    lambda: asyncio.to_thread(compute_performance, [morning_data, snapshot.data], [None, snapshot.holdings]),
+                )
+            stats = report.summary()
+
+            # Only send summary if there are actual changes
+            if stats["total_trades"] > 0 or any(p["change_amount"] != 0 for p in stats["performance"]):
+                channel = self.bot.get_channel(int(os.environ.get("DISCORD_CHANNEL_ID_Leaderboard")))
+                if not channel:
+                    print("Could not find leaderboard channel")
+                    return
+
+                embed = discord.Embed(
+                    colour=get_embed_color(),
+                    title="📊 End of Day Trading Summary",
+                    description=f"Market Close Summary for {now.strftime('%A, %B %d, %Y')}",
+                    timestamp=get_pst_time(),
+                )
+
+                # Only add fields if there's meaningful data
+                embed.add_field(
+                    name="📈 Market Activity",
+                    value=f"Total Trades Today: {stats['total_trades']}\n",
+                    inline=False,
+                )
+
+                if stats["performance"]:
+                    top_text = "\n".join(
+                        [
+                            f"**{p['username']}**: {p['change_percent']:+.2f}% (${p['change_amount']:,.2f}) - {p['trades']} trades"
+                            for p in stats["performance"][:3]
+                            if abs(p["change_percent"]) > 0.01 or p["trades"] > 0
+                        ]
+                    )
+                    if top_text:
+                        embed.add_field(name="🏆 Top Performers", value=top_text, inline=False)
+
+                    bottom_text = "\n".join(
+                        [
+                            f"**{p['username']}**: {p['change_percent']:+.2f}% (${p['change_amount']:,.2f}) - {p['trades']} trades"
+                            for p in stats["performance"][-3:]
+                            if abs(p["change_percent"]) > 0.01 or p["trades"] > 0
+                        ]
+                    )
+                    if bottom_text:
+                        embed.add_field(name="📉 Needs Improvement", value=bottom_text, inline=False)
+
+                if stats["biggest_gain"]["username"] and abs(stats["biggest_gain"]["percent"]) > 0.01:
+                    embed.add_field(
+                        name="🚀 Biggest Gain",
+                        value=f"**{stats['biggest_gain']['username']}**\n{stats['biggest_gain']['percent']:+.2f}% (${stats['biggest_gain']['amount']:,.2f})",
+                        inline=True,
+                    )
+
+                if stats["biggest_loss"]["username"] and abs(stats["biggest_loss"]["percent"]) > 0.01:
+                    embed.add_field(
+                        name="💥 Biggest Loss",
+                        value=f"**{stats['biggest_loss']['username']}**\n{stats['biggest_loss']['percent']:+.2f}% (${stats['biggest_loss']['amount']:,.2f})",
+                        inline=True,
+                    )
+
+                active_text = "\n".join(
+                    [f"**{p['username']}**: {p['trades']} trades" for p in stats["most_active"] if p["trades"] > 0]
+                )
+                if active_text:
+                    embed.add_field(name="⚡ Most Active Traders", value=active_text, inline=False)
+
+                if len(embed.fields) > 1:  # Only send if there's meaningful data
+                    with stage("send"):
+                        await SEND_SCHEDULER.send(channel, SCHEDULED, coalesce_key="daily-summary", embed=embed)
+                else:
+                    print("No meaningful changes to report in daily summary")
+
+            # Clean up the morning snapshot after sending the summary
+            try:
+                await FILE_IO.remove(MORNING_SNAPSHOT_PATH)
+                print("Removed morning snapshot file")
+            except Exception as e:
+                print(f"Error removing morning snapshot: {e}")
+
+        except Exception as e:
+            print(f"Error in send_daily_summary: {e}")
+            traceback.print_exc()
+
+    #Asynchronous function to create a snapshot of the leaderboard data at the beginning of the day.
+    @instrumented("create_morning_snapshot", kind="task")
+    async def create_morning_snapshot(self):
+        try:
+            snapshot = await load_leaderboard_snapshot()
+            if snapshot is None:
+                return
+
+            await FILE_IO.write(MORNING_SNAPSHOT_PATH, snapshot.raw)
+
+        except Exception as e:
+            print(f"Error creating morning snapshot: {e}")
+
+# Function to add the MarketUpdates cog to the bot.
+async def setup(bot):
+    await bot.add_cog(MarketUpdates(bot))
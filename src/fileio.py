@@ -0,0 +1,139 @@
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+# Threads for file I/O.  Every read, parse and write of the bot's files runs on this one bounded pool
+# rather than on the event loop or the default executor, so a burst of snapshot reads queues up here
+# instead of holding up the loop or the threads used for charts and market data.
+IO_WORKERS = int(os.environ.get('IO_WORKERS', 3))
+
+# Function to write data (bytes or str) to path atomically: readers see the old file or the new one, never a mix.
+def atomic_write(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Unique per thread, so two writes to the same path can't trample each other's temp file
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w' if isinstance(data, str) else 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _read(path, binary):
+    with open(path, 'rb' if binary else 'r') as f:
+        return f.read()
+
+def _read_json(path):
+    with open(path, 'rb') as f:
+        return json.loads(f.read())
+
+def _read_many(paths, parse):
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            results.append(None)
+            continue
+        results.append(parse(raw) if parse is not None else raw)
+    return results
+
+def _write_many(items):
+    for path, data in items:
+        atomic_write(path, data)
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+# Runs blocking file work on IO_WORKERS threads.  Every method is a coroutine that waits for the work
+# without blocking the loop; the read_many/write_many batches do several files in one trip to the pool.
+# Queue depth and per-operation wait and run times go to the metrics registry.
+class FileIO:
+    def __init__(self, workers=IO_WORKERS, registry=METRICS):
+        self.workers = workers
+        self.registry = registry
+        self.pending = 0
+        self._executor = None
+
+    # Jobs submitted but not yet picked up by a thread.
+    @property
+    def queue_depth(self):
+        return max(self.pending - self.workers, 0)
+
+    # Run func(*args) on an I/O thread, copying the caller's context like asyncio.to_thread.  op names the
+    # operation in bot_io_seconds and bot_io_wait_seconds.
+    async def run(self, func, *args, op="call"):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="file-io")
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+        started = []
+
+        def job():
+            started.append(time.perf_counter())
+            return context.run(func, *args)
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self.pending -= 1
+            if started:
+                self.registry.observe("bot_io_wait_seconds", started[0] - submitted, op=op)
+                self.registry.observe("bot_io_seconds", time.perf_counter() - started[0], op=op)
+
+    async def read_bytes(self, path):
+        return await self.run(_read, path, True, op="read")
+
+    async def read_text(self, path):
+        return await self.run(_read, path, False, op="read")
+
+    # Read and parse a JSON file, both on the I/O thread.
+    async def read_json(self, path):
+        return await self.run(_read_json, path, op="read")
+
+    # Read several files in one job.  Returns a list in the same order, with None for missing files;
+    # parse(raw bytes), if given, runs on the I/O thread too.
+    async def read_many(self, paths, parse=None):
+        return await self.run(_read_many, list(paths), parse, op="read")
+
+    async def write(self, path, data):
+        await self.run(atomic_write, path, data, op="write")
+
+    # Serialize and write a JSON file, both on the I/O thread.
+    async def write_json(self, path, value):
+        await self.run(lambda: atomic_write(path, json.dumps(value)), op="write")
+
+    # Write several (path, data) pairs in one job, each atomically.
+    async def write_many(self, items):
+        await self.run(_write_many, list(items), op="write")
+
+    # Delete a file.  Returns False if it was already gone.
+    async def remove(self, path):
+        return await self.run(_remove, path, op="remove")
+
+    # Waits for queued writes to finish.
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# The process-wide I/O pool.
+FILE_IO = FileIO()
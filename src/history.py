@@ -0,0 +1,309 @@
+import datetime
+import json
+import os
+import threading
+
+import numpy as np
+
+# Function to parse the timestamp from a leaderboard filename.
+def parse_leaderboard_timestamp(filename):
+    timestamp_str = filename[len('leaderboard-'):-len('.json')]
+    return datetime.datetime.strptime(timestamp_str, '%Y-%m-%d-%H_%M')
+
+# Read-only picture of the history at one moment: the sorted time axis, the order that sorts base + in-memory
+# columns, and views of the in-memory arrays.  HistoryStore swaps in a new one after every change and never
+# writes to the parts an existing one can see, so readers on the event loop use it without taking a lock.
+class HistoryView:
+    __slots__ = ("base", "timestamps", "order", "tail", "values", "usernames", "user_index", "files", "skipped")
+
+    def __init__(self, base, tail, values, usernames, user_index, files, skipped):
+        self.base = base
+        self.tail = tail
+        self.values = values
+        self.usernames = usernames
+        self.user_index = user_index
+        self.files = files
+        self.skipped = skipped
+        self.order = None
+        if base is None or not len(base):
+            self.timestamps = tail
+        else:
+            self.timestamps = np.concatenate((base.timestamps, tail))
+            if len(tail) and tail[0] < base.timestamps[-1]:
+                self.order = np.argsort(self.timestamps, kind='stable')
+                self.timestamps = self.timestamps[self.order]
+
+    # One user's values across base + in-memory columns in sorted time order, NaN where absent.
+    def row(self, username):
+        row = self.user_index.get(username)
+        tail = self.values[row] if row is not None else np.full(len(self.tail), np.nan)
+        if self.base is not None:
+            base_row = self.base.user_index.get(username)
+            base = self.base.values[base_row] if base_row is not None else np.full(len(self.base), np.nan)
+            tail = np.concatenate((base, tail))
+        return tail[self.order] if self.order is not None else tail
+
+# Long-lived users x timestamps matrix of account values built from the in_time snapshots.
+# It is built once at startup and then only extended with files it has not seen yet, so
+# a chart request costs an array slice instead of a directory rescan.  An optional
+# memory-mapped HistoryArchive can serve as a read-only base that the in_time files extend.
+# Files are parsed without holding the lock, which is only taken to add the parsed columns and
+# publish a new HistoryView; everything that reads the history goes through the current view.
+class HistoryStore:
+    def __init__(self, in_time_dir, initial_capacity=256):
+        self.in_time_dir = in_time_dir
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._seen = set()
+        self._file_stats = {}
+        self._dir_mtime = None
+        self._base = None
+        self._user_index = {}
+        self._usernames = []
+        self._timestamps = np.empty(initial_capacity, dtype='datetime64[m]')
+        self._values = np.full((64, initial_capacity), np.nan)
+        self._count = 0
+        self._publish()
+
+    def __len__(self):
+        return len(self._view.timestamps)
+
+    @property
+    def usernames(self):
+        view = self._view
+        if view.base is None:
+            return list(view.usernames)
+        return list(dict.fromkeys(view.base.usernames + list(view.usernames)))
+
+    @property
+    def timestamps(self):
+        return self._view.timestamps
+
+    @property
+    def latest_timestamp(self):
+        timestamps = self._view.timestamps
+        if not len(timestamps):
+            return None
+        return timestamps[-1].astype(datetime.datetime)
+
+    @property
+    def archive(self):
+        return self._view.base
+
+    # First snapshot time at or after timestamp, or None if every snapshot is older.
+    def first_at_or_after(self, timestamp):
+        timestamps = self._view.timestamps
+        index = np.searchsorted(timestamps, np.datetime64(timestamp, 'm'))
+        if index >= len(timestamps):
+            return None
+        return timestamps[index].astype(datetime.datetime)
+
+    # Use a memory-mapped archive as the base of the history.  in_time files it already covers are skipped.
+    def attach_archive(self, archive):
+        with self._lock:
+            self._base = archive
+            self._dir_mtime = None
+            self._publish()
+
+    # Scan the in_time directory and append any snapshot files not loaded yet.  Returns the number of files added.
+    # Blocking; run it off the event loop.  Concurrent refreshes wait for each other rather than parse the same files.
+    def refresh(self):
+        with self._refresh_lock:
+            try:
+                dir_mtime = os.stat(self.in_time_dir).st_mtime_ns
+            except FileNotFoundError:
+                return 0
+            if dir_mtime == self._dir_mtime:
+                return 0
+
+            new_files = []
+            skipped = []
+            with os.scandir(self.in_time_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.json') or entry.name in self._seen:
+                        continue
+                    try:
+                        timestamp = parse_leaderboard_timestamp(entry.name)
+                    except ValueError:
+                        skipped.append(entry.name)
+                        continue
+                    if self._in_base(timestamp):
+                        skipped.append(entry.name)
+                        continue
+                    stat = entry.stat()
+                    new_files.append((timestamp, entry.name, entry.path, (stat.st_size, stat.st_mtime_ns)))
+            new_files.sort()
+
+            complete = True
+            parsed = []
+            for timestamp, name, path, signature in new_files:
+                try:
+                    with open(path) as f:
+                        parsed.append((timestamp, name, signature, json.load(f)))
+                except (OSError, ValueError) as e:
+                    # Likely a half-written file, retry it on the next refresh
+                    print(f"Error reading file {name}: {e}")
+                    complete = False
+
+            with self._lock:
+                for timestamp, name, signature, file_data in parsed:
+                    self._append(timestamp, file_data)
+                    self._seen.add(name)
+                    self._file_stats[name] = signature
+                self._seen.update(skipped)
+                # Only remember the directory state once every file in it has been loaded
+                self._dir_mtime = dir_mtime if complete else None
+                self._publish()
+            return len(parsed)
+
+    # The in-memory columns and the (size, mtime) of each file they came from, for a checkpoint.
+    def checkpoint_state(self):
+        view = self._view
+        return {
+            "base": self._base_signature(view.base),
+            "files": dict(view.files),
+            "skipped": sorted(view.skipped),
+            "usernames": list(view.usernames),
+            "timestamps": view.tail,
+            "values": view.values,
+        }
+
+    # Load columns saved by checkpoint_state into an empty store.  Refused (returns False) if the archive
+    # differs or any file the columns came from was changed or removed; files added since are left for refresh.
+    def restore_state(self, state):
+        with self._refresh_lock:
+            if self._count or state["base"] != self._base_signature(self._base):
+                return False
+            for name, signature in state["files"].items():
+                try:
+                    stat = os.stat(os.path.join(self.in_time_dir, name))
+                except FileNotFoundError:
+                    return False
+                if (stat.st_size, stat.st_mtime_ns) != tuple(signature):
+                    return False
+
+            usernames = state["usernames"]
+            count = len(state["timestamps"])
+            capacity = max(self._timestamps.shape[0], count * 2)
+            timestamps = np.empty(capacity, dtype='datetime64[m]')
+            timestamps[:count] = state["timestamps"]
+            values = np.full((max(64, len(usernames)), capacity), np.nan)
+            values[:len(usernames), :count] = state["values"]
+
+            with self._lock:
+                if self._count:
+                    return False
+                self._timestamps = timestamps
+                self._values = values
+                self._usernames = list(usernames)
+                self._user_index = {username: row for row, username in enumerate(usernames)}
+                self._count = count
+                self._file_stats = dict(state["files"])
+                self._seen = set(state["files"]).union(state["skipped"])
+                self._dir_mtime = None
+                self._publish()
+            return True
+
+    # Append one snapshot column.  Out-of-order snapshots are slotted into place so the time axis stays sorted.
+    def append(self, timestamp, snapshot):
+        with self._lock:
+            self._append(timestamp, snapshot)
+            self._publish()
+
+    def _append(self, timestamp, snapshot):
+        if self._count == self._timestamps.shape[0]:
+            self._grow_columns()
+        column = self._count
+        self._timestamps[column] = np.datetime64(timestamp, 'm')
+        self._values[:, column] = np.nan
+        for username, record in snapshot.items():
+            try:
+                value = float(record[0])
+            except (TypeError, ValueError, IndexError):
+                continue
+            row = self._row_for(username)
+            self._values[row, column] = value
+        self._count += 1
+
+        # A new pair of arrays rather than an in-place sort, since published views still point at the old ones
+        if column and self._timestamps[column] < self._timestamps[column - 1]:
+            order = np.argsort(self._timestamps[:self._count], kind='stable')
+            self._timestamps = np.concatenate(
+                (self._timestamps[:self._count][order], self._timestamps[self._count:])
+            )
+            self._values = np.concatenate(
+                (self._values[:, :self._count][:, order], self._values[:, self._count:]),
+                axis=1
+            )
+
+    # Swap in a view of the current columns.  Later appends only write past them or into new arrays.
+    def _publish(self):
+        self._view = HistoryView(
+            self._base,
+            self._timestamps[:self._count],
+            self._values[:len(self._usernames), :self._count],
+            tuple(self._usernames),
+            dict(self._user_index),
+            dict(self._file_stats),
+            frozenset(self._seen.difference(self._file_stats)),
+        )
+
+    # Column range [lo, hi) of the sorted timestamp axis covering start <= timestamp < end, found by binary search.
+    # None leaves that end open.
+    def window(self, start=None, end=None, view=None):
+        timestamps = (view if view is not None else self._view).timestamps
+        lo = int(np.searchsorted(timestamps, np.datetime64(start, 'm'))) if start is not None else 0
+        hi = int(np.searchsorted(timestamps, np.datetime64(end, 'm'))) if end is not None else len(timestamps)
+        return lo, max(hi, lo)
+
+    # Timestamps and values for a single user between start and end, restricted to the snapshots the user appears in.
+    def series(self, username, start=None, end=None):
+        view = self._view
+        lo, hi = self.window(start, end, view)
+        timestamps, values = view.timestamps[lo:hi], view.row(username)[lo:hi]
+        present = ~np.isnan(values)
+        return timestamps[present], values[present]
+
+    # Timestamps between start and end and a len(usernames) x timestamps matrix, with NaN where a user is
+    # missing from a snapshot.
+    def frame(self, usernames, start=None, end=None):
+        view = self._view
+        lo, hi = self.window(start, end, view)
+        rows = np.full((len(usernames), hi - lo), np.nan)
+        for i, username in enumerate(usernames):
+            rows[i] = view.row(username)[lo:hi]
+        return view.timestamps[lo:hi], rows
+
+    @staticmethod
+    def _base_signature(base):
+        if base is None or not len(base):
+            return None
+        return len(base), len(base.usernames), int(base.timestamps[-1].astype(np.int64))
+
+    def _in_base(self, timestamp):
+        if self._base is None or not len(self._base):
+            return False
+        target = np.datetime64(timestamp, 'm')
+        index = np.searchsorted(self._base.timestamps, target)
+        return index < len(self._base) and self._base.timestamps[index] == target
+
+    def _row_for(self, username):
+        row = self._user_index.get(username)
+        if row is None:
+            row = len(self._usernames)
+            if row == self._values.shape[0]:
+                grown = np.full((row * 2, self._values.shape[1]), np.nan)
+                grown[:row] = self._values
+                self._values = grown
+            self._user_index[username] = row
+            self._usernames.append(username)
+        return row
+
+    def _grow_columns(self):
+        capacity = max(self._timestamps.shape[0] * 2, 1)
+        timestamps = np.empty(capacity, dtype='datetime64[m]')
+        timestamps[:self._count] = self._timestamps[:self._count]
+        values = np.full((self._values.shape[0], capacity), np.nan)
+        values[:, :self._count] = self._values[:, :self._count]
+        self._timestamps = timestamps
+        self._values = values
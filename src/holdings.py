@@ -0,0 +1,163 @@
+import numpy as np
+
+OPENED = 0
+CLOSED = 1
+INCREASED = 2
+DECREASED = 3
+CHANGE_NAMES = ("opened", "closed", "increased", "decreased")
+
+# A resize has to move the cost basis by this much (relative and in dollars) to count.  Values
+# and returns are displayed rounded, so a position nobody touched drifts by a few cents.
+RESIZE_TOLERANCE = 0.005
+RESIZE_MIN_DOLLARS = 1.0
+
+# Function to parse a column of "$7,227.50" or "36.34%" strings (or plain numbers) into floats, NaN where unparseable.
+def _parse_numbers(texts, symbol):
+    try:
+        return np.array([float(text.replace(symbol, "").replace(",", "")) for text in texts], dtype=np.float64)
+    except (AttributeError, ValueError):
+        pass
+    values = np.full(len(texts), np.nan)
+    for i, text in enumerate(texts):
+        try:
+            values[i] = float(str(text).replace(symbol, "").replace(",", "").strip())
+        except ValueError:
+            pass
+    return values
+
+# Every position in one snapshot as flat NumPy arrays, parsed once.  Position i belongs to
+# usernames[user[i]] and holds tickers[ticker[i]]; cost is the amount paid for it, backed
+# out of the current value and return.
+class HoldingsTable:
+    __slots__ = ("usernames", "tickers", "user", "ticker", "value", "percent", "cost")
+
+    def __init__(self, usernames, tickers, user, ticker, value, percent):
+        self.usernames = usernames
+        self.tickers = tickers
+        self.user = user
+        self.ticker = ticker
+        self.value = value
+        self.percent = percent
+        growth = 1 + percent / 100
+        # Without a usable return, treat the current value as the cost
+        self.cost = np.where(np.isfinite(growth) & (growth > 0), value / np.where(growth > 0, growth, 1), value)
+
+    def __len__(self):
+        return len(self.user)
+
+    # Build from the {username: [money, link, [[ticker, value, percent], ...]]} format.
+    @classmethod
+    def from_dict(cls, data):
+        usernames = list(data)
+        positions = [
+            (row, stock)
+            for row, record in enumerate(data.values())
+            for stock in (record[2] if len(record) > 2 and record[2] else ())
+        ]
+        ticker_ids = {}
+        ticker = [ticker_ids.setdefault(stock[0], len(ticker_ids)) for _, stock in positions]
+        return cls(
+            usernames,
+            list(ticker_ids),
+            np.fromiter((row for row, _ in positions), dtype=np.int64, count=len(positions)),
+            np.asarray(ticker, dtype=np.int64),
+            _parse_numbers([stock[1] if len(stock) > 1 else None for _, stock in positions], "$"),
+            _parse_numbers([stock[2] if len(stock) > 2 else None for _, stock in positions], "%"),
+        )
+
+# Position changes between two snapshots, one row per (user, ticker) that changed.  delta is
+# the dollars put in (positive) or taken out (negative): the full value for opened and closed
+# positions, the change in cost basis for resized ones.
+class HoldingsDiff:
+    __slots__ = ("usernames", "tickers", "user", "ticker", "kind", "value_before", "value_after", "delta")
+
+    def __init__(self, usernames, tickers, user, ticker, kind, value_before, value_after, delta):
+        self.usernames = usernames
+        self.tickers = tickers
+        self.user = user
+        self.ticker = ticker
+        self.kind = kind
+        self.value_before = value_before
+        self.value_after = value_after
+        self.delta = delta
+
+    def __len__(self):
+        return len(self.user)
+
+    # Number of changes per entry of usernames.
+    def counts(self):
+        return np.bincount(self.user, minlength=len(self.usernames))
+
+    # {username: [(kind name, ticker, value before, value after, delta), ...]} for users with changes,
+    # each list ordered opened, closed, increased, decreased and then by ticker.
+    def by_user(self):
+        ticker_rank = np.empty(len(self.tickers), dtype=np.int64)
+        ticker_rank[np.argsort(np.array(self.tickers, dtype=str))] = np.arange(len(self.tickers))
+        order = np.lexsort((ticker_rank[self.ticker], self.kind, self.user))
+        changes = {}
+        for i in order:
+            changes.setdefault(self.usernames[self.user[i]], []).append((
+                CHANGE_NAMES[self.kind[i]],
+                self.tickers[self.ticker[i]],
+                float(self.value_before[i]),
+                float(self.value_after[i]),
+                float(self.delta[i]),
+            ))
+        return changes
+
+# Sum positions that share a (user, ticker) key.  Returns sorted unique keys with summed value and cost.
+def _collapse(keys, value, cost):
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return (
+        unique,
+        np.bincount(inverse, weights=np.nan_to_num(value), minlength=len(unique)),
+        np.bincount(inverse, weights=np.nan_to_num(cost), minlength=len(unique)),
+    )
+
+# Function to diff the positions of every account present in both tables in one vectorized pass.
+def diff_holdings(before, after):
+    before_usernames = set(before.usernames)
+    usernames = [username for username in after.usernames if username in before_usernames]
+    user_ids = {username: uid for uid, username in enumerate(usernames)}
+    tickers = list(dict.fromkeys(before.tickers + after.tickers))
+    ticker_ids = {ticker: tid for tid, ticker in enumerate(tickers)}
+    stride = max(len(tickers), 1)
+
+    def keyed(table):
+        # Map the table's local user and ticker ids onto the shared ones; -1 marks users not in both
+        user_map = np.array([user_ids.get(username, -1) for username in table.usernames], dtype=np.int64)
+        ticker_map = np.array([ticker_ids[ticker] for ticker in table.tickers], dtype=np.int64)
+        users = user_map[table.user] if len(table) else table.user
+        keep = users >= 0
+        keys = users[keep] * stride + (ticker_map[table.ticker[keep]] if len(table) else table.ticker)
+        return _collapse(keys, table.value[keep], table.cost[keep])
+
+    before_keys, before_value, before_cost = keyed(before)
+    after_keys, after_value, after_cost = keyed(after)
+
+    # Positions present on both sides
+    index = np.searchsorted(after_keys, before_keys)
+    index[index == len(after_keys)] = 0
+    matched = (after_keys[index] == before_keys) if len(after_keys) else np.zeros(len(before_keys), dtype=bool)
+    opened = ~np.isin(after_keys, before_keys, assume_unique=True)
+
+    matched_before = np.flatnonzero(matched)
+    matched_after = index[matched]
+    cost_delta = after_cost[matched_after] - before_cost[matched_before]
+    resized = (np.abs(cost_delta) > RESIZE_TOLERANCE * np.abs(before_cost[matched_before])) & (
+        np.abs(cost_delta) >= RESIZE_MIN_DOLLARS
+    )
+    resized_before = matched_before[resized]
+    resized_after = matched_after[resized]
+    resized_delta = cost_delta[resized]
+
+    keys = np.concatenate((after_keys[opened], before_keys[~matched], after_keys[resized_after]))
+    kind = np.concatenate((
+        np.full(np.count_nonzero(opened), OPENED, dtype=np.int8),
+        np.full(np.count_nonzero(~matched), CLOSED, dtype=np.int8),
+        np.where(resized_delta > 0, INCREASED, DECREASED).astype(np.int8),
+    ))
+    value_before = np.concatenate((np.zeros(np.count_nonzero(opened)), before_value[~matched], before_value[resized_before]))
+    value_after = np.concatenate((after_value[opened], np.zeros(np.count_nonzero(~matched)), after_value[resized_after]))
+    delta = np.concatenate((after_value[opened], -before_value[~matched], resized_delta))
+    return HoldingsDiff(usernames, tickers, keys // stride, keys % stride, kind, value_before, value_after, delta)
@@ -0,0 +1,95 @@
+# Parsed, read-only model of a leaderboard snapshot.  A snapshot is parsed once and then
+# shared by every command, so answering a command never touches the raw JSON again.
+
+# Function to turn a holding value like "$7,227.50" into a float.  Returns None if it can't be parsed.
+def parse_money(text):
+    try:
+        return float(str(text).replace('$', '').replace(',', '').strip())
+    except ValueError:
+        return None
+
+# Function to turn a holding return like "36.34%" into a float percentage.  Returns None if it can't be parsed.
+def parse_percent(text):
+    try:
+        return float(str(text).replace('%', '').replace(',', '').strip())
+    except ValueError:
+        return None
+
+# Function to get the sort key that orders accounts on every leaderboard: richest first, accounts without a
+# value last, and names breaking ties, so Leaderboard and RankIndex always agree on who is ahead.
+def rank_key(name, money):
+    return (-money if money == money else float("inf"), name)
+
+class Holding:
+    __slots__ = ("ticker", "value", "percent", "value_text", "percent_text")
+
+    def __init__(self, ticker, value_text, percent_text):
+        self.ticker = ticker
+        self.value_text = value_text
+        self.percent_text = percent_text
+        self.value = parse_money(value_text)
+        self.percent = parse_percent(percent_text)
+
+    def __repr__(self):
+        return f"Holding({self.ticker!r}, {self.value_text!r}, {self.percent_text!r})"
+
+class Account:
+    __slots__ = ("name", "money", "link", "holdings", "rank", "holdings_text")
+
+    def __init__(self, name, money, link, holdings):
+        self.name = name
+        self.money = money
+        self.link = link
+        self.holdings = holdings
+        self.rank = None
+        self.holdings_text = "\n".join(
+            f"{holding.ticker}: {holding.value_text} ({holding.percent_text})" for holding in holdings
+        )
+
+    # Build an Account from one [money, link, [[ticker, value, percent], ...]] record.
+    @classmethod
+    def from_record(cls, name, record):
+        try:
+            money = float(record[0])
+        except (TypeError, ValueError, IndexError):
+            money = float("nan")
+        link = record[1] if len(record) > 1 else None
+        holdings = [Holding(*stock[:3]) for stock in (record[2] if len(record) > 2 and record[2] else [])]
+        return cls(name, money, link, holdings)
+
+    @property
+    def tickers(self):
+        return frozenset(holding.ticker for holding in self.holdings)
+
+    def __repr__(self):
+        return f"Account({self.name!r}, money={self.money!r}, rank={self.rank!r})"
+
+class Leaderboard:
+    __slots__ = ("accounts", "ranked")
+
+    def __init__(self, accounts):
+        # Rank order is computed once here; rank 1 is the richest account
+        self.ranked = sorted(accounts, key=lambda account: rank_key(account.name, account.money))
+        for position, account in enumerate(self.ranked, 1):
+            account.rank = position
+        self.accounts = {account.name: account for account in self.ranked}
+
+    # Build a Leaderboard from the {username: [money, link, [[ticker, value, percent], ...]]} JSON format.
+    @classmethod
+    def from_dict(cls, data):
+        return cls([Account.from_record(name, record) for name, record in data.items()])
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def __contains__(self, name):
+        return name in self.accounts
+
+    def __iter__(self):
+        return iter(self.ranked)
+
+    def get(self, name):
+        return self.accounts.get(name)
+
+    def top(self, k):
+        return self.ranked[:k]
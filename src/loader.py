@@ -0,0 +1,298 @@
+import asyncio
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+from types import MappingProxyType
+
+from fileio import FILE_IO
+from holdings import HoldingsTable
+from leaderboard import Leaderboard
+
+# inotify event bits we care about (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0x00000800
+INOTIFY_EVENT = struct.Struct('iIII')
+
+# One parsed version of leaderboard-latest.json.  Every caller gets the same object, so treat it as read-only.
+class LeaderboardSnapshot:
+    __slots__ = ("data", "raw", "leaderboard", "holdings", "digest", "mtime_ns", "size", "loaded_at")
+
+    def __init__(self, raw, data, digest, mtime_ns, size, holdings=None):
+        self.raw = raw
+        self.data = MappingProxyType(data)
+        self.leaderboard = Leaderboard.from_dict(data)
+        self.holdings = holdings if holdings is not None else HoldingsTable.from_dict(data)
+        self.digest = digest
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.loaded_at = time.time()
+
+# Minimal inotify binding through libc.  Raises OSError when inotify is not available.
+class _Inotify:
+    def __init__(self, directory, mask):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    # Names of the files touched since the last call.
+    def read_names(self):
+        names = set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(buffer):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            names.add(buffer[offset:offset + length].rstrip(b'\0').decode(errors='replace'))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+# Single shared loader for leaderboard-latest.json.  It re-reads the file only when its
+# mtime or size changes, re-parses only when the content hash changes, and keeps serving
+# the previous snapshot if it catches a half-written file mid `git pull`.  Changes are
+# picked up through inotify where available and by polling otherwise.
+class LeaderboardLoader:
+    def __init__(self, path, poll_interval=5, settle_delay=0.5, max_attempts=5):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.settle_delay = settle_delay
+        self.max_attempts = max_attempts
+        self.snapshot = None
+        self._signature = None
+        self._lock = asyncio.Lock()
+        self._listeners = []
+        self._task = None
+        self._inotify = None
+        self._changed = asyncio.Event()
+        self._warm_holdings = None
+
+    # Register a coroutine function called with each new snapshot.
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    # Offer a HoldingsTable parsed by a previous run.  It is used if the next file read has the same digest.
+    def warm_holdings(self, digest, holdings):
+        self._warm_holdings = (digest, holdings)
+
+    # Return the current snapshot, reloading first if the file changed on disk.  None if it has never loaded.
+    async def get(self):
+        if self._stat_signature() != self._signature:
+            await self.reload()
+        return self.snapshot
+
+    async def reload(self):
+        async with self._lock:
+            signature = self._stat_signature()
+            if signature is None or signature == self._signature:
+                return self.snapshot
+            result = await FILE_IO.run(self._read_stable, op="leaderboard")
+            if result is None:
+                return self.snapshot
+            self._signature, snapshot = result
+            if snapshot is self.snapshot:
+                return snapshot
+            self.snapshot = snapshot
+        for callback in self._listeners:
+            try:
+                await callback(snapshot)
+            except Exception as e:
+                print(f"Error in leaderboard change listener: {e}")
+        return snapshot
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # Read and parse the file, retrying while it is being rewritten.  Returns (signature, snapshot), where
+    # snapshot is the current one if the content hash is unchanged, or None if the file never settles.
+    def _read_stable(self):
+        for attempt in range(self.max_attempts):
+            try:
+                before = os.stat(self.path)
+                with open(self.path, 'rb') as f:
+                    raw = f.read()
+                after = os.stat(self.path)
+                signature = (after.st_mtime_ns, after.st_size)
+                if (before.st_mtime_ns, before.st_size) == signature and len(raw) == after.st_size:
+                    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                    if self.snapshot is not None and digest == self.snapshot.digest:
+                        # Touched but identical, keep handing out the existing snapshot
+                        return signature, self.snapshot
+                    warm = self._warm_holdings
+                    holdings = warm[1] if warm is not None and warm[0] == digest else None
+                    snapshot = LeaderboardSnapshot(raw, json.loads(raw), digest, *signature, holdings=holdings)
+                    self._warm_holdings = None
+                    return signature, snapshot
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                print(f"Leaderboard file looks half-written (attempt {attempt + 1}): {e}")
+            time.sleep(self.settle_delay)
+        print(f"Giving up reading {self.path}, keeping the previous snapshot")
+        return None
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._inotify = _Inotify(
+                os.path.dirname(os.path.abspath(self.path)),
+                IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE,
+            )
+            asyncio.get_running_loop().add_reader(self._inotify.fd, self._on_inotify)
+            print(f"Watching {self.path} with inotify")
+        except OSError as e:
+            self._inotify = None
+            print(f"inotify unavailable ({e}), polling {self.path} every {self.poll_interval}s")
+        self._task = asyncio.create_task(self._watch())
+
+    def stop(self):
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _on_inotify(self):
+        if os.path.basename(self.path) in self._inotify.read_names():
+            self._changed.set()
+
+    async def _watch(self):
+        while True:
+            try:
+                if self._inotify is not None:
+                    await self._changed.wait()
+                    self._changed.clear()
+                    # Let the writer finish before reading
+                    await asyncio.sleep(self.settle_delay)
+                else:
+                    await asyncio.sleep(self.poll_interval)
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error watching leaderboard file: {e}")
+
+# The end of a top-level key: closing quote, colon and the record's opening bracket.  Records are arrays
+# and never contain objects, so an unescaped quote followed by a colon can only close a username.
+# Searching for this and then back for the key's opening quote is several times faster than
+# matching whole keys with one pattern.
+KEY_END = re.compile(rb'"\s*:\s*\[')
+RECORD_TRAILER = b", \t\r\n}"
+
+# Function to tell whether the quote at position is escaped, i.e. preceded by an odd number of backslashes.
+def _escaped(raw, position):
+    count = 0
+    while position > 0 and raw[position - 1] == 0x5C:
+        count += 1
+        position -= 1
+    return count % 2 == 1
+
+# Function to find where each user's record sits in the raw leaderboard JSON without parsing it.
+# Returns {username: (start, end)}, where raw[start:end] is the record followed by separators.
+def find_user_spans(raw):
+    spans = {}
+    name = start = None
+    for match in KEY_END.finditer(raw):
+        close = match.start()
+        if raw[close - 1] == 0x5C and _escaped(raw, close):
+            continue
+        opening = raw.rfind(b'"', 0, close)
+        while raw[opening - 1] == 0x5C and _escaped(raw, opening):
+            opening = raw.rfind(b'"', 0, opening)
+        if name is not None:
+            spans[name] = (start, opening)
+        key = raw[opening + 1:close]
+        name = json.loads(b'"' + key + b'"') if b'\\' in key else key.decode('utf-8')
+        start = match.end() - 1
+    if name is not None:
+        spans[name] = (start, len(raw))
+    return spans
+
+# Byte offsets of each user's record in leaderboard-latest.json, so a one-user lookup reads and decodes
+# only that record instead of the whole file.  The offsets are found once per file version; a lookup
+# that sees the file change underneath it, or a fragment that doesn't decode, falls back to a full parse.
+class UserRecordIndex:
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.spans = {}
+        self.full_parses = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.spans)
+
+    # Return the [money, link, holdings] record for a username, or None if it isn't in the file.  Blocking.
+    def lookup(self, name):
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            signature = (stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                if signature != self.signature:
+                    # New version: index it from the handle already open, so the spans match what is read below
+                    raw = f.read()
+                    if len(raw) != stat.st_size:
+                        return self._full_parse(name)
+                    self.spans = find_user_spans(raw)
+                    self.signature = signature
+                    span = self.spans.get(name)
+                    return self._decode(raw[span[0]:span[1]], name) if span is not None else None
+                span = self.spans.get(name)
+            if span is None:
+                return None
+            f.seek(span[0])
+            fragment = f.read(span[1] - span[0])
+            after = os.fstat(f.fileno())
+        if (after.st_mtime_ns, after.st_size) != signature:
+            return self._full_parse(name)
+        return self._decode(fragment, name)
+
+    def _decode(self, fragment, name):
+        try:
+            record = json.loads(fragment.rstrip(RECORD_TRAILER))
+        except ValueError:
+            return self._full_parse(name)
+        return record if isinstance(record, list) else self._full_parse(name)
+
+    # Parse the whole file and forget the offsets, which no longer describe it.
+    def _full_parse(self, name):
+        self.full_parses += 1
+        with self._lock:
+            self.signature = None
+            self.spans = {}
+        with open(self.path, 'rb') as f:
+            return json.loads(f.read()).get(name)
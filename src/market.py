@@ -0,0 +1,157 @@
+import asyncio
+import datetime
+from functools import lru_cache
+
+from pytz import timezone
+
+EST = timezone('US/Eastern')
+REGULAR_OPEN = datetime.time(9, 30)
+REGULAR_CLOSE = datetime.time(16, 0)
+EARLY_CLOSE = datetime.time(13, 0)
+
+# One-off closures that don't follow the yearly rules (national days of mourning and the like).
+SPECIAL_CLOSURES = {
+    datetime.date(2012, 10, 29),  # Hurricane Sandy
+    datetime.date(2012, 10, 30),
+    datetime.date(2018, 12, 5),   # President George H.W. Bush
+    datetime.date(2025, 1, 9),    # President Jimmy Carter
+}
+
+# Longest single sleep, so a suspended machine or a clock change is noticed within the hour.
+MAX_SLEEP = 3600
+
+def _nth_weekday(year, month, weekday, n):
+    first = datetime.date(year, month, 1)
+    return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+def _last_weekday(year, month, weekday):
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return datetime.date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+def _observed(day):
+    # Saturday holidays move to Friday, Sunday holidays to Monday
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+# Function to list the NYSE full-day holidays for a year.
+@lru_cache(maxsize=16)
+def nyse_holidays(year):
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),               # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),               # Washington's Birthday
+        _easter(year) - datetime.timedelta(days=2),  # Good Friday
+        _last_weekday(year, 5, 0),                 # Memorial Day
+        _observed(datetime.date(year, 7, 4)),      # Independence Day
+        _nth_weekday(year, 9, 0, 1),               # Labor Day
+        _nth_weekday(year, 11, 3, 4),              # Thanksgiving
+        _observed(datetime.date(year, 12, 25)),    # Christmas
+    }
+    # New Year's Day on a Saturday is not made up on the Friday before
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(datetime.date(year, 6, 19)))  # Juneteenth
+    holidays.update(day for day in SPECIAL_CLOSURES if day.year == year)
+    return frozenset(holidays)
+
+# Function to list the NYSE 1:00 PM early-close days for a year.
+@lru_cache(maxsize=16)
+def nyse_half_days(year):
+    half_days = set()
+    # July 3rd closes early when Independence Day falls Tuesday to Friday
+    july_3 = datetime.date(year, 7, 3)
+    if july_3.weekday() < 4:
+        half_days.add(july_3)
+    half_days.add(_nth_weekday(year, 11, 3, 4) + datetime.timedelta(days=1))  # Day after Thanksgiving
+    christmas_eve = datetime.date(year, 12, 24)
+    if christmas_eve.weekday() < 5:
+        half_days.add(christmas_eve)
+    return frozenset(day for day in half_days if day not in nyse_holidays(year))
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in nyse_holidays(day.year)
+
+# Function to get the (open, close) times of the session on a day as EST datetimes, or None if the market is closed.
+def session(day):
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in nyse_half_days(day.year) else REGULAR_CLOSE
+    return (
+        EST.localize(datetime.datetime.combine(day, REGULAR_OPEN)),
+        EST.localize(datetime.datetime.combine(day, close)),
+    )
+
+# Function to check whether the market is open at an aware datetime.
+def is_market_open(now):
+    hours = session(now.astimezone(EST).date())
+    return hours is not None and hours[0] <= now <= hours[1]
+
+# Function to find the next session open or close strictly after now.  Returns (when, "open" | "close").
+def next_market_event(now):
+    day = now.astimezone(EST).date()
+    for _ in range(14):
+        hours = session(day)
+        if hours is not None:
+            if now < hours[0]:
+                return hours[0], "open"
+            if now < hours[1]:
+                return hours[1], "close"
+        day += datetime.timedelta(days=1)
+    raise ValueError(f"No trading session within two weeks of {now}")
+
+# Sleeps until the next session open or close and runs the registered handlers, skipping
+# weekends and exchange holidays entirely.  Nothing wakes up between events.
+class MarketScheduler:
+    def __init__(self):
+        self._handlers = {"open": [], "close": []}
+        self._task = None
+
+    # Register a coroutine function to run at each session "open" or "close".  It is called with the session's EST datetime.
+    def on(self, event, callback):
+        self._handlers[event].append(callback)
+
+    def off(self, event, callback):
+        if callback in self._handlers[event]:
+            self._handlers[event].remove(callback)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            now = datetime.datetime.now(EST)
+            when, event = next_market_event(now)
+            delay = (when - now).total_seconds()
+            if delay > MAX_SLEEP:
+                await asyncio.sleep(MAX_SLEEP)
+                continue
+            await asyncio.sleep(delay)
+            for callback in self._handlers[event]:
+                try:
+                    await callback(when)
+                except Exception as e:
+                    print(f"Error in market {event} handler: {e}")
+            # Never fire the same event twice if the clock lands exactly on it
+            await asyncio.sleep(1)
@@ -0,0 +1,335 @@
+import asyncio
+import contextvars
+import functools
+import os
+import resource
+import time
+from bisect import bisect_left
+
+# In-process metrics: latency histograms per command and background task, broken down by stage,
+# plus gauges read from the caches, semaphores and send scheduler when scraped.
+#
+# track(operation, kind) times one command or task.  stage(name) inside it times one part of the
+# work; stages nest and each records only its own time (a "compute" stage that awaits a render
+# doesn't count the render), and whatever no stage covered is recorded as "other".
+STAGES = ("load", "market_data", "compute", "render", "send", "other")
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Port for the Prometheus text endpoint on 127.0.0.1.  Set to 0 to turn the endpoint off.
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 9464))
+
+# Cumulative-bucket histogram in the Prometheus style.
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Estimate a quantile by interpolating inside the bucket it falls in.
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+class _Frame:
+    __slots__ = ("operation", "stage", "started", "child_time")
+
+    def __init__(self, operation, stage):
+        self.operation = operation
+        self.stage = stage
+        self.started = time.perf_counter()
+        self.child_time = 0.0
+
+_CURRENT = contextvars.ContextVar("metrics_frame", default=None)
+
+# Function to find the (operation, stage) an asyncio task is in, or None.  Safe to call from another
+# thread; needs Task.get_context (Python 3.12+) and returns None on older versions.
+def task_operation(task):
+    get_context = getattr(task, "get_context", None)
+    if get_context is None:
+        return None
+    frame = get_context().get(_CURRENT)
+    return (frame.operation, frame.stage) if frame is not None else None
+
+class MetricsRegistry:
+    def __init__(self):
+        self.started = time.time()
+        self._histograms = {}
+        self._kinds = {}
+        self._gauges = []
+
+    def histogram(self, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        return histogram
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, labels).observe(value)
+
+    # Register a function returning [(metric name, type, {labels}, value), ...], called on every scrape.
+    def gauge(self, collect):
+        self._gauges.append(collect)
+
+    # Histograms for one metric name as {labels dict as tuple: Histogram}.
+    def histograms(self, name):
+        return {labels: histogram for (metric, labels), histogram in self._histograms.items() if metric == name}
+
+    # One histogram combining every series of a metric whose labels include match, e.g. all outcomes of a command.
+    def merged(self, name, **match):
+        merged = Histogram()
+        for labels, histogram in self.histograms(name).items():
+            labels = dict(labels)
+            if all(labels.get(key) == value for key, value in match.items()):
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.count += histogram.count
+                merged.sum += histogram.sum
+        return merged
+
+    # Operation name -> "command" or "task", for every operation seen so far.
+    @property
+    def operations(self):
+        return dict(self._kinds)
+
+    def track(self, operation, kind):
+        return _Tracked(self, operation, kind)
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    # Decorator form of track() for coroutine functions and methods.
+    def instrumented(self, operation, kind="command"):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.track(operation, kind):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def collect(self):
+        samples = []
+        for collect in self._gauges:
+            try:
+                samples.extend(collect())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        return samples
+
+    # Everything in the Prometheus text exposition format.
+    def render(self):
+        lines = []
+        typed = set()
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip([str(bound) for bound in histogram.buckets] + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        for name, metric_type, labels, value in self.collect():
+            if name not in typed:
+                lines.append(f"# TYPE {name} {metric_type}")
+                typed.add(name)
+            lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+class _Tracked:
+    def __init__(self, registry, operation, kind):
+        self.registry = registry
+        self.operation = operation
+        self.kind = kind
+
+    def __enter__(self):
+        self.registry._kinds[self.operation] = self.kind
+        self.parent = _CURRENT.get()
+        self.frame = _Frame(self.operation, "other")
+        self.token = _CURRENT.set(self.frame)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _CURRENT.reset(self.token)
+        elapsed = time.perf_counter() - self.frame.started
+        # A task run from inside another operation isn't counted again in the caller's stages
+        if self.parent is not None:
+            self.parent.child_time += elapsed
+        outcome = "error" if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError) else "ok"
+        self.registry.observe("bot_operation_seconds", elapsed, operation=self.operation, kind=self.kind, outcome=outcome)
+        self.registry.observe(
+            "bot_stage_seconds", max(elapsed - self.frame.child_time, 0.0), operation=self.operation, stage="other"
+        )
+        return False
+
+class _Stage:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        parent = _CURRENT.get()
+        self.parent = parent
+        self.frame = _Frame(parent.operation if parent is not None else "untracked", self.name)
+        self.token = _CURRENT.set(self.frame)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _CURRENT.reset(self.token)
+        elapsed = time.perf_counter() - self.frame.started
+        if self.parent is not None:
+            self.parent.child_time += elapsed
+        self.registry.observe(
+            "bot_stage_seconds",
+            max(elapsed - self.frame.child_time, 0.0),
+            operation=self.frame.operation,
+            stage=self.name,
+        )
+        return False
+
+# Semaphore that records how long each acquire waited.
+class InstrumentedSemaphore(asyncio.Semaphore):
+    def __init__(self, name, value, registry=None):
+        super().__init__(value)
+        self.name = name
+        self.limit = value
+        self.registry = registry
+
+    async def acquire(self):
+        started = time.perf_counter()
+        result = await super().acquire()
+        (self.registry or METRICS).observe("bot_semaphore_wait_seconds", time.perf_counter() - started, semaphore=self.name)
+        return result
+
+    @property
+    def in_use(self):
+        return self.limit - self._value
+
+# Function to read the process's current resident set size in bytes.
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current, but better than nothing off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# Function to register hit, miss and size metrics for an AsyncLRUCache.
+def register_cache(registry, name, cache):
+    def collect():
+        stats = cache.stats
+        return [
+            ("bot_cache_hits_total", "counter", {"cache": name}, stats["hits"]),
+            ("bot_cache_misses_total", "counter", {"cache": name}, stats["misses"]),
+            ("bot_cache_entries", "gauge", {"cache": name}, stats["size"]),
+        ]
+    registry.gauge(collect)
+
+# Function to register queue, in-use and wait metrics for InstrumentedSemaphores.
+def register_semaphores(registry, semaphores):
+    def collect():
+        samples = []
+        for semaphore in semaphores:
+            samples.append(("bot_semaphore_in_use", "gauge", {"semaphore": semaphore.name}, semaphore.in_use))
+            samples.append(("bot_semaphore_limit", "gauge", {"semaphore": semaphore.name}, semaphore.limit))
+        return samples
+    registry.gauge(collect)
+
+# Function to register the SendScheduler's per-priority counters and queue depths.
+def register_send_scheduler(registry, scheduler):
+    def collect():
+        samples = []
+        stats = scheduler.stats
+        for name, values in stats.items():
+            if not isinstance(values, dict):
+                continue
+            labels = {"priority": name}
+            samples.append(("bot_send_queued", "gauge", labels, values["queued"]))
+            samples.append(("bot_send_sent_total", "counter", labels, values["sent"]))
+            samples.append(("bot_send_coalesced_total", "counter", labels, values["coalesced"]))
+            samples.append(("bot_send_failed_total", "counter", labels, values["failed"]))
+            samples.append(("bot_send_wait_p95_seconds", "gauge", labels, values["wait_p95"]))
+        samples.append(("bot_send_in_flight", "gauge", {}, stats["in_flight"]))
+        return samples
+    registry.gauge(collect)
+
+# Function to register the FileIO pool's queue depth and jobs in flight.
+def register_file_io(registry, file_io):
+    def collect():
+        return [
+            ("bot_io_queued", "gauge", {}, file_io.queue_depth),
+            ("bot_io_in_flight", "gauge", {}, file_io.pending),
+            ("bot_io_workers", "gauge", {}, file_io.workers),
+        ]
+    registry.gauge(collect)
+
+def _process_samples():
+    return [
+        ("process_resident_memory_bytes", "gauge", {}, rss_bytes()),
+        ("process_start_time_seconds", "gauge", {}, METRICS.started),
+    ]
+
+# Serves METRICS.render() as text at http://127.0.0.1:<port>/metrics.
+class MetricsServer:
+    def __init__(self, registry, port=METRICS_PORT, host="127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self._runner = None
+
+    async def start(self):
+        if not self.port or self._runner is not None:
+            return
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+# The process-wide registry.
+METRICS = MetricsRegistry()
+METRICS.gauge(_process_samples)
+track = METRICS.track
+stage = METRICS.stage
+instrumented = METRICS.instrumented
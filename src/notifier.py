@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import json
+
+from fileio import FILE_IO
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Function to split embeds into messages of at most 10 embeds and 6000 embed characters each.
+def pack_embeds(items):
+    messages, current, size = [], [], 0
+    for item in items:
+        # len(embed) is the character count Discord charges against the per-message limit
+        item_size = len(item[1])
+        if current and (len(current) == MAX_EMBEDS_PER_MESSAGE or size + item_size > MAX_EMBED_CHARS_PER_MESSAGE):
+            messages.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += item_size
+    if current:
+        messages.append(current)
+    return messages
+
+# Function to build a stable key for a notification so it can be recognised after a restart.
+def notification_key(*parts):
+    return hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+# Sends batches of embeds as few messages as possible, a few at a time, and journals what
+# has gone out.  A run that crashes after sending but before its snapshot is saved is
+# resumed on the next run without repeating the notifications that were already sent.
+class BatchNotifier:
+    def __init__(self, journal_path, max_concurrent_sends=3, sender=None):
+        self.journal_path = journal_path
+        # Coroutine function called as sender(channel, embeds=[...]); defaults to channel.send
+        self.sender = sender
+        self.max_concurrent_sends = max_concurrent_sends
+        self._journal_lock = asyncio.Lock()
+
+    def _read_journal(self, scope):
+        try:
+            with open(self.journal_path, "r") as f:
+                journal = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        return set(journal.get("sent", [])) if journal.get("scope") == scope else set()
+
+    async def _write_journal(self, scope, sent):
+        await FILE_IO.write_json(self.journal_path, {"scope": scope, "sent": sorted(sent)})
+
+    # Send (key, embed) items to channel.  scope identifies the comparison the items came from (e.g. the
+    # previous snapshot's hash); keys already journaled under the same scope are skipped.  Returns messages sent.
+    async def send(self, channel, scope, items):
+        sent = await FILE_IO.run(self._read_journal, scope, op="read")
+        pending = [item for item in items if item[0] not in sent]
+        messages = pack_embeds(pending)
+        if not messages:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_sends)
+
+        async def send_message(message):
+            async with semaphore:
+                embeds = [embed for _, embed in message]
+                if self.sender is not None:
+                    await self.sender(channel, embeds=embeds)
+                else:
+                    await channel.send(embeds=embeds)
+            async with self._journal_lock:
+                sent.update(key for key, _ in message)
+                await self._write_journal(scope, sent)
+
+        results = await asyncio.gather(*(send_message(message) for message in messages), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        return len(messages)
+
+    # Forget the journal once the caller has durably recorded that the scope is done.
+    async def complete(self):
+        await FILE_IO.remove(self.journal_path)
@@ -0,0 +1,199 @@
+import asyncio
+import itertools
+import time
+from bisect import insort
+from collections import deque
+
+# Priority classes, most urgent first
+INTERACTION = 0
+SCHEDULED = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTION: "interaction", SCHEDULED: "scheduled", BULK: "bulk"}
+
+# Discord allows roughly 5 messages per 5 seconds per channel
+CHANNEL_RATE = 5
+CHANNEL_PER = 5.0
+WAIT_SAMPLES = 256
+
+# Token bucket for one channel (or one interaction's follow-up webhook).
+class _Bucket:
+    __slots__ = ("rate", "per", "tokens", "updated")
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    # Seconds until a token is available, 0 if one is available now.
+    def ready_in(self, now):
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) * self.per / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class _Entry:
+    __slots__ = ("priority", "seq", "destination", "bucket", "coalesce_key", "kwargs", "future", "queued_at")
+
+    def __init__(self, priority, seq, destination, bucket, coalesce_key, kwargs, future):
+        self.priority = priority
+        self.seq = seq
+        self.destination = destination
+        self.bucket = bucket
+        self.coalesce_key = coalesce_key
+        self.kwargs = kwargs
+        self.future = future
+        self.queued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    # Close the message's discord.File attachments when it is dropped unsent; send() would have closed them.
+    def close_files(self):
+        files = list(self.kwargs.get("files") or ())
+        if self.kwargs.get("file") is not None:
+            files.append(self.kwargs["file"])
+        for file in files:
+            file.close()
+
+# Central queue for everything the bot posts.  Messages go out in priority order (interaction
+# replies, then scheduled posts, then bulk notifications) while each channel is held to its
+# own rate limit, so a burst of notifications in one channel never holds up a reply in another.
+# A queued message with a coalesce key is dropped when a newer one with the same key arrives.
+class SendScheduler:
+    def __init__(self, rate=CHANNEL_RATE, per=CHANNEL_PER):
+        self.rate = rate
+        self.per = per
+        self._queue = []
+        self._buckets = {}
+        self._pending = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._in_flight = set()
+        self.sent = {priority: 0 for priority in PRIORITY_NAMES}
+        self.coalesced = {priority: 0 for priority in PRIORITY_NAMES}
+        self.failed = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_NAMES}
+
+    # Queue destination.send(**kwargs) and wait for it to go out.  destination is anything with an async
+    # send() (a channel, interaction.followup).  Returns the sent message, or None if a newer message with
+    # the same coalesce_key replaced it before it was sent.
+    async def send(self, destination, priority, coalesce_key=None, bucket=None, **kwargs):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        bucket = bucket if bucket is not None else ("channel", getattr(destination, "id", id(destination)))
+        entry = _Entry(priority, next(self._seq), destination, bucket, coalesce_key, kwargs, future)
+
+        if coalesce_key is not None:
+            superseded = self._pending.pop(coalesce_key, None)
+            if superseded is not None and superseded in self._queue:
+                self._queue.remove(superseded)
+                self.coalesced[superseded.priority] += 1
+                superseded.close_files()
+                if not superseded.future.done():
+                    superseded.future.set_result(None)
+            self._pending[coalesce_key] = entry
+
+        insort(self._queue, entry)
+        self._wakeup.set()
+        return await future
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for entry in self._queue:
+            entry.close_files()
+            if not entry.future.done():
+                entry.future.cancel()
+        self._queue.clear()
+        self._pending.clear()
+
+    # Messages still waiting to go out, by priority class name.
+    def queue_depth(self):
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for entry in self._queue:
+            depth[PRIORITY_NAMES[entry.priority]] += 1
+        return depth
+
+    @property
+    def stats(self):
+        stats = {}
+        depth = self.queue_depth()
+        for priority, name in PRIORITY_NAMES.items():
+            waits = sorted(self._waits[priority])
+            stats[name] = {
+                "queued": depth[name],
+                "sent": self.sent[priority],
+                "coalesced": self.coalesced[priority],
+                "failed": self.failed[priority],
+                "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                "wait_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+        stats["in_flight"] = len(self._in_flight)
+        return stats
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            delay = None
+            for index, entry in enumerate(self._queue):
+                if entry.future.done():
+                    # The caller gave up waiting; drop it and rescan
+                    del self._queue[index]
+                    entry.close_files()
+                    break
+                bucket = self._buckets.get(entry.bucket)
+                if bucket is None:
+                    bucket = self._buckets[entry.bucket] = _Bucket(self.rate, self.per)
+                ready_in = bucket.ready_in(now)
+                if ready_in == 0:
+                    del self._queue[index]
+                    bucket.take()
+                    self._start_send(entry, now)
+                    break
+                delay = ready_in if delay is None else min(delay, ready_in)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._prune_buckets(now)
+
+    def _start_send(self, entry, now):
+        if entry.coalesce_key is not None and self._pending.get(entry.coalesce_key) is entry:
+            del self._pending[entry.coalesce_key]
+        self._waits[entry.priority].append(now - entry.queued_at)
+        task = asyncio.create_task(self._send(entry))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, entry):
+        try:
+            message = await entry.destination.send(**entry.kwargs)
+        except Exception as e:
+            self.failed[entry.priority] += 1
+            if not entry.future.done():
+                entry.future.set_exception(e)
+            return
+        self.sent[entry.priority] += 1
+        if not entry.future.done():
+            entry.future.set_result(message)
+
+    # Forget full buckets for channels with nothing queued so interaction buckets don't pile up.
+    def _prune_buckets(self, now):
+        if len(self._buckets) < 256:
+            return
+        busy = {entry.bucket for entry in self._queue}
+        for key, bucket in list(self._buckets.items()):
+            if key not in busy and bucket.ready_in(now) == 0 and bucket.tokens >= bucket.rate:
+                del self._buckets[key]
@@ -0,0 +1,144 @@
+import datetime
+
+import numpy as np
+
+from holdings import HoldingsTable, diff_holdings
+from market import EST, session
+
+WINDOWS = ("day", "week", "month", "season")
+
+# Returns, ranks and trade counts for every account over one window, computed in a single
+# vectorized pass.  Arrays are aligned on usernames; order lists indices best return first.
+# Accounts without a finite return (no start value, or a start value of 0) count towards
+# trades but are left out of order and every ranking built from it.
+class PerformanceReport:
+    __slots__ = ("usernames", "start_values", "end_values", "change_amount", "change_percent", "trades", "order")
+
+    def __init__(self, usernames, start_values, end_values, trades):
+        self.usernames = usernames
+        self.start_values = start_values
+        self.end_values = end_values
+        self.trades = trades
+        self.change_amount = end_values - start_values
+        self.change_percent = np.full_like(self.change_amount, np.nan)
+        np.divide(self.change_amount, start_values, out=self.change_percent, where=start_values != 0)
+        self.change_percent *= 100
+        # Stable sort keeps snapshot order between equal returns
+        ranked = np.flatnonzero(np.isfinite(self.change_percent))
+        self.order = ranked[np.argsort(-self.change_percent[ranked], kind="stable")]
+
+    def __len__(self):
+        return len(self.usernames)
+
+    @property
+    def total_trades(self):
+        return int(self.trades.sum())
+
+    # 1-based rank of each account by return, aligned with usernames.  0 for accounts that aren't ranked.
+    @property
+    def ranks(self):
+        ranks = np.zeros(len(self.usernames), dtype=np.int64)
+        ranks[self.order] = np.arange(1, len(self.order) + 1)
+        return ranks
+
+    def entry(self, index):
+        return {
+            "username": self.usernames[index],
+            "change_amount": float(self.change_amount[index]),
+            "change_percent": float(self.change_percent[index]),
+            "trades": int(self.trades[index]),
+        }
+
+    def top(self, k):
+        return [self.entry(index) for index in self.order[:k]]
+
+    def bottom(self, k):
+        return [self.entry(index) for index in self.order[-k:]] if k else []
+
+    # Account with the largest positive return, or None if nobody gained.
+    def biggest_gain(self):
+        if not len(self.order) or not self.change_percent[self.order[0]] > 0:
+            return None
+        return self.entry(int(self.order[0]))
+
+    # Account with the largest negative return, or None if nobody lost.
+    def biggest_loss(self):
+        if not len(self.order) or not self.change_percent[self.order[-1]] < 0:
+            return None
+        # The first of the accounts tied for the worst return, matching the order top() lists ties in
+        worst = self.order[self.change_percent[self.order] == self.change_percent[self.order[-1]]]
+        return self.entry(int(worst[0]))
+
+    def most_active(self, k=3):
+        active = np.flatnonzero(self.trades > 0)
+        active = active[np.argsort(-self.trades[active], kind="stable")]
+        return [{"username": self.usernames[index], "trades": int(self.trades[index])} for index in active[:k]]
+
+    # The stats dict the daily summary embed is built from.
+    def summary(self):
+        gain = self.biggest_gain()
+        loss = self.biggest_loss()
+        return {
+            "performance": [self.entry(index) for index in self.order],
+            "most_active": self.most_active(3),
+            "biggest_gain": {"username": gain["username"], "amount": gain["change_amount"], "percent": gain["change_percent"]}
+            if gain else {"username": None, "amount": 0, "percent": 0},
+            "biggest_loss": {"username": loss["username"], "amount": loss["change_amount"], "percent": loss["change_percent"]}
+            if loss else {"username": None, "amount": 0, "percent": 0},
+            "total_trades": self.total_trades,
+        }
+
+def _money(record):
+    try:
+        return float(record[0])
+    except (TypeError, ValueError, IndexError):
+        return np.nan
+
+# Function to compute performance between two or more {username: [money, link, holdings]} snapshots, oldest first.
+# Accounts must appear in the first and last snapshot.  Trades are positions opened, closed or resized between
+# consecutive snapshots.  tables can supply already parsed HoldingsTables, with None for any to parse here.
+def compute_performance(snapshots, tables=None):
+    if len(snapshots) < 2:
+        raise ValueError("Performance needs at least two snapshots")
+    first, last = snapshots[0], snapshots[-1]
+    usernames = [username for username in last if username in first]
+    count = len(usernames)
+
+    start_values = np.fromiter((_money(first[username]) for username in usernames), dtype=np.float64, count=count)
+    end_values = np.fromiter((_money(last[username]) for username in usernames), dtype=np.float64, count=count)
+
+    tables = list(tables) if tables is not None else [None] * len(snapshots)
+    tables = [
+        table if table is not None else HoldingsTable.from_dict(snapshot) for snapshot, table in zip(snapshots, tables)
+    ]
+    rows = {username: row for row, username in enumerate(usernames)}
+    trades = np.zeros(count, dtype=np.int64)
+    for before, after in zip(tables, tables[1:]):
+        diff = diff_holdings(before, after)
+        diff_rows = np.array([rows.get(username, -1) for username in diff.usernames], dtype=np.int64)
+        counts = diff.counts()
+        keep = diff_rows >= 0
+        trades[diff_rows[keep]] += counts[keep]
+
+    return PerformanceReport(usernames, start_values, end_values, trades)
+
+# Function to get the naive EST start of a window ending at now.  "day" starts at the latest session open,
+# "season" at season_start (or the beginning of history when it isn't set).
+def window_start(window, now, season_start=None):
+    now = now.astimezone(EST)
+    if window == "day":
+        day = now.date()
+        for _ in range(14):
+            hours = session(day)
+            if hours is not None and hours[0] <= now:
+                return hours[0].replace(tzinfo=None)
+            day -= datetime.timedelta(days=1)
+        raise ValueError(f"No trading session within two weeks of {now}")
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    if window == "week":
+        return midnight - datetime.timedelta(days=midnight.weekday())
+    if window == "month":
+        return midnight.replace(day=1)
+    if window == "season":
+        return season_start if season_start is not None else datetime.datetime.min
+    raise ValueError(f"Unknown performance window '{window}', expected one of {', '.join(WINDOWS)}")
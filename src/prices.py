@@ -0,0 +1,198 @@
+import datetime
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from market import EST, session
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# Function to get the length of one bar for a yfinance interval string ("1d", "30m", "1h", ...).
+def bar_length(interval):
+    if interval.endswith("wk"):
+        return pd.Timedelta(weeks=int(interval[:-2] or 1))
+    if interval.endswith("mo"):
+        return pd.Timedelta(days=31 * int(interval[:-2] or 1))
+    if interval.endswith("m"):
+        return pd.Timedelta(minutes=int(interval[:-1] or 1))
+    return pd.Timedelta(interval)
+
+def _naive_utc(value):
+    value = pd.Timestamp(value)
+    return value.tz_convert("UTC").tz_localize(None) if value.tzinfo is not None else value
+
+def _normalize_frame(data, symbol):
+    if data is None or data.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    if isinstance(data.columns, pd.MultiIndex):
+        tickers = data.columns.get_level_values(-1)
+        data = data.xs(symbol, axis=1, level=-1) if symbol in tickers else data.droplevel(-1, axis=1)
+    data = data.copy()
+    data.index = pd.DatetimeIndex([_naive_utc(ts) for ts in data.index], name="Date")
+    for column in BAR_COLUMNS:
+        if column not in data.columns:
+            data[column] = data["Close"] if column == "Adj Close" and "Close" in data.columns else float("nan")
+    return data[BAR_COLUMNS]
+
+# Function to check whether any trading session overlaps [start, end), both naive UTC.
+def _has_session(start, end):
+    day = start.tz_localize("UTC").tz_convert(EST).date()
+    last = end.tz_localize("UTC").tz_convert(EST).date()
+    while day <= last:
+        hours = session(day)
+        if hours is not None and _naive_utc(hours[0]) < end and _naive_utc(hours[1]) > start:
+            return True
+        day += datetime.timedelta(days=1)
+    return False
+
+# Price source backed by Yahoo Finance through yfinance.
+class YahooSource:
+    def fetch(self, symbol, start, end, interval):
+        import yfinance as yf
+        data = yf.download(symbol, start=start, end=end, interval=interval, progress=False, auto_adjust=False)
+        return _normalize_frame(data, symbol)
+
+# Offline price source reading <SYMBOL>.csv files (Date, Open, High, Low, Close, Volume) from a directory.
+# Used by tests and air-gapped runs instead of Yahoo.
+class CSVSource:
+    def __init__(self, directory):
+        self.directory = directory
+        self._frames = {}
+
+    def fetch(self, symbol, start, end, interval):
+        if symbol not in self._frames:
+            path = os.path.join(self.directory, f"{symbol.upper()}.csv")
+            if not os.path.exists(path):
+                self._frames[symbol] = _normalize_frame(None, symbol)
+            else:
+                frame = pd.read_csv(path, index_col=0, parse_dates=True)
+                self._frames[symbol] = _normalize_frame(frame, symbol).sort_index()
+        frame = self._frames[symbol]
+        return frame[(frame.index >= _naive_utc(start)) & (frame.index < _naive_utc(end))]
+
+# Function to pick the price source from the environment: PRICE_SOURCE=csv with PRICE_FIXTURE_DIR for offline data.
+def make_price_source():
+    if os.environ.get("PRICE_SOURCE", "yahoo").lower() == "csv":
+        return CSVSource(os.environ.get("PRICE_FIXTURE_DIR", "./fixtures/prices"))
+    return YahooSource()
+
+# On-disk store of price bars keyed by symbol, interval and bar time.  It remembers which
+# ranges have already been fetched, asks the source only for the missing pieces, and
+# serves everything else from SQLite.  Bars that may still change (today's) are never
+# marked as covered so they are refreshed on the next request, and neither is a range that
+# came back empty even though the market was open in it.
+class PriceStore:
+    def __init__(self, db_path, source=None):
+        self.db_path = db_path
+        self.source = source or make_price_source()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume REAL,
+                PRIMARY KEY (symbol, interval, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coverage (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS coverage_symbol ON coverage (symbol, interval);
+            """
+        )
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # Bars for symbol in [start, end) as a DataFrame indexed by naive UTC timestamps.  Blocking; run it in a thread.
+    def get_bars(self, symbol, start, end, interval="1d"):
+        symbol = symbol.upper()
+        start, end = _naive_utc(start), _naive_utc(end)
+        with self._lock:
+            for gap_start, gap_end in self._missing_ranges(symbol, interval, start, end):
+                try:
+                    frame = self.source.fetch(symbol, gap_start, gap_end, interval)
+                except Exception as e:
+                    print(f"Error fetching {symbol} prices for {gap_start} - {gap_end}: {e}")
+                    continue
+                self._store(symbol, interval, frame)
+                settled_end = min(gap_end, self._settled_until(interval))
+                # yfinance reports throttling and transient failures as an empty frame rather than an error,
+                # so an empty answer only counts as covered when the market had no session in the gap
+                if frame.empty and _has_session(gap_start, settled_end):
+                    continue
+                if settled_end > gap_start:
+                    self._add_coverage(symbol, interval, gap_start, settled_end)
+            self._db.commit()
+            return self._load(symbol, interval, start, end)
+
+    def _settled_until(self, interval):
+        now = pd.Timestamp(datetime.datetime.now(datetime.timezone.utc)).tz_localize(None)
+        if interval.endswith(("d", "wk", "mo")):
+            return now.floor("D")
+        return now.floor(bar_length(interval))
+
+    def _coverage(self, symbol, interval):
+        rows = self._db.execute(
+            "SELECT start, end FROM coverage WHERE symbol = ? AND interval = ? ORDER BY start",
+            (symbol, interval),
+        ).fetchall()
+        return [(pd.Timestamp(s, unit="s"), pd.Timestamp(e, unit="s")) for s, e in rows]
+
+    def _missing_ranges(self, symbol, interval, start, end):
+        missing = []
+        cursor = start
+        for covered_start, covered_end in self._coverage(symbol, interval):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def _add_coverage(self, symbol, interval, start, end):
+        merged = []
+        for s, e in sorted(self._coverage(symbol, interval) + [(start, end)]):
+            if merged and s <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        self._db.execute("DELETE FROM coverage WHERE symbol = ? AND interval = ?", (symbol, interval))
+        self._db.executemany(
+            "INSERT INTO coverage (symbol, interval, start, end) VALUES (?, ?, ?, ?)",
+            [(symbol, interval, int(s.timestamp()), int(e.timestamp())) for s, e in merged],
+        )
+
+    def _store(self, symbol, interval, frame):
+        if frame.empty:
+            return
+        rows = [
+            (symbol, interval, int(ts.timestamp()), *[None if pd.isna(v) else float(v) for v in values])
+            for ts, values in zip(frame.index, frame[BAR_COLUMNS].itertuples(index=False, name=None))
+        ]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _load(self, symbol, interval, start, end):
+        rows = self._db.execute(
+            "SELECT ts, open, high, low, close, adj_close, volume FROM bars "
+            "WHERE symbol = ? AND interval = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (symbol, interval, int(start.timestamp()), int(end.timestamp())),
+        ).fetchall()
+        index = pd.DatetimeIndex([pd.Timestamp(row[0], unit="s") for row in rows], name="Date")
+        return pd.DataFrame([row[1:] for row in rows], index=index, columns=BAR_COLUMNS)
@@ -0,0 +1,78 @@
+import math
+from bisect import bisect_left, insort
+
+from leaderboard import rank_key
+
+# Live ranking of every account by money, in the same order as Leaderboard.  It is updated in
+# place when a new snapshot lands.  Rank and neighbour lookups are O(log n) and top-k is O(k).
+# A snapshot usually changes the money of most accounts, and then update is a plain re-sort:
+# the new keys are laid out in the previous rank order, so the sort mostly walks runs that are
+# already in order.  Only when a few accounts changed are they moved one by one, each an O(n)
+# list insert.  Accounts whose money isn't a finite number are left out rather than ranked
+# arbitrarily.
+class RankIndex:
+    def __init__(self):
+        self._keys = []
+        self._money = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, name):
+        return name in self._money
+
+    # Apply a {name: money} mapping as the new state.  Returns how many accounts moved, joined or left.
+    def update(self, values):
+        values = {name: money for name, money in values.items() if math.isfinite(money)}
+        changed = [name for name in self._money if name not in values]
+        changed += [
+            name for name, money in values.items()
+            if name not in self._money or rank_key(name, money) != rank_key(name, self._money[name])
+        ]
+        if len(changed) > len(self._keys) // 4:
+            # Most of the board changed, re-sort instead of moving accounts one by one.  Keeping the
+            # previous order puts the keys nearly in order already, which the sort runs through quickly.
+            keys = [rank_key(name, values[name]) for _, name in self._keys if name in values]
+            keys += [rank_key(name, money) for name, money in values.items() if name not in self._money]
+            keys.sort()
+            self._money = dict(values)
+            self._keys = keys
+            return len(changed)
+
+        for name in changed:
+            if name in self._money:
+                self._remove(rank_key(name, self._money.pop(name)))
+            if name in values:
+                self._money[name] = values[name]
+                insort(self._keys, rank_key(name, values[name]))
+        return len(changed)
+
+    # 1-based rank of name, or None if the account isn't ranked.
+    def rank(self, name):
+        money = self._money.get(name)
+        if money is None:
+            return None
+        return bisect_left(self._keys, rank_key(name, money)) + 1
+
+    # (rank, name, money) for the account at a 1-based rank.
+    def at(self, rank):
+        _, name = self._keys[rank - 1]
+        return rank, name, self._money[name]
+
+    # The top k accounts as (rank, name, money) tuples.
+    def top(self, k):
+        return [(rank, name, self._money[name]) for rank, (_, name) in enumerate(self._keys[:k], 1)]
+
+    # Up to count accounts directly above and below name, each as (rank, name, money) tuples.
+    def neighbours(self, name, count=1):
+        rank = self.rank(name)
+        if rank is None:
+            return [], []
+        above = [self.at(r) for r in range(max(1, rank - count), rank)]
+        below = [self.at(r) for r in range(rank + 1, min(len(self._keys), rank + count) + 1)]
+        return above, below
+
+    def _remove(self, key):
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Configuration for the chart rendering pool, overridable from the environment.
+RENDER_POOL_SIZE = int(os.environ.get('RENDER_POOL_SIZE', min(4, os.cpu_count() or 1)))
+RENDER_TIMEOUT = float(os.environ.get('RENDER_TIMEOUT', 30))
+
+# Worker initializer: import plotly and kaleido once and render a throwaway figure so the
+# first real request does not pay for the imports.  On kaleido v1 a persistent browser is
+# kept running for the life of the worker, but only after a plain render proves it can start.
+def _warm_worker():
+    try:
+        _render_png({'data': [{'type': 'scatter', 'x': [0], 'y': [0]}], 'layout': {}})
+    except Exception as e:
+        print(f"Error warming chart renderer: {e}")
+        return
+    try:
+        import kaleido
+        if hasattr(kaleido, 'start_sync_server'):
+            kaleido.start_sync_server(silence_warnings=True)
+    except Exception as e:
+        print(f"Error starting persistent kaleido server: {e}")
+
+# Runs inside a worker process: turn a figure spec (Figure.to_dict()) into PNG bytes.
+def _render_png(spec, width=None, height=None):
+    import plotly.io as pio
+    return pio.to_image(spec, format='png', width=width, height=height, validate=False)
+
+def _ping():
+    return os.getpid()
+
+# Renders Plotly figures to PNG in a pool of long-lived worker processes so kaleido never
+# blocks the bot's event loop.  Figures go over as plain dict specs and come back as bytes.
+class ChartRenderer:
+    def __init__(self, pool_size=RENDER_POOL_SIZE, timeout=RENDER_TIMEOUT):
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._pool = None
+
+    # Start the worker processes, each warmed up immediately.  Workers come from a forkserver rather than a
+    # fork of the bot: by the time the pool starts or restarts the bot has I/O and watchdog threads, and a
+    # forked child can inherit a lock one of them was holding.  The forkserver is a fresh single-threaded
+    # process that imports plotly once for every worker.  Like any spawned process, a worker re-runs the
+    # main module as __mp_main__; bot.py only starts the bot under __main__, so that costs its imports.
+    def start(self):
+        if self._pool is not None:
+            return
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['render', 'plotly.io'])
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=context,
+            initializer=_warm_worker,
+        )
+        for _ in range(self.pool_size):
+            self._pool.submit(_ping)
+
+    def shutdown(self):
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            # Stuck renders would otherwise keep the interpreter from exiting
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # Replace the worker pool.  Given the pool a failed render ran on, only replaces that pool, so renders
+    # that fail together restart it once instead of each killing the one the previous restart built.
+    def restart(self, pool=None):
+        if pool is not None and pool is not self._pool:
+            return
+        self.shutdown()
+        self.start()
+
+    # Render a plotly Figure (or a figure dict) and return the PNG bytes.  Raises asyncio.TimeoutError past the
+    # timeout, and BrokenProcessPool if the pool broke or was restarted under the render.
+    async def render(self, fig, width=None, height=None, timeout=None):
+        spec = fig if isinstance(fig, dict) else fig.to_dict()
+        self.start()
+        pool = self._pool
+        future = asyncio.get_running_loop().run_in_executor(pool, _render_png, spec, width, height)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            # The worker is still stuck on this figure; replace the pool so it doesn't hold a slot forever
+            print("Chart render timed out, restarting rendering pool")
+            self.restart(pool)
+            raise
+        except BrokenProcessPool:
+            # A worker died (e.g. the browser crashed); replace the pool so later renders still work
+            print("Chart rendering pool broke, restarting it")
+            self.restart(pool)
+            raise
+        except asyncio.CancelledError:
+            # A restart for another render cancelled this one's queued job; that is a failed render, not a
+            # cancelled command, unless this task is the one being cancelled
+            task = asyncio.current_task()
+            if not future.cancelled() or (task is not None and task.cancelling()):
+                raise
+            raise BrokenProcessPool("Chart rendering pool was restarted during the render")
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+import time
+
+from fileio import FILE_IO
+
+# Target time from process start to gateway ready, in seconds.
+STARTUP_BUDGET = float(os.environ.get('STARTUP_BUDGET', 2.0))
+
+# Records how long each startup stage took.  mark(stage) closes the stage that ends at that
+# moment; report() prints the breakdown against the budget.
+class StartupTimer:
+    def __init__(self, budget=STARTUP_BUDGET):
+        self.budget = budget
+        self.started = time.perf_counter()
+        self.stages = []
+        self._last = self.started
+        self.reported = False
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    @property
+    def elapsed(self):
+        return self._last - self.started
+
+    def report(self):
+        self.reported = True
+        breakdown = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stages)
+        status = "within" if self.elapsed <= self.budget else "OVER"
+        print(f"Startup: {breakdown} (total {self.elapsed:.2f}s, {status} the {self.budget:.2f}s budget)")
+
+# Function to hash the slash command definitions, so the tree is only synced with Discord when it changes.
+def command_tree_hash(tree):
+    payload = []
+    for command in tree.get_commands():
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            # discord.py before 2.4 takes no tree argument
+            payload.append(command.to_dict())
+    payload.sort(key=lambda command: (command.get('type', 1), command['name']))
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode('utf-8'), digest_size=16).hexdigest()
+
+# Function to sync the command tree only if its hash differs from the one stored at hash_path.
+# Returns the number of commands synced, or None when the sync was skipped.
+async def sync_command_tree(tree, hash_path):
+    digest = command_tree_hash(tree)
+    try:
+        if (await FILE_IO.read_text(hash_path)).strip() == digest:
+            return None
+    except FileNotFoundError:
+        pass
+    synced = await tree.sync()
+    await FILE_IO.write(hash_path, digest)
+    return len(synced)
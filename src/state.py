@@ -0,0 +1,242 @@
+# Long-lived bot state: configuration, caches, indexes and background services.  The
+# extensions import from here and this module is never reloaded, so everything below
+# survives `bot.reload_extension` and a code update doesn't throw away warm caches.
+import asyncio
+import datetime
+import os
+import threading
+import time
+import traceback
+from collections import deque
+
+from pytz import timezone
+
+from history import HistoryStore
+from render import ChartRenderer
+from cache import AsyncLRUCache
+from autocomplete import UsernameAutocomplete
+from loader import LeaderboardLoader, UserRecordIndex
+from ranks import RankIndex
+from notifier import BatchNotifier
+from outbox import SendScheduler, BULK
+from market import MarketScheduler
+from control import DEFAULT_SOCKET_PATH
+from checkpoint import Checkpointer
+from watchdog import LoopWatchdog
+from metrics import (
+    METRICS,
+    InstrumentedSemaphore,
+    MetricsServer,
+    register_cache,
+    register_semaphores,
+    register_send_scheduler,
+    register_file_io,
+)
+from fileio import FILE_IO
+
+# Define file paths using environment variables for flexibility and maintainability.
+PATH_TO_LEADERBOARD_DATA = os.environ.get('PATH_TO_LEADERBOARD_DATA')
+LEADERBOARDS_DIR = os.path.join(PATH_TO_LEADERBOARD_DATA, 'backend/leaderboards')
+IN_TIME_DIR = os.path.join(LEADERBOARDS_DIR, 'in_time')
+LEADERBOARD_LATEST = os.path.join(LEADERBOARDS_DIR, 'leaderboard-latest.json')
+USERNAMES_PATH = os.path.join(PATH_TO_LEADERBOARD_DATA, 'backend/portfolios/usernames.txt')
+SNAPSHOTS_DIR = "./snapshots"
+SNAPSHOT_PATH = os.path.join(SNAPSHOTS_DIR, "leaderboard-snapshot.json")
+MORNING_SNAPSHOT_PATH = os.path.join(SNAPSHOTS_DIR, "morning-snapshot.json")
+LAST_UPDATE_FILE = os.path.join(SNAPSHOTS_DIR, "last_update.txt")
+HISTORY_ARCHIVE_PATH = os.path.join(SNAPSHOTS_DIR, "history.lsha")
+PRICE_DB_PATH = os.path.join(SNAPSHOTS_DIR, "prices.sqlite")
+COMMAND_TREE_HASH_PATH = os.path.join(SNAPSHOTS_DIR, "command-tree.hash")
+STOCK_NOTIFICATIONS_JOURNAL = os.path.join(SNAPSHOTS_DIR, "stock-notifications.json")
+WARM_CACHE_PATH = os.path.join(SNAPSHOTS_DIR, "warm-cache.ckpt")
+CONTROL_SOCKET_PATH = os.environ.get('CONTROL_SOCKET_PATH', DEFAULT_SOCKET_PATH)
+
+# Optional first day of the current season (YYYY-MM-DD) for /performance season.  Defaults to the start of history.
+SEASON_START = (
+    datetime.datetime.strptime(os.environ["SEASON_START"], "%Y-%m-%d") if os.environ.get("SEASON_START") else None
+)
+
+# Create necessary directories
+os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
+
+# Define time zones for Eastern and Pacific Standard Time.
+EST = timezone('US/Eastern')
+PST = timezone('America/Los_Angeles')
+
+# Concurrency limit for market data downloads.  File operations are bounded by the FILE_IO pool (IO_WORKERS threads).
+MAX_CONCURRENT_API_CALLS = 5
+API_SEMAPHORE = InstrumentedSemaphore("api_calls", MAX_CONCURRENT_API_CALLS)
+TASK_QUEUE = deque()
+
+# In-memory account value history, filled at startup and extended as new in_time files arrive.
+HISTORY = HistoryStore(IN_TIME_DIR)
+# Set once the startup load of the in_time files has finished.  Chart and report requests that arrive
+# earlier wait on it rather than draw from a partial history.
+HISTORY_LOADED = asyncio.Event()
+
+# On-disk price bars for the S&P 500 overlay and holdings.  Set PRICE_SOURCE=csv to read offline fixtures.
+# Opened on first use, since it brings in pandas.
+PRICE_STORE = None
+PRICE_STORE_LOCK = threading.Lock()
+
+def get_price_store():
+    global PRICE_STORE
+    with PRICE_STORE_LOCK:
+        if PRICE_STORE is None:
+            from prices import PriceStore
+            PRICE_STORE = PriceStore(PRICE_DB_PATH)
+        return PRICE_STORE
+
+# Process pool that renders charts off the event loop.
+RENDERER = ChartRenderer()
+
+# Rendered chart PNGs keyed by chart kind, parameters and the latest in_time snapshot.
+CHART_CACHE_SIZE = 64
+CHART_CACHE = AsyncLRUCache(max_entries=CHART_CACHE_SIZE)
+
+# Market data from yfinance, keyed by symbol, bar interval and the requested range rounded out to whole bars.
+MARKET_DATA_CACHE_SIZE = 128
+MARKET_DATA_TTL = 3600
+MARKET_DATA_CACHE = AsyncLRUCache(max_entries=MARKET_DATA_CACHE_SIZE, ttl=MARKET_DATA_TTL)
+
+# Performance reports keyed by (window, start snapshot, current snapshot digest).
+PERFORMANCE_CACHE = AsyncLRUCache(max_entries=32)
+
+# Every outgoing message goes through one scheduler: interaction replies first, then scheduled posts, then bulk notifications.
+SEND_SCHEDULER = SendScheduler()
+
+# Stock change notifications are packed up to 10 embeds per message and journaled so a crash doesn't replay them.
+STOCK_NOTIFIER = BatchNotifier(
+    STOCK_NOTIFICATIONS_JOURNAL, sender=lambda channel, **kwargs: SEND_SCHEDULER.send(channel, BULK, **kwargs)
+)
+
+# (digest, HoldingsTable) of the snapshot the stock change check last saved.
+LAST_COMPARED_HOLDINGS = None
+
+# Shared change-aware loader for leaderboard-latest.json.
+LEADERBOARD_LOADER = LeaderboardLoader(LEADERBOARD_LATEST)
+
+# Byte offsets of each user's record in leaderboard-latest.json, for one-user lookups like /userinfo.
+USER_RECORDS = UserRecordIndex(LEADERBOARD_LATEST)
+
+# Live ranking of every account, moved incrementally each time a new leaderboard snapshot lands.
+RANK_INDEX = RankIndex()
+
+async def update_rank_index(snapshot):
+    moved = RANK_INDEX.update({account.name: account.money for account in snapshot.leaderboard})
+    print(f"Rank index updated, {moved} account(s) moved")
+
+LEADERBOARD_LOADER.add_listener(update_rank_index)
+
+# Username autocomplete index, rebuilt in the background when usernames.txt or the latest leaderboard changes.
+USERNAME_AUTOCOMPLETE = UsernameAutocomplete(USERNAMES_PATH, LEADERBOARD_LOADER)
+LEADERBOARD_LOADER.add_listener(USERNAME_AUTOCOMPLETE.on_leaderboard_change)
+
+# Sleeps until the next session open or close; weekends and NYSE holidays are skipped and half-days close at 1 PM.
+MARKET_SCHEDULER = MarketScheduler()
+
+# Function to record when the last scheduled leaderboard update went out.  Kept in memory and written to disk so a restart doesn't post again early.
+async def save_last_update_time(when):
+    global LAST_LEADERBOARD_UPDATE
+    LAST_LEADERBOARD_UPDATE = when
+    try:
+        await FILE_IO.write(LAST_UPDATE_FILE, when.isoformat())
+    except Exception as e:
+        print(f"Error saving last update time: {e}")
+        traceback.print_exc()
+
+# Function to read the last update time saved by a previous run.  Only called once at import, before the loop starts.
+def get_last_update_time():
+    try:
+        if os.path.exists(LAST_UPDATE_FILE):
+            with open(LAST_UPDATE_FILE, 'r') as f:
+                timestamp_str = f.read().strip()
+                return datetime.datetime.fromisoformat(timestamp_str)
+    except Exception as e:
+        print(f"Error reading last update time: {e}")
+    return None
+
+LAST_LEADERBOARD_UPDATE = get_last_update_time()
+
+# Latency histograms, cache, semaphore and send queue metrics, served on 127.0.0.1:METRICS_PORT/metrics and by /botstats.
+register_cache(METRICS, "charts", CHART_CACHE)
+register_cache(METRICS, "market_data", MARKET_DATA_CACHE)
+register_cache(METRICS, "performance", PERFORMANCE_CACHE)
+register_semaphores(METRICS, [API_SEMAPHORE])
+register_file_io(METRICS, FILE_IO)
+register_send_scheduler(METRICS, SEND_SCHEDULER)
+METRICS_SERVER = MetricsServer(METRICS)
+
+# Logs the stack of anything that blocks the event loop for longer than STALL_THRESHOLD seconds.
+LOOP_WATCHDOG = LoopWatchdog()
+
+# Warm caches are checkpointed every CHECKPOINT_INTERVAL seconds and on shutdown, and restored at startup
+# after checking them against the leaderboard and in_time files on disk.
+CHECKPOINTER = Checkpointer(WARM_CACHE_PATH)
+
+def _dump_cache(cache):
+    now = time.time()
+    return [(key, value, None if ttl is None else now + ttl) for key, value, ttl in cache.items()]
+
+def _restore_cache(cache, saved, valid):
+    now = time.time()
+    kept = 0
+    for key, value, expires_at in saved:
+        if (expires_at is None or expires_at > now) and valid(key):
+            cache.put(key, value, ttl=None if expires_at is None else expires_at - now)
+            kept += 1
+    return kept
+
+def _dump_holdings():
+    snapshot = LEADERBOARD_LOADER.snapshot
+    return {
+        "current": (snapshot.digest, snapshot.holdings) if snapshot is not None else None,
+        "compared": LAST_COMPARED_HOLDINGS,
+    }
+
+async def _restore_holdings(saved):
+    global LAST_COMPARED_HOLDINGS
+    if saved["current"] is not None:
+        LEADERBOARD_LOADER.warm_holdings(*saved["current"])
+    # compare_stock_changes checks the digest against the saved snapshot file before using it
+    LAST_COMPARED_HOLDINGS = saved["compared"]
+    # Load the leaderboard now, so the sections after this one can check their keys against it
+    snapshot = await LEADERBOARD_LOADER.reload()
+    reused = snapshot is not None and saved["current"] is not None and snapshot.holdings is saved["current"][1]
+    return int(reused) + int(saved["compared"] is not None)
+
+def _restore_history(saved):
+    if not HISTORY.restore_state(saved):
+        return 0
+    # Only the in_time files written since the checkpoint are read
+    HISTORY.refresh()
+    return len(HISTORY)
+
+def _current_digest():
+    snapshot = LEADERBOARD_LOADER.snapshot
+    return snapshot.digest if snapshot is not None else None
+
+CHECKPOINTER.register("holdings", _dump_holdings, _restore_holdings)
+CHECKPOINTER.register(
+    "history",
+    lambda: HISTORY.checkpoint_state() if len(HISTORY) else None,
+    lambda saved: FILE_IO.run(_restore_history, saved, op="history"),
+)
+# Chart keys end with the newest in_time timestamp they were drawn from, performance keys with the leaderboard digest
+CHECKPOINTER.register(
+    "charts",
+    lambda: _dump_cache(CHART_CACHE),
+    lambda saved: _restore_cache(
+        CHART_CACHE, saved, lambda key: HISTORY.latest_timestamp is not None and key[-1] == HISTORY.latest_timestamp
+    ),
+)
+CHECKPOINTER.register(
+    "market_data",
+    lambda: _dump_cache(MARKET_DATA_CACHE),
+    lambda saved: _restore_cache(MARKET_DATA_CACHE, saved, lambda key: True),
+)
+CHECKPOINTER.register(
+    "performance",
+    lambda: _dump_cache(PERFORMANCE_CACHE),
+    lambda saved: _restore_cache(PERFORMANCE_CACHE, saved, lambda key: key[-1] == _current_digest()),
+)
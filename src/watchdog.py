@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from metrics import METRICS, task_operation
+
+# Seconds the event loop can go without running a callback before it counts as stalled.
+# Discord expects an interaction response within 3 seconds and a gateway heartbeat every ~40.
+STALL_THRESHOLD = float(os.environ.get('STALL_THRESHOLD', 0.5))
+
+# Seconds between lag probes.  Each probe is one call_soon_threadsafe, so this can stay short.
+PROBE_INTERVAL = 0.1
+MAX_STALLS = 20
+STACK_LIMIT = 30
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# One stall: when it started, how long the loop was blocked, what was running and where.
+class Stall:
+    __slots__ = ("started_at", "duration", "operation", "stage", "task", "stack")
+
+    def __init__(self, started_at, operation, stage, task, stack):
+        self.started_at = started_at
+        self.duration = None
+        self.operation = operation
+        self.stage = stage
+        self.task = task
+        self.stack = stack
+
+    # The innermost frame from the bot's own code, for one-line summaries.
+    @property
+    def location(self):
+        for line in reversed(self.stack):
+            if SRC_DIR in line and "metrics.py" not in line:
+                return line.strip().splitlines()[0].replace(SRC_DIR + os.sep, "")
+        return self.stack[-1].strip().splitlines()[0] if self.stack else "unknown"
+
+# Watchdog thread that measures event loop lag.  Every PROBE_INTERVAL it schedules a callback on the
+# loop and waits for it to run; the wait is the lag.  If it takes longer than threshold, the loop
+# thread's stack is captured while it is still blocked, along with the command or task that was
+# running, and the stall is logged once the loop gets going again.
+class LoopWatchdog:
+    def __init__(self, threshold=STALL_THRESHOLD, interval=PROBE_INTERVAL, registry=METRICS):
+        self.threshold = threshold
+        self.interval = interval
+        self.registry = registry
+        self.stalls = deque(maxlen=MAX_STALLS)
+        self.loop = None
+        self._loop_thread = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._answered = threading.Event()
+
+    # Call from the event loop that should be watched.
+    def start(self):
+        if not self.threshold or (self._thread is not None and self._thread.is_alive()):
+            return
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._answered.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self._answered.clear()
+            sent = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(self._answered.set)
+            except RuntimeError:
+                return  # loop closed
+            stall = None
+            if not self._answered.wait(self.threshold):
+                stall = self._capture(sent)
+                self._answered.wait()
+            if self._stopping.is_set():
+                return
+            lag = time.perf_counter() - sent
+            if stall is not None:
+                stall.duration = lag
+            try:
+                self.loop.call_soon_threadsafe(self._record, lag, stall)
+            except RuntimeError:
+                return
+
+    # Runs on the watchdog thread while the loop is blocked.
+    def _capture(self, sent):
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = traceback.format_list(traceback.extract_stack(frame, limit=STACK_LIMIT)) if frame is not None else []
+        del frame
+        task = asyncio.current_task(self.loop)
+        operation = task_operation(task) if task is not None else None
+        return Stall(
+            time.time() - (time.perf_counter() - sent),
+            operation[0] if operation else "untracked",
+            operation[1] if operation else None,
+            task.get_name() if task is not None else None,
+            stack,
+        )
+
+    # Runs on the loop, so metrics are only ever updated from one thread.
+    def _record(self, lag, stall):
+        self.registry.observe("bot_loop_lag_seconds", lag)
+        if stall is None:
+            return
+        self.stalls.append(stall)
+        self.registry.observe("bot_loop_stall_seconds", stall.duration, operation=stall.operation)
+        where = f"{stall.operation}" + (f" ({stall.stage})" if stall.stage else "")
+        if stall.task:
+            where += f" in task {stall.task}"
+        print(f"Event loop blocked for {stall.duration:.2f}s during {where}:\n{''.join(stall.stack)}", end="")
@@ -0,0 +1,23 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The bot's modules import each other as top-level modules from src/, the way `python ./src/bot.py` runs them.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+@pytest.fixture
+def in_time_dir(tmp_path):
+    directory = tmp_path / "in_time"
+    directory.mkdir()
+    return directory
+
+# Function to write a {username: [money, link, holdings]} snapshot into in_time_dir under its timestamped name.
+@pytest.fixture
+def write_snapshot(in_time_dir):
+    def write(timestamp, data):
+        path = in_time_dir / timestamp.strftime("leaderboard-%Y-%m-%d-%H_%M.json")
+        path.write_text(json.dumps(data))
+        return path
+    return write
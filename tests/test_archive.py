@@ -0,0 +1,61 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from archive import HistoryArchive, write_archive
+from history import HistoryStore
+
+T0 = datetime.datetime(2025, 1, 6, 9, 30)
+
+def minutes(n):
+    return T0 + datetime.timedelta(minutes=n)
+
+def test_round_trip(tmp_path, write_snapshot):
+    write_snapshot(minutes(5), {
+        "alice": [105, "https://example.com/alice", [["AAPL", "$1,234.50", "12.5%"], ["MSFT", "$10.00", "-3.25%"]]],
+        "bob": [90, None, []],
+    })
+    write_snapshot(minutes(0), {"alice": [100, None, [["AAPL", "$1,000.00", "0%"]]]})
+    path = str(tmp_path / "history.lsha")
+
+    assert write_archive(str(tmp_path / "in_time"), path) == (2, 2, 3)
+    with HistoryArchive(path) as archive:
+        assert len(archive) == 2
+        assert list(archive.timestamps) == [np.datetime64(minutes(0), "m"), np.datetime64(minutes(5), "m")]
+        assert archive.usernames == ["alice", "bob"]
+        assert list(archive.series("alice")[1]) == [100, 105]
+        assert list(archive.series("bob")[1]) == [90]
+        assert len(archive.series("nobody")[0]) == 0
+        assert archive.holdings("alice", 1) == [("AAPL", 1234.5, 12.5), ("MSFT", 10.0, -3.25)]
+        assert archive.holdings("bob", 1) == []
+        assert archive.snapshot(0) == {"alice": [100.0, None, [["AAPL", 1000.0, 0.0]]]}
+
+def test_unparseable_holding_values_round_trip_as_none(tmp_path, write_snapshot):
+    write_snapshot(minutes(0), {"alice": [100, None, [["AAPL", "n/a", "--"]]]})
+    path = str(tmp_path / "history.lsha")
+    write_archive(str(tmp_path / "in_time"), path)
+
+    with HistoryArchive(path) as archive:
+        assert archive.holdings("alice", 0) == [("AAPL", None, None)]
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not-an-archive.lsha"
+    path.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        HistoryArchive(str(path))
+
+def test_history_store_extends_an_archive(tmp_path, write_snapshot):
+    write_snapshot(minutes(0), {"alice": [100, None, []]})
+    write_snapshot(minutes(5), {"alice": [105, None, []]})
+    path = str(tmp_path / "history.lsha")
+    write_archive(str(tmp_path / "in_time"), path)
+    write_snapshot(minutes(10), {"alice": [110, None, []], "bob": [50, None, []]})
+
+    store = HistoryStore(tmp_path / "in_time")
+    store.attach_archive(HistoryArchive(path))
+    # Only the file written after the archive is read
+    assert store.refresh() == 1
+    assert len(store) == 3
+    assert list(store.series("alice")[1]) == [100, 105, 110]
+    assert list(store.series("bob")[1]) == [50]
@@ -0,0 +1,28 @@
+from autocomplete import MAX_CHOICES, UsernameIndex
+
+def test_ranked_names_come_first_in_rank_order():
+    index = UsernameIndex(["zed", "ann", "bob"], {"zed": 1, "bob": 2})
+    assert index.names == ["zed", "bob", "ann"]
+
+def test_unranked_names_are_alphabetical():
+    index = UsernameIndex(["Carol", "alice", "bob"])
+    assert index.names == ["alice", "bob", "Carol"]
+
+def test_prefix_matches_come_before_substring_matches():
+    index = UsernameIndex(["mark", "amy", "marie", "sam"], {"sam": 1, "amy": 2, "marie": 3, "mark": 4})
+    # amy starts with "am" and goes ahead of the better-ranked sam, which only contains it
+    assert index.search("am") == ["amy", "sam"]
+    assert index.search("MAR") == ["marie", "mark"]
+    assert index.search("xyz") == []
+
+def test_empty_query_returns_the_best_ranked():
+    index = UsernameIndex([f"user{i}" for i in range(40)], {"user39": 1})
+    assert index.search("")[0] == "user39"
+    assert len(index.search("")) == MAX_CHOICES
+    assert len(index.search("", limit=3)) == 3
+
+def test_prefix_search_past_the_trie_summary():
+    names = [f"player{i:03d}" for i in range(100)]
+    index = UsernameIndex(names)
+    assert index.search("player", limit=60) == names[:60]
+    assert index.search("player09") == [f"player09{i}" for i in range(10)]
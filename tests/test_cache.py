@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from cache import AsyncLRUCache
+
+def test_concurrent_misses_share_one_computation():
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "chart"
+
+    async def main():
+        cache = AsyncLRUCache()
+        results = await asyncio.gather(*(cache.get_or_create("key", create) for _ in range(5)))
+        return cache, results
+
+    cache, results = asyncio.run(main())
+    assert results == ["chart"] * 5
+    assert len(calls) == 1
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 4
+    assert cache.get("key") == "chart"
+
+def test_one_caller_giving_up_does_not_cancel_the_others():
+    async def create():
+        await asyncio.sleep(0.02)
+        return "chart"
+
+    async def main():
+        cache = AsyncLRUCache()
+        impatient = asyncio.ensure_future(cache.get_or_create("key", create))
+        patient = asyncio.ensure_future(cache.get_or_create("key", create))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient, impatient.cancelled()
+
+    assert asyncio.run(main()) == ("chart", True)
+
+def test_failures_and_none_results_are_not_cached():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("download failed")
+        return None if len(attempts) == 2 else "data"
+
+    async def main():
+        cache = AsyncLRUCache()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_create("key", flaky)
+        assert await cache.get_or_create("key", flaky) is None
+        assert await cache.get_or_create("key", flaky) == "data"
+        assert await cache.get_or_create("key", flaky) == "data"
+
+    asyncio.run(main())
+    assert len(attempts) == 3
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AsyncLRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_expired_entries_are_dropped():
+    cache = AsyncLRUCache(ttl=60)
+    cache.put("fresh", 1)
+    cache.put("stale", 2, ttl=-1)
+    assert cache.get("stale") is None
+    assert [key for key, _, _ in cache.items()] == ["fresh"]
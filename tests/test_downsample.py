@@ -0,0 +1,57 @@
+import datetime
+
+import numpy as np
+
+from downsample import downsample_grid, downsample_indices, lttb, time_axis
+
+def noisy_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64), np.cumsum(rng.normal(size=n))
+
+def test_lttb_keeps_the_endpoints_and_the_budget():
+    x, y = noisy_series(10_000)
+    picked = lttb(x, y, 500)
+    assert len(picked) == 500
+    assert picked[0] == 0 and picked[-1] == len(x) - 1
+    assert np.all(np.diff(picked) > 0)
+
+def test_lttb_keeps_a_lone_spike():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[437] = 50
+    assert 437 in lttb(x, y, 50)
+
+def test_short_series_are_left_alone():
+    x, y = noisy_series(100)
+    assert list(lttb(x, y, 500)) == list(range(100))
+    assert list(downsample_indices(x, y, 500)) == list(range(100))
+
+def test_downsample_indices_keeps_the_extremes():
+    for seed in range(5):
+        x, y = noisy_series(5000, seed)
+        picked = downsample_indices(x, y, 100)
+        assert len(picked) <= 100
+        assert int(y.argmin()) in picked and int(y.argmax()) in picked
+
+def test_downsample_indices_skips_missing_snapshots():
+    x, y = noisy_series(2000)
+    y[::3] = np.nan
+    picked = downsample_indices(x, y, 100)
+    assert not np.isnan(y[picked]).any()
+    assert np.nanargmax(y) in picked and np.nanargmin(y) in picked
+
+def test_downsample_grid_shares_one_axis_and_keeps_each_rows_extremes():
+    x, first = noisy_series(3000, 1)
+    _, second = noisy_series(3000, 2)
+    rows = np.vstack((first, second))
+    columns = downsample_grid(x, rows, 200)
+    assert len(columns) <= 200
+    assert np.all(np.diff(columns) > 0)
+    for row in rows:
+        assert int(row.argmin()) in columns and int(row.argmax()) in columns
+
+def test_time_axis_is_in_minutes():
+    timestamps = np.array([datetime.datetime(2025, 1, 6, 9, 30), datetime.datetime(2025, 1, 6, 10, 0)], dtype="datetime64[m]")
+    axis = time_axis(timestamps)
+    assert axis.dtype == np.float64
+    assert axis[1] - axis[0] == 30
@@ -0,0 +1,146 @@
+import datetime
+
+import numpy as np
+
+from archive import HistoryArchive, write_archive
+from history import HistoryStore, parse_leaderboard_timestamp
+
+T0 = datetime.datetime(2025, 1, 6, 9, 30)
+
+def minutes(n):
+    return T0 + datetime.timedelta(minutes=n)
+
+def test_parse_leaderboard_timestamp():
+    assert parse_leaderboard_timestamp("leaderboard-2025-01-06-09_30.json") == T0
+
+def test_append_builds_series_per_user(tmp_path):
+    store = HistoryStore(tmp_path, initial_capacity=2)
+    store.append(minutes(0), {"alice": [100, ""], "bob": [50, ""]})
+    store.append(minutes(5), {"alice": [110, ""]})
+    store.append(minutes(10), {"alice": [120, ""], "bob": [40, ""], "carol": ["n/a", ""]})
+
+    assert len(store) == 3
+    assert store.latest_timestamp == minutes(10)
+    timestamps, values = store.series("alice")
+    assert list(timestamps) == [np.datetime64(minutes(n), "m") for n in (0, 5, 10)]
+    assert list(values) == [100, 110, 120]
+    # bob is missing from the middle snapshot, and carol's value doesn't parse
+    assert list(store.series("bob")[1]) == [50, 40]
+    assert len(store.series("carol")[0]) == 0
+
+def test_out_of_order_snapshots_are_sorted_into_place(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append(minutes(10), {"alice": [3, ""]})
+    store.append(minutes(0), {"alice": [1, ""]})
+    store.append(minutes(5), {"alice": [2, ""], "bob": [7, ""]})
+
+    assert list(store.timestamps) == [np.datetime64(minutes(n), "m") for n in (0, 5, 10)]
+    assert list(store.series("alice")[1]) == [1, 2, 3]
+    timestamps, rows = store.frame(["bob", "alice", "nobody"])
+    np.testing.assert_array_equal(rows, [[np.nan, 7, np.nan], [1, 2, 3], [np.nan, np.nan, np.nan]])
+
+def test_views_handed_out_are_not_changed_by_later_appends(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append(minutes(5), {"alice": [2, ""]})
+    timestamps, values = store.frame(["alice"])
+    store.append(minutes(0), {"alice": [1, ""]})
+    store.append(minutes(10), {"alice": [3, ""], "bob": [9, ""]})
+
+    assert list(timestamps) == [np.datetime64(minutes(5), "m")]
+    assert list(values[0]) == [2]
+    assert list(store.series("alice")[1]) == [1, 2, 3]
+
+def test_refresh_only_reads_new_files(in_time_dir, write_snapshot):
+    write_snapshot(minutes(0), {"alice": [100, ""]})
+    write_snapshot(minutes(5), {"alice": [105, ""]})
+    (in_time_dir / "notes.txt").write_text("ignored")
+    (in_time_dir / "leaderboard-bad-name.json").write_text("{}")
+    store = HistoryStore(in_time_dir)
+
+    assert store.refresh() == 2
+    assert store.refresh() == 0
+    write_snapshot(minutes(10), {"alice": [110, ""]})
+    assert store.refresh() == 1
+    assert list(store.series("alice")[1]) == [100, 105, 110]
+
+def test_refresh_retries_half_written_files(in_time_dir, write_snapshot):
+    write_snapshot(minutes(0), {"alice": [100, ""]})
+    broken = write_snapshot(minutes(5), {"alice": [105, ""]})
+    broken.write_text('{"alice": [10')
+    store = HistoryStore(in_time_dir)
+
+    assert store.refresh() == 1
+    write_snapshot(minutes(5), {"alice": [105, ""]})
+    assert store.refresh() == 1
+    assert list(store.series("alice")[1]) == [100, 105]
+
+def test_checkpoint_round_trip(in_time_dir, write_snapshot):
+    write_snapshot(minutes(0), {"alice": [100, ""], "bob": [80, ""]})
+    write_snapshot(minutes(5), {"alice": [105, ""]})
+    store = HistoryStore(in_time_dir)
+    store.refresh()
+    state = store.checkpoint_state()
+
+    restored = HistoryStore(in_time_dir)
+    assert restored.restore_state(state)
+    write_snapshot(minutes(10), {"bob": [90, ""]})
+    assert restored.refresh() == 1
+    assert list(restored.series("alice")[1]) == [100, 105]
+    assert list(restored.series("bob")[1]) == [80, 90]
+
+def test_checkpoint_refused_when_a_source_file_changed(in_time_dir, write_snapshot):
+    path = write_snapshot(minutes(0), {"alice": [100, ""]})
+    store = HistoryStore(in_time_dir)
+    store.refresh()
+    state = store.checkpoint_state()
+    path.write_text('{"alice": [1000, ""]}')
+
+    assert not HistoryStore(in_time_dir).restore_state(state)
+
+def test_first_at_or_after(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append(minutes(0), {"alice": [1, ""]})
+    store.append(minutes(10), {"alice": [2, ""]})
+
+    assert store.first_at_or_after(minutes(-5)) == minutes(0)
+    assert store.first_at_or_after(minutes(3)) == minutes(10)
+    assert store.first_at_or_after(minutes(11)) is None
+
+def test_window_is_half_open(tmp_path):
+    store = HistoryStore(tmp_path)
+    for n in (0, 5, 10, 15):
+        store.append(minutes(n), {"alice": [n, ""]})
+
+    assert store.window() == (0, 4)
+    assert store.window(minutes(5), minutes(15)) == (1, 3)
+    assert store.window(minutes(1), None) == (1, 4)
+    assert store.window(minutes(20), None) == (4, 4)
+    # An end before the start is an empty window, not a negative one
+    assert store.window(minutes(10), minutes(0)) == (2, 2)
+
+def test_series_and_frame_between_dates(tmp_path):
+    store = HistoryStore(tmp_path)
+    for n in (0, 5, 10, 15):
+        store.append(minutes(n), {"alice": [n, ""], **({"bob": [-n, ""]} if n >= 10 else {})})
+
+    timestamps, values = store.series("alice", minutes(5), minutes(15))
+    assert list(timestamps) == [np.datetime64(minutes(5), "m"), np.datetime64(minutes(10), "m")]
+    assert list(values) == [5, 10]
+    timestamps, rows = store.frame(["alice", "bob"], start=minutes(5))
+    assert len(timestamps) == 3
+    np.testing.assert_array_equal(rows, [[5, 10, 15], [np.nan, -10, -15]])
+    assert len(store.series("alice", minutes(16))[0]) == 0
+
+def test_window_over_an_archive_and_older_in_time_files(tmp_path, in_time_dir, write_snapshot):
+    write_snapshot(minutes(10), {"alice": [10, None, []]})
+    write_snapshot(minutes(20), {"alice": [20, None, []]})
+    path = str(tmp_path / "history.lsha")
+    write_archive(str(in_time_dir), path)
+    store = HistoryStore(in_time_dir)
+    store.attach_archive(HistoryArchive(path))
+    # An in_time file older than the end of the archive has to be merged into the sorted axis
+    store.append(minutes(15), {"alice": [15, None, []]})
+
+    timestamps, values = store.series("alice", minutes(12), minutes(21))
+    assert list(timestamps) == [np.datetime64(minutes(15), "m"), np.datetime64(minutes(20), "m")]
+    assert list(values) == [15, 20]
@@ -0,0 +1,52 @@
+import pytest
+
+from holdings import HoldingsTable, diff_holdings
+
+def table(data):
+    return HoldingsTable.from_dict({name: [0, None, stocks] for name, stocks in data.items()})
+
+def test_opened_closed_and_resized_positions():
+    before = table({
+        "alice": [["AAPL", "$1,000.00", "0%"], ["MSFT", "$500.00", "0%"]],
+        "bob": [["NVDA", "$1,000.00", "0.00%"]],
+        "carol": [["GOOG", "$1,000.00", "0%"]],
+    })
+    after = table({
+        # AAPL only went up in price
+        "alice": [["AAPL", "$1,100.00", "10%"], ["TSLA", "$200.00", "0%"]],
+        # Cost basis 2000: bought another 1000
+        "bob": [["NVDA", "$2,200.00", "10.00%"]],
+        # Cost basis 500: sold half
+        "carol": [["GOOG", "$450.00", "-10%"]],
+    })
+
+    changes = diff_holdings(before, after).by_user()
+    assert changes["alice"] == [("opened", "TSLA", 0.0, 200.0, 200.0), ("closed", "MSFT", 500.0, 0.0, -500.0)]
+    assert changes["bob"] == [("increased", "NVDA", 1000.0, 2200.0, pytest.approx(1000.0))]
+    assert changes["carol"] == [("decreased", "GOOG", 1000.0, 450.0, pytest.approx(-500.0))]
+
+def test_rounding_drift_is_not_a_change():
+    before = table({"alice": [["AAPL", "$1,000.00", "0.00%"]]})
+    after = table({"alice": [["AAPL", "$1,100.01", "10.00%"]]})
+    assert len(diff_holdings(before, after)) == 0
+
+def test_only_accounts_in_both_snapshots_are_compared():
+    before = table({"alice": [], "erin": [["AAPL", "$100", "0%"]]})
+    after = table({"alice": [["AAPL", "$100", "0%"]], "dave": [["MSFT", "$100", "0%"]]})
+    diff = diff_holdings(before, after)
+    assert diff.usernames == ["alice"]
+    assert diff.by_user() == {"alice": [("opened", "AAPL", 0.0, 100.0, 100.0)]}
+    assert list(diff.counts()) == [1]
+
+def test_repeated_ticker_rows_are_summed():
+    before = table({"alice": [["AAPL", "$500", "0%"], ["AAPL", "$500", "0%"]]})
+    after = table({"alice": [["AAPL", "$1,000", "0%"]]})
+    assert len(diff_holdings(before, after)) == 0
+
+def test_unparseable_values_do_not_break_the_diff():
+    before = table({"alice": [["AAPL", "N/A", "N/A"]]})
+    after = table({"alice": [["AAPL", "N/A", "N/A"], ["MSFT", "$10", "0%"]]})
+    assert diff_holdings(before, after).by_user() == {"alice": [("opened", "MSFT", 0.0, 10.0, 10.0)]}
+
+def test_empty_snapshots():
+    assert len(diff_holdings(table({}), table({}))) == 0
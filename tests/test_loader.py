@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from loader import RECORD_TRAILER, UserRecordIndex, find_user_spans
+
+LEADERBOARD = {
+    "alice": [105000.5, "https://example.com/u?id=1&next=a:b", [["AAPL", "$7,227.50", "36.34%"]]],
+    "bob \"the builder\"": [99000, None, []],
+    "c:\\users\\carol": [98000, "x\":[", [["MSFT", "$1.00", "0%"]]],
+    "dörte 🚀": [97000, "", [["TSLA", "$10", "-1%"], ["NVDA", "$20", "2%"]]],
+    "": [1, None, []],
+}
+
+@pytest.mark.parametrize("dump", [
+    lambda data: json.dumps(data),
+    lambda data: json.dumps(data, indent=4),
+    lambda data: json.dumps(data, ensure_ascii=False, separators=(",", ":")),
+])
+def test_find_user_spans_locates_every_record(dump):
+    raw = dump(LEADERBOARD).encode("utf-8")
+    spans = find_user_spans(raw)
+    assert list(spans) == list(LEADERBOARD)
+    for name, (start, end) in spans.items():
+        assert json.loads(raw[start:end].rstrip(RECORD_TRAILER)) == LEADERBOARD[name]
+
+def test_find_user_spans_of_an_empty_leaderboard():
+    assert find_user_spans(b"{}") == {}
+
+def test_user_record_index_reads_one_record(tmp_path):
+    path = tmp_path / "leaderboard-latest.json"
+    path.write_text(json.dumps(LEADERBOARD, indent=4))
+    index = UserRecordIndex(str(path))
+
+    assert index.lookup("dörte 🚀") == LEADERBOARD["dörte 🚀"]
+    assert index.lookup("bob \"the builder\"") == LEADERBOARD["bob \"the builder\""]
+    assert index.lookup("nobody") is None
+    assert len(index) == len(LEADERBOARD)
+    assert index.full_parses == 0
+
+def test_user_record_index_follows_a_new_file(tmp_path):
+    path = tmp_path / "leaderboard-latest.json"
+    path.write_text(json.dumps(LEADERBOARD))
+    index = UserRecordIndex(str(path))
+    assert index.lookup("alice")[0] == 105000.5
+
+    updated = dict(LEADERBOARD, alice=[1, None, []], zoe=[2, None, []])
+    path.write_text(json.dumps(updated, indent=2))
+    os.utime(path, ns=(0, 1))
+    assert index.lookup("alice") == [1, None, []]
+    assert index.lookup("zoe") == [2, None, []]
@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+from market import EST, is_market_open, next_market_event, nyse_half_days, nyse_holidays, session
+
+def at(year, month, day, hour=0, minute=0):
+    return EST.localize(datetime.datetime(year, month, day, hour, minute))
+
+@pytest.mark.parametrize("now, expected", [
+    # Monday: open, then close
+    (at(2025, 3, 3, 8), (at(2025, 3, 3, 9, 30), "open")),
+    (at(2025, 3, 3, 12), (at(2025, 3, 3, 16), "close")),
+    # Friday evening skips the weekend
+    (at(2025, 3, 7, 17), (at(2025, 3, 10, 9, 30), "open")),
+    # Thanksgiving is closed and the day after closes at 1 PM
+    (at(2025, 11, 26, 16, 30), (at(2025, 11, 28, 9, 30), "open")),
+    (at(2025, 11, 28, 10), (at(2025, 11, 28, 13), "close")),
+    # Christmas Eve closes early, Christmas is closed
+    (at(2025, 12, 24, 12), (at(2025, 12, 24, 13), "close")),
+    (at(2025, 12, 24, 13, 30), (at(2025, 12, 26, 9, 30), "open")),
+    # July 3rd closes early before Independence Day
+    (at(2025, 7, 3, 14), (at(2025, 7, 7, 9, 30), "open")),
+    # Good Friday
+    (at(2025, 4, 17, 16), (at(2025, 4, 21, 9, 30), "open")),
+    # National day of mourning for President Carter
+    (at(2025, 1, 8, 16, 1), (at(2025, 1, 10, 9, 30), "open")),
+])
+def test_next_market_event(now, expected):
+    assert next_market_event(now) == expected
+
+def test_next_market_event_is_strictly_after_now():
+    assert next_market_event(at(2025, 3, 3, 9, 30)) == (at(2025, 3, 3, 16), "close")
+    assert next_market_event(at(2025, 3, 3, 16)) == (at(2025, 3, 4, 9, 30), "open")
+
+def test_observed_holidays():
+    # New Year's Day on a Saturday isn't made up on the Friday before
+    assert datetime.date(2021, 12, 31) not in nyse_holidays(2021)
+    assert datetime.date(2022, 1, 1) not in nyse_holidays(2022)
+    # Juneteenth on a Saturday is observed on the Friday
+    assert datetime.date(2027, 6, 18) in nyse_holidays(2027)
+    assert datetime.date(2021, 6, 18) not in nyse_holidays(2021)
+
+def test_half_days():
+    assert nyse_half_days(2025) == {datetime.date(2025, 7, 3), datetime.date(2025, 11, 28), datetime.date(2025, 12, 24)}
+    # July 3rd only closes early when Independence Day falls Tuesday to Friday
+    assert datetime.date(2027, 7, 3) not in nyse_half_days(2027)
+
+def test_session_and_is_market_open():
+    assert session(datetime.date(2025, 12, 25)) is None
+    assert session(datetime.date(2025, 11, 28)) == (at(2025, 11, 28, 9, 30), at(2025, 11, 28, 13))
+    assert is_market_open(at(2025, 11, 28, 12, 59))
+    assert not is_market_open(at(2025, 11, 28, 13, 1))
+    assert not is_market_open(at(2025, 3, 8, 12))
@@ -0,0 +1,30 @@
+import discord
+
+from notifier import MAX_EMBED_CHARS_PER_MESSAGE, MAX_EMBEDS_PER_MESSAGE, notification_key, pack_embeds
+
+def embeds(*sizes):
+    return [(notification_key(str(i)), discord.Embed(description="x" * size)) for i, size in enumerate(sizes)]
+
+def test_packs_at_most_ten_embeds_per_message():
+    items = embeds(*[10] * 23)
+    messages = pack_embeds(items)
+    assert [len(message) for message in messages] == [10, 10, 3]
+    assert [item for message in messages for item in message] == items
+
+def test_packs_within_the_character_limit():
+    messages = pack_embeds(embeds(2500, 2500, 2500, 100, 4000))
+    assert [[len(embed) for _, embed in message] for message in messages] == [[2500, 2500], [2500, 100], [4000]]
+    for message in messages:
+        assert len(message) <= MAX_EMBEDS_PER_MESSAGE
+        assert sum(len(embed) for _, embed in message) <= MAX_EMBED_CHARS_PER_MESSAGE
+
+def test_an_embed_at_the_limit_gets_its_own_message():
+    messages = pack_embeds(embeds(1, MAX_EMBED_CHARS_PER_MESSAGE, 1))
+    assert [len(message) for message in messages] == [1, 1, 1]
+
+def test_nothing_to_pack():
+    assert pack_embeds([]) == []
+
+def test_notification_keys_are_stable_and_distinct():
+    assert notification_key("alice", "AAPL", "bought") == notification_key("alice", "AAPL", "bought")
+    assert notification_key("alice", "AAPL") != notification_key("alic", "eAAPL")
@@ -0,0 +1,136 @@
+import asyncio
+import types
+
+import discord
+import pytest
+
+import outbox
+from outbox import BULK, INTERACTION, SCHEDULED, SendScheduler
+
+# Stands in for time.monotonic in outbox so token buckets only refill when a test moves the clock.
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+# A channel that records what was sent to it.
+class FakeChannel:
+    def __init__(self, channel_id, log):
+        self.id = channel_id
+        self.log = log
+
+    async def send(self, **kwargs):
+        self.log.append((self.id, kwargs.get("content")))
+        return kwargs.get("content")
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(outbox, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+# Move the fake clock and wake the dispatcher, which would otherwise sleep out the real delay.
+async def advance(clock, scheduler, seconds):
+    clock.now += seconds
+    scheduler._wakeup.set()
+    await settle()
+
+def test_sends_in_priority_order(clock):
+    async def main():
+        log = []
+        channel = FakeChannel(1, log)
+        scheduler = SendScheduler(rate=1, per=10.0)
+        sends = [
+            asyncio.ensure_future(scheduler.send(channel, BULK, content="bulk")),
+            asyncio.ensure_future(scheduler.send(channel, SCHEDULED, content="scheduled")),
+            asyncio.ensure_future(scheduler.send(channel, INTERACTION, content="interaction")),
+        ]
+        await settle()
+        assert log == [(1, "interaction")]
+        await advance(clock, scheduler, 10.0)
+        await advance(clock, scheduler, 10.0)
+        assert await asyncio.gather(*sends) == ["bulk", "scheduled", "interaction"]
+        scheduler.stop()
+        return log
+
+    assert asyncio.run(main()) == [(1, "interaction"), (1, "scheduled"), (1, "bulk")]
+
+def test_each_channel_is_held_to_its_rate(clock):
+    async def main():
+        log = []
+        busy, quiet = FakeChannel(1, log), FakeChannel(2, log)
+        scheduler = SendScheduler(rate=2, per=10.0)
+        for i in range(10):
+            asyncio.ensure_future(scheduler.send(busy, BULK, content=f"bulk{i}"))
+        await settle()
+        assert len(log) == 2
+
+        # Another channel has its own bucket and isn't held up by the busy one
+        assert await scheduler.send(quiet, INTERACTION, content="reply") == "reply"
+        assert log[-1] == (2, "reply")
+
+        # One token comes back every per / rate seconds
+        await advance(clock, scheduler, 4.9)
+        assert len(log) == 3
+        await advance(clock, scheduler, 0.1)
+        assert len(log) == 4
+        await advance(clock, scheduler, 10.0)
+        assert len(log) == 6
+        assert scheduler.queue_depth() == {"interaction": 0, "scheduled": 0, "bulk": 5}
+        scheduler.stop()
+
+    asyncio.run(main())
+
+def test_newer_send_replaces_a_queued_one_with_the_same_key(clock):
+    async def main():
+        log = []
+        channel = FakeChannel(1, log)
+        scheduler = SendScheduler(rate=1, per=10.0)
+        first = asyncio.ensure_future(scheduler.send(channel, SCHEDULED, coalesce_key="update", content="first"))
+        await settle()
+        # The first one went out, so the next two wait for a token and only the newest is kept
+        queued = [
+            asyncio.ensure_future(scheduler.send(channel, SCHEDULED, coalesce_key="update", content=content))
+            for content in ("second", "third")
+        ]
+        await settle()
+        await advance(clock, scheduler, 10.0)
+        results = [await first] + list(await asyncio.gather(*queued))
+        assert scheduler.stats["scheduled"]["coalesced"] == 1
+        scheduler.stop()
+        return log, results
+
+    log, results = asyncio.run(main())
+    assert log == [(1, "first"), (1, "third")]
+    assert results == ["first", None, "third"]
+
+def test_dropped_sends_close_their_attachments(clock, tmp_path):
+    path = tmp_path / "chart.png"
+    path.write_bytes(b"png")
+
+    async def main():
+        channel = FakeChannel(1, [])
+        scheduler = SendScheduler(rate=1, per=10.0)
+        await scheduler.send(channel, SCHEDULED, content="uses the token")
+
+        replaced = discord.File(path)
+        stopped = discord.File(path)
+        superseded = asyncio.ensure_future(scheduler.send(channel, SCHEDULED, coalesce_key="chart", file=replaced))
+        await settle()
+        pending = asyncio.ensure_future(scheduler.send(channel, SCHEDULED, coalesce_key="chart", files=[stopped]))
+        await settle()
+        assert await superseded is None
+        assert replaced.fp.closed and not stopped.fp.closed
+
+        scheduler.stop()
+        await settle()
+        assert pending.cancelled()
+        assert stopped.fp.closed
+
+    asyncio.run(main())
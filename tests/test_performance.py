@@ -0,0 +1,80 @@
+import datetime
+import math
+
+import pytest
+
+from market import EST
+from performance import compute_performance, window_start
+
+def snapshot(values, holdings=None):
+    holdings = holdings or {}
+    return {name: [money, None, holdings.get(name, [])] for name, money in values.items()}
+
+def test_returns_ranking_and_trades():
+    before = snapshot({"alice": 100.0, "bob": 200.0, "carol": 50.0, "gone": 10.0}, {"bob": [["AAPL", "$100", "0%"]]})
+    after = snapshot({"alice": 110.0, "bob": 180.0, "carol": 50.0, "new": 10.0}, {"bob": [["MSFT", "$100", "0%"]]})
+    report = compute_performance([before, after])
+
+    # Only accounts in both snapshots, in the last snapshot's order
+    assert report.usernames == ["alice", "bob", "carol"]
+    assert [entry["username"] for entry in report.top(5)] == ["alice", "carol", "bob"]
+    assert report.top(1)[0] == {"username": "alice", "change_amount": 10.0, "change_percent": pytest.approx(10.0), "trades": 0}
+    assert [entry["username"] for entry in report.bottom(2)] == ["carol", "bob"]
+    assert report.bottom(0) == []
+    assert list(report.ranks) == [1, 3, 2]
+
+    # bob closed AAPL and opened MSFT
+    assert report.total_trades == 2
+    assert report.most_active() == [{"username": "bob", "trades": 2}]
+    assert report.biggest_gain()["username"] == "alice"
+    assert report.biggest_loss()["change_percent"] == pytest.approx(-10.0)
+
+def test_trades_are_counted_across_every_snapshot():
+    snapshots = [
+        snapshot({"alice": 100.0}, {"alice": []}),
+        snapshot({"alice": 100.0}, {"alice": [["AAPL", "$100", "0%"]]}),
+        snapshot({"alice": 100.0}, {"alice": []}),
+    ]
+    assert compute_performance(snapshots).total_trades == 2
+    with pytest.raises(ValueError):
+        compute_performance(snapshots[:1])
+
+def test_accounts_without_a_finite_return_are_not_ranked():
+    before = snapshot({"alice": 100.0, "zero": 0.0, "missing": None, "bob": 100.0})
+    after = snapshot({"alice": 90.0, "zero": 500.0, "missing": 100.0, "bob": 120.0})
+    report = compute_performance([before, after])
+
+    assert len(report) == 4
+    assert [entry["username"] for entry in report.top(5)] == ["bob", "alice"]
+    assert [entry["username"] for entry in report.bottom(3)] == ["bob", "alice"]
+    assert list(report.ranks) == [2, 0, 0, 1]
+
+    summary = report.summary()
+    assert all(math.isfinite(entry["change_percent"]) for entry in summary["performance"])
+    assert summary["biggest_gain"]["username"] == "bob"
+    assert summary["biggest_loss"]["username"] == "alice"
+
+def test_no_gain_or_loss():
+    report = compute_performance([snapshot({"alice": 100.0, "bob": 0.0}), snapshot({"alice": 100.0, "bob": 5.0})])
+    summary = report.summary()
+    assert summary["biggest_gain"] == {"username": None, "amount": 0, "percent": 0}
+    assert summary["biggest_loss"] == {"username": None, "amount": 0, "percent": 0}
+
+def test_day_window_starts_at_the_latest_open():
+    # Wednesday after the open, then before it
+    assert window_start("day", EST.localize(datetime.datetime(2025, 1, 8, 12, 0))) == datetime.datetime(2025, 1, 8, 9, 30)
+    assert window_start("day", EST.localize(datetime.datetime(2025, 1, 8, 8, 0))) == datetime.datetime(2025, 1, 7, 9, 30)
+    # Monday holiday looks back past the weekend to Friday
+    assert window_start("day", EST.localize(datetime.datetime(2025, 1, 20, 12, 0))) == datetime.datetime(2025, 1, 17, 9, 30)
+    # Aware times in other zones are read in Eastern time
+    utc = datetime.datetime(2025, 1, 8, 15, 0, tzinfo=datetime.timezone.utc)
+    assert window_start("day", utc) == datetime.datetime(2025, 1, 8, 9, 30)
+
+def test_calendar_windows():
+    now = EST.localize(datetime.datetime(2025, 1, 16, 15, 45))
+    assert window_start("week", now) == datetime.datetime(2025, 1, 13)
+    assert window_start("month", now) == datetime.datetime(2025, 1, 1)
+    assert window_start("season", now) == datetime.datetime.min
+    assert window_start("season", now, datetime.datetime(2024, 12, 1)) == datetime.datetime(2024, 12, 1)
+    with pytest.raises(ValueError):
+        window_start("year", now)
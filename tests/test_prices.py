@@ -0,0 +1,84 @@
+import pandas as pd
+
+from prices import CSVSource, PriceStore
+
+# Wraps a CSVSource and records every range the store asks it for.
+class CountingSource:
+    def __init__(self, directory):
+        self.source = CSVSource(directory)
+        self.calls = []
+
+    def fetch(self, symbol, start, end, interval):
+        self.calls.append((symbol, start, end))
+        return self.source.fetch(symbol, start, end, interval)
+
+def write_bars(directory, symbol, days):
+    frame = pd.DataFrame(
+        {"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100},
+        index=pd.DatetimeIndex(days, name="Date"),
+    )
+    frame.to_csv(directory / f"{symbol}.csv")
+
+def ts(day):
+    return pd.Timestamp(day)
+
+def test_overlapping_request_fetches_only_the_missing_ranges(tmp_path):
+    write_bars(tmp_path, "AAPL", pd.bdate_range("2025-01-06", "2025-01-17"))
+    source = CountingSource(tmp_path)
+    store = PriceStore(str(tmp_path / "prices.db"), source)
+
+    first = store.get_bars("aapl", "2025-01-08", "2025-01-11")
+    assert list(first.index) == [ts("2025-01-08"), ts("2025-01-09"), ts("2025-01-10")]
+
+    bars = store.get_bars("AAPL", "2025-01-06", "2025-01-16")
+    assert list(bars.index) == list(pd.bdate_range("2025-01-06", "2025-01-15"))
+    assert source.calls == [
+        ("AAPL", ts("2025-01-08"), ts("2025-01-11")),
+        ("AAPL", ts("2025-01-06"), ts("2025-01-08")),
+        ("AAPL", ts("2025-01-11"), ts("2025-01-16")),
+    ]
+
+    # Everything is covered now
+    store.get_bars("AAPL", "2025-01-07", "2025-01-15")
+    assert len(source.calls) == 3
+    store.close()
+
+def test_empty_range_without_a_session_is_not_fetched_again(tmp_path):
+    write_bars(tmp_path, "AAPL", pd.bdate_range("2025-01-06", "2025-01-10"))
+    source = CountingSource(tmp_path)
+    store = PriceStore(str(tmp_path / "prices.db"), source)
+
+    # A weekend, then Martin Luther King Jr. Day
+    for start, end in [("2025-01-11", "2025-01-13"), ("2025-01-20", "2025-01-21")]:
+        assert store.get_bars("AAPL", start, end).empty
+        assert store.get_bars("AAPL", start, end).empty
+    assert len(source.calls) == 2
+    store.close()
+
+def test_empty_range_with_a_session_is_fetched_again(tmp_path):
+    source = CountingSource(tmp_path)
+    store = PriceStore(str(tmp_path / "prices.db"), source)
+
+    # No file for MSFT, like yfinance returning nothing while throttled
+    assert store.get_bars("MSFT", "2025-01-06", "2025-01-08").empty
+    write_bars(tmp_path, "MSFT", pd.bdate_range("2025-01-06", "2025-01-07"))
+    source.source = CSVSource(tmp_path)
+    bars = store.get_bars("MSFT", "2025-01-06", "2025-01-08")
+    assert list(bars.index) == [ts("2025-01-06"), ts("2025-01-07")]
+    assert len(source.calls) == 2
+    store.close()
+
+def test_bars_and_coverage_survive_reopening(tmp_path):
+    write_bars(tmp_path, "AAPL", pd.bdate_range("2025-01-06", "2025-01-10"))
+    path = str(tmp_path / "prices.db")
+    store = PriceStore(path, CountingSource(tmp_path))
+    expected = store.get_bars("AAPL", "2025-01-06", "2025-01-11")
+    store.close()
+
+    source = CountingSource(tmp_path)
+    reopened = PriceStore(path, source)
+    bars = reopened.get_bars("AAPL", "2025-01-06", "2025-01-11")
+    assert source.calls == []
+    pd.testing.assert_frame_equal(bars, expected)
+    assert bars["Close"].tolist() == [1.5] * 5
+    reopened.close()
@@ -0,0 +1,71 @@
+import random
+
+from leaderboard import Leaderboard
+from ranks import RankIndex
+
+def index(values):
+    ranks = RankIndex()
+    ranks.update(values)
+    return ranks
+
+def test_rank_and_at_follow_money_then_name():
+    ranks = index({"carol": 300.0, "alice": 100.0, "bob": 300.0})
+    assert [ranks.rank(name) for name in ("bob", "carol", "alice")] == [1, 2, 3]
+    assert ranks.at(2) == (2, "carol", 300.0)
+    assert ranks.rank("dave") is None
+
+def test_top_and_neighbours():
+    ranks = index({f"user{i}": float(i) for i in range(10)})
+    assert ranks.top(3) == [(1, "user9", 9.0), (2, "user8", 8.0), (3, "user7", 7.0)]
+    assert ranks.top(20)[-1] == (10, "user0", 0.0)
+
+    above, below = ranks.neighbours("user5", count=2)
+    assert above == [(3, "user7", 7.0), (4, "user6", 6.0)]
+    assert below == [(6, "user4", 4.0), (7, "user3", 3.0)]
+
+    # Clipped at either end of the board
+    assert ranks.neighbours("user9") == ([], [(2, "user8", 8.0)])
+    assert ranks.neighbours("user0") == ([(9, "user1", 1.0)], [])
+    assert ranks.neighbours("nobody") == ([], [])
+
+def test_non_finite_money_is_not_ranked():
+    ranks = index({"alice": 100.0, "bob": float("nan"), "carol": float("inf")})
+    assert len(ranks) == 1
+    assert "bob" not in ranks and ranks.rank("carol") is None
+    assert ranks.top(5) == [(1, "alice", 100.0)]
+
+    # An account that goes NaN drops out, and comes back once it has a value again
+    ranks.update({"alice": float("nan"), "bob": 50.0})
+    assert ranks.top(5) == [(1, "bob", 50.0)]
+
+def test_update_counts_moved_joined_and_left():
+    ranks = index({f"user{i}": float(i) for i in range(20)})
+    values = {f"user{i}": float(i) for i in range(1, 20)}
+    values["user5"] = 100.0
+    values["new"] = 2.5
+    assert ranks.update(values) == 3
+    assert ranks.update(values) == 0
+    assert ranks.top(1) == [(1, "user5", 100.0)]
+
+def test_matches_leaderboard_order_after_many_updates():
+    rng = random.Random(7)
+    names = [f"user{i}" for i in range(200)]
+    ranks = RankIndex()
+    values = {}
+    for step in range(30):
+        if step % 3 == 0:
+            # Nearly every account moves
+            values = {name: float(rng.randint(0, 50)) for name in rng.sample(names, 150)}
+        else:
+            # Only a few accounts move, join or leave
+            for name in rng.sample(names, 5):
+                if rng.random() < 0.2:
+                    values.pop(name, None)
+                else:
+                    values[name] = float(rng.randint(0, 50))
+        ranks.update(values)
+
+        board = Leaderboard.from_dict({name: [money, None, []] for name, money in values.items()})
+        expected = [(account.rank, account.name, account.money) for account in board.ranked]
+        assert ranks.top(len(values)) == expected
+        assert all(ranks.rank(name) == board.accounts[name].rank for name in values)